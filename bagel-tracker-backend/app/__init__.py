@@ -14,6 +14,10 @@ def create_app():
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = 3600  # 1 hour
     
+    # Serialize responses with orjson when it is installed (JSON_ENCODER=auto|orjson|stdlib)
+    from app.utils.json_encoding import get_json_encoder
+    app.json_encoder = get_json_encoder(os.getenv('JSON_ENCODER', 'auto'))
+    
     # Initialize extensions
     CORS(app, origins=["https://icy-mushroom-0938c2500.6.azurestaticapps.net", "http://localhost:3000", "http://localhost:3001"],
          supports_credentials=True,
@@ -22,6 +26,14 @@ def create_app():
     
     JWTManager(app)
     
+    # Reuse one pooled database connection per request
+    from app.utils.db import init_app as init_db_pool
+    init_db_pool(app)
+    
+    # Load the typeahead name index without blocking startup
+    from app.models.user import User
+    User.name_index.warm_in_background()
+    
     # Register blueprints
     from app.routes.auth import auth_bp
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -34,4 +46,16 @@ def create_app():
     from app.routes.ping import ping_bp
     app.register_blueprint(ping_bp, url_prefix='/api/ping')
     
+    # Register stats blueprint
+    from app.routes.stats import stats_bp
+    app.register_blueprint(stats_bp, url_prefix='/api/stats')
+    
+    # Register leaderboard blueprint
+    from app.routes.leaderboard import leaderboard_bp
+    app.register_blueprint(leaderboard_bp, url_prefix='/api/leaderboard')
+    
+    # Register metrics blueprint
+    from app.routes.metrics import metrics_bp
+    app.register_blueprint(metrics_bp, url_prefix='/api/metrics')
+    
     return app
@@ -0,0 +1,191 @@
+from app.utils.db import execute_query, db_connection, get_dialect
+
+class HeadToHead:
+    """Records between pairs of opponents, per match type.
+    
+    Each row is keyed by the canonical pair (player_low < player_high), so a
+    player with thousands of opponents costs one row per opponent they have
+    actually played, and reading any pair's record is a primary key seek.
+    In doubles every player is paired with each of the two opponents; partners
+    are not opponents and are not recorded here.
+    """
+    # Counters kept per (player_low, player_high, match_type), in column order
+    COUNTERS = ['matches_played', 'low_wins', 'high_wins', 'low_bagels', 'high_bagels']
+    # Rows per upsert; 9 parameters each keeps us under SQL Server's 2100 limit
+    MERGE_CHUNK_SIZE = 200
+    # Upsert assignments: add each delta and keep the latest match date
+    MERGE_UPDATES = dict(
+        {counter: f"{{target}}.{counter} + {{source}}.{counter}" for counter in COUNTERS},
+        last_played="""CASE WHEN {target}.last_played IS NULL OR {source}.last_played > {target}.last_played
+                            THEN {source}.last_played ELSE {target}.last_played END""",
+        updated_at="CURRENT_TIMESTAMP"
+    )
+    
+    @staticmethod
+    def opponent_pairs(match):
+        """(player_low, player_high, low_team) for each pair of opponents in a match."""
+        team1 = [p for p in (match.team1_player1_id, match.team1_player2_id) if p is not None]
+        team2 = [p for p in (match.team2_player1_id, match.team2_player2_id) if p is not None]
+        return [
+            (a, b, 1) if a < b else (b, a, 2)
+            for a in team1 for b in team2
+        ]
+    
+    @staticmethod
+    def deltas(matches, sign=1, into=None):
+        """Accumulate the changes a set of matches makes to HeadToHead.
+        Use sign=-1 to take back the contribution of a match's previous version.
+        Returns a dict of (player_low, player_high, match_type) -> counter
+        deltas followed by the latest match date added (None if only removals).
+        """
+        totals = into if into is not None else {}
+        for match in matches:
+            for low, high, low_team in HeadToHead.opponent_pairs(match):
+                low_won = match.winner_team == low_team
+                high_won = match.winner_team is not None and not low_won
+                row = totals.setdefault(
+                    (low, high, match.match_type), [0] * len(HeadToHead.COUNTERS) + [None]
+                )
+                row[0] += sign
+                row[1] += sign if low_won else 0
+                row[2] += sign if high_won else 0
+                row[3] += sign if match.is_bagel and low_won else 0
+                row[4] += sign if match.is_bagel and high_won else 0
+                if sign > 0 and (row[5] is None or match.match_date > row[5]):
+                    row[5] = match.match_date
+        return totals
+    
+    @staticmethod
+    def apply(cursor, deltas):
+        """Add deltas to HeadToHead on the caller's transaction."""
+        rows = [
+            (low, high, match_type, *values)
+            for (low, high, match_type), values in deltas.items()
+            if any(values[:-1]) or values[-1] is not None
+        ]
+        columns = ['player_low', 'player_high', 'match_type'] + HeadToHead.COUNTERS + ['last_played']
+        for start in range(0, len(rows), HeadToHead.MERGE_CHUNK_SIZE):
+            chunk = rows[start:start + HeadToHead.MERGE_CHUNK_SIZE]
+            query = get_dialect().upsert(
+                'HeadToHead', ['player_low', 'player_high', 'match_type'], columns, len(chunk),
+                HeadToHead.MERGE_UPDATES
+            )
+            cursor.execute(query, [param for row in chunk for param in row])
+    
+    @staticmethod
+    def refresh_last_played(cursor, pairs):
+        """Recompute last_played for (player_low, player_high, match_type) keys
+        on the caller's transaction. Needed after an edit moves or removes a
+        pair's latest match, which deltas alone cannot take back.
+        """
+        for low, high, match_type in pairs:
+            cursor.execute("""
+                UPDATE HeadToHead SET last_played = (
+                    SELECT MAX(m.match_date)
+                    FROM MatchParticipants a
+                    JOIN MatchParticipants b ON b.match_id = a.match_id AND b.team <> a.team
+                    JOIN Matches m ON m.match_id = a.match_id
+                    WHERE a.user_id = ? AND b.user_id = ? AND m.match_type = ?
+                )
+                WHERE player_low = ? AND player_high = ? AND match_type = ?
+            """, (low, high, match_type, low, high, match_type))
+    
+    @staticmethod
+    def find_pair(a, b):
+        """Get the record between players a and b from a's side, split by match
+        type plus overall totals.
+        """
+        low, high = (a, b) if a < b else (b, a)
+        query = """
+            SELECT match_type, matches_played, low_wins, high_wins, low_bagels, high_bagels, last_played
+            FROM HeadToHead
+            WHERE player_low = ? AND player_high = ?
+        """
+        result = execute_query(query, (low, high))
+        
+        # Name each counter from a's side
+        a_is_low = a == low
+        sides = {
+            "wins": "low_wins" if a_is_low else "high_wins",
+            "losses": "high_wins" if a_is_low else "low_wins",
+            "bagels_given": "low_bagels" if a_is_low else "high_bagels",
+            "bagels_received": "high_bagels" if a_is_low else "low_bagels"
+        }
+        empty = {"matches_played": 0, "wins": 0, "losses": 0,
+                 "bagels_given": 0, "bagels_received": 0, "last_played": None}
+        record = {"singles": dict(empty), "doubles": dict(empty), "totals": dict(empty)}
+        for row in result:
+            for summary in (record[row.match_type], record["totals"]):
+                summary["matches_played"] += row.matches_played
+                for name, column in sides.items():
+                    summary[name] += getattr(row, column)
+                if row.matches_played and (summary["last_played"] is None or row.last_played > summary["last_played"]):
+                    summary["last_played"] = row.last_played
+        return record
+    
+    # Recompute every pair from Matches (via MatchParticipants)
+    AGGREGATE_QUERY = """
+        SELECT a.user_id AS player_low, b.user_id AS player_high, m.match_type,
+            COUNT(*) AS matches_played,
+            SUM(CASE WHEN m.winner_team = a.team THEN 1 ELSE 0 END) AS low_wins,
+            SUM(CASE WHEN m.winner_team = b.team THEN 1 ELSE 0 END) AS high_wins,
+            SUM(CASE WHEN m.is_bagel = 1 AND m.winner_team = a.team THEN 1 ELSE 0 END) AS low_bagels,
+            SUM(CASE WHEN m.is_bagel = 1 AND m.winner_team = b.team THEN 1 ELSE 0 END) AS high_bagels,
+            MAX(m.match_date) AS last_played
+        FROM MatchParticipants a
+        JOIN MatchParticipants b
+            ON b.match_id = a.match_id AND b.team <> a.team AND b.user_id > a.user_id
+        JOIN Matches m ON m.match_id = a.match_id
+        GROUP BY a.user_id, b.user_id, m.match_type
+    """
+    
+    @staticmethod
+    def rebuild():
+        """Replace HeadToHead with aggregates recomputed from Matches.
+        Returns the number of rows written.
+        """
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(f"DELETE FROM HeadToHead {get_dialect().table_hint('TABLOCKX')}")
+                cursor.execute(f"""
+                    INSERT INTO HeadToHead (
+                        player_low, player_high, match_type, matches_played,
+                        low_wins, high_wins, low_bagels, high_bagels, last_played
+                    )
+                    {HeadToHead.AGGREGATE_QUERY}
+                """)
+                rows = cursor.rowcount
+                conn.commit()
+                return rows
+            except Exception as e:
+                conn.rollback()
+                raise e
+            finally:
+                cursor.close()
+    
+    @staticmethod
+    def find_mismatches():
+        """Compare HeadToHead with a fresh aggregate without writing anything.
+        Returns (player_low, player_high, match_type) keys whose stored row is wrong or missing.
+        """
+        query = f"""
+            SELECT COALESCE(fresh.player_low, stored.player_low) AS player_low,
+                   COALESCE(fresh.player_high, stored.player_high) AS player_high,
+                   COALESCE(fresh.match_type, stored.match_type) AS match_type
+            FROM ({HeadToHead.AGGREGATE_QUERY}) AS fresh
+            FULL OUTER JOIN (
+                SELECT * FROM HeadToHead WHERE matches_played <> 0
+            ) AS stored
+                ON stored.player_low = fresh.player_low
+               AND stored.player_high = fresh.player_high
+               AND stored.match_type = fresh.match_type
+            WHERE fresh.player_low IS NULL OR stored.player_low IS NULL
+               OR fresh.matches_played <> stored.matches_played
+               OR fresh.low_wins <> stored.low_wins
+               OR fresh.high_wins <> stored.high_wins
+               OR fresh.low_bagels <> stored.low_bagels
+               OR fresh.high_bagels <> stored.high_bagels
+               OR {get_dialect().is_distinct('fresh.last_played', 'stored.last_played')}
+        """
+        return [(row.player_low, row.player_high, row.match_type) for row in execute_query(query)]
@@ -0,0 +1,61 @@
+from app.utils.db import execute_query, get_dialect
+
+class Leaderboard:
+    # Ranking expression for each supported metric, computed from PlayerStats
+    METRICS = {
+        'bagels_given': "SUM(ps.bagels_given)",
+        'wins': "SUM(ps.wins)",
+        'matches_played': "SUM(ps.matches_played)",
+        'win_rate': "CAST(SUM(ps.wins) AS FLOAT) / SUM(ps.matches_played)"
+    }
+    MATCH_TYPES = ['singles', 'doubles']
+    # Players need this many matches before they are ranked by win rate
+    WIN_RATE_MIN_MATCHES = 5
+    
+    @staticmethod
+    def top(metric, match_type=None, limit=10):
+        """Rank players by a PlayerStats metric, optionally for one match type.
+        Reads the per-player aggregate rather than grouping over Matches.
+        """
+        ranking = Leaderboard.METRICS[metric]
+        min_matches = Leaderboard.WIN_RATE_MIN_MATCHES if metric == 'win_rate' else 1
+        
+        params = []
+        type_filter = ""
+        if match_type:
+            type_filter = "WHERE ps.match_type = ?"
+            params.append(match_type)
+        params.extend([min_matches, limit])
+        
+        query = f"""
+            SELECT ps.user_id, u.name,
+                SUM(ps.matches_played) AS matches_played,
+                SUM(ps.wins) AS wins,
+                SUM(ps.losses) AS losses,
+                SUM(ps.bagels_given) AS bagels_given,
+                SUM(ps.bagels_received) AS bagels_received,
+                {ranking} AS score
+            FROM PlayerStats ps
+            JOIN Users u ON u.user_id = ps.user_id
+            {type_filter}
+            GROUP BY ps.user_id, u.name
+            HAVING SUM(ps.matches_played) >= ?
+            ORDER BY score DESC, u.name
+            {get_dialect().limit}
+        """
+        result = execute_query(query, tuple(params))
+        return [
+            {
+                "rank": rank,
+                "user_id": row.user_id,
+                "name": row.name,
+                "matches_played": row.matches_played,
+                "wins": row.wins,
+                "losses": row.losses,
+                "bagels_given": row.bagels_given,
+                "bagels_received": row.bagels_received,
+                "win_rate": round(row.wins / row.matches_played, 4),
+                "score": row.score
+            }
+            for rank, row in enumerate(result, start=1)
+        ]
@@ -1,8 +1,36 @@
-from app.utils.db import execute_query, get_db_connection
-import pyodbc
+from app.utils.db import db_connection, get_dialect, insert_returning, query_records
+from app.utils.rows import RowMapper
+from app.models.player_stats import PlayerStats
+from app.models.rating import PlayerRating
+from app.models.match_version import MatchVersion
+from app.models.head_to_head import HeadToHead
+from app.models.partnership import Partnership
 from datetime import datetime
 
 class Match:
+    # Matches columns, in constructor order
+    FIELDS = (
+        'match_id', 'match_type', 'match_date', 'reporter_user_id',
+        'team1_player1_id', 'team1_player2_id', 'team2_player1_id', 'team2_player2_id',
+        'team1_score', 'team2_score', 'winner_team', 'is_bagel',
+        'created_at', 'updated_at'
+    )
+    __slots__ = FIELDS
+    # Fields returned by the API, in response order
+    PUBLIC_FIELDS = FIELDS[:-1]
+    
+    # Rows per multi-row INSERT; 11 parameters each keeps us under SQL Server's 2100 limit
+    BULK_INSERT_CHUNK_SIZE = 150
+    # MatchParticipants rows per INSERT (4 parameters each)
+    PARTICIPANT_CHUNK_SIZE = 500
+    # Columns written on insert, in _insert_params() order
+    INSERT_COLUMNS = [
+        'match_type', 'match_date', 'reporter_user_id',
+        'team1_player1_id', 'team1_player2_id',
+        'team2_player1_id', 'team2_player2_id',
+        'team1_score', 'team2_score', 'winner_team', 'is_bagel'
+    ]
+    
     def __init__(self, match_id=None, match_type=None, match_date=None, 
                  reporter_user_id=None, team1_player1_id=None, team1_player2_id=None,
                  team2_player1_id=None, team2_player2_id=None, team1_score=None,
@@ -27,83 +55,76 @@ class Match:
     def find_by_id(match_id):
         """Find a match by ID."""
         query = "SELECT * FROM Matches WHERE match_id = ?"
-        result = execute_query(query, (match_id,))
-        if result:
-            match_data = result[0]
-            return Match(
-                match_id=match_data.match_id,
-                match_type=match_data.match_type,
-                match_date=match_data.match_date,
-                reporter_user_id=match_data.reporter_user_id,
-                team1_player1_id=match_data.team1_player1_id,
-                team1_player2_id=match_data.team1_player2_id,
-                team2_player1_id=match_data.team2_player1_id,
-                team2_player2_id=match_data.team2_player2_id,
-                team1_score=match_data.team1_score,
-                team2_score=match_data.team2_score,
-                winner_team=match_data.winner_team,
-                is_bagel=match_data.is_bagel,
-                created_at=match_data.created_at,
-                updated_at=match_data.updated_at
-            )
-        return None
+        result = query_records(Match.mapper, query, (match_id,))
+        return result[0] if result else None
     
     @staticmethod
-    def get_matches_by_user(user_id, limit=10):
-        """Get matches where user is a player, ordered by most recent."""
-        query = """
-            SELECT TOP ? * FROM Matches 
-            WHERE team1_player1_id = ? 
-               OR team1_player2_id = ? 
-               OR team2_player1_id = ? 
-               OR team2_player2_id = ? 
-            ORDER BY match_date DESC
+    def get_matches_by_user(user_id, limit=10, before=None, columnar=False):
+        """Get matches where user is a player, ordered by most recent.
+        `before` is an optional (match_date, match_id) keyset position to page from.
+        Returns dicts, or PUBLIC_FIELDS tuples when `columnar` is set.
         """
-        result = execute_query(query, (limit, user_id, user_id, user_id, user_id))
-        return [
-            {
-                "match_id": row.match_id,
-                "match_type": row.match_type,
-                "match_date": str(row.match_date),
-                "team1_player1_id": row.team1_player1_id,
-                "team1_player2_id": row.team1_player2_id,
-                "team2_player1_id": row.team2_player1_id,
-                "team2_player2_id": row.team2_player2_id,
-                "team1_score": row.team1_score,
-                "team2_score": row.team2_score,
-                "winner_team": row.winner_team,
-                "is_bagel": row.is_bagel,
-                "created_at": str(row.created_at)
-            }
-            for row in result
-        ]
+        # Seek the (user_id, match_date) index on MatchParticipants instead of
+        # OR-ing the four player columns on Matches
+        dialect = get_dialect()
+        params = [user_id]
+        keyset = ""
+        if before:
+            date = dialect.datetime_param
+            keyset = f"AND (mp.match_date < {date} OR (mp.match_date = {date} AND mp.match_id < ?))"
+            params.extend([before[0], before[0], before[1]])
+        params.append(limit)
+        query = f"""
+            SELECT m.* FROM MatchParticipants mp
+            JOIN Matches m ON m.match_id = mp.match_id
+            WHERE mp.user_id = ? {keyset}
+            ORDER BY mp.match_date DESC, mp.match_id DESC
+            {dialect.limit}
+        """
+        return query_records(Match.mapper, query, tuple(params), serialize=True, columnar=columnar)
     
     @staticmethod
-    def get_all_matches(limit=50):
-        """Get all matches, ordered by most recent."""
+    def get_all_matches(limit=50, before=None, columnar=False):
+        """Get all matches, ordered by most recent.
+        `before` is an optional (match_date, match_id) keyset position to page from.
+        Returns dicts, or PUBLIC_FIELDS tuples when `columnar` is set.
+        """
+        dialect = get_dialect()
+        params = []
+        keyset = ""
+        if before:
+            date = dialect.datetime_param
+            keyset = f"WHERE match_date < {date} OR (match_date = {date} AND match_id < ?)"
+            params.extend([before[0], before[0], before[1]])
+        params.append(limit)
         query = f"""
-            SELECT TOP {limit} * FROM Matches 
-            ORDER BY match_date DESC
+            SELECT * FROM Matches {keyset}
+            ORDER BY match_date DESC, match_id DESC
+            {dialect.limit}
         """
-        result = execute_query(query)
-        return [
-            {
-                "match_id": row.match_id,
-                "match_type": row.match_type,
-                "match_date": str(row.match_date),
-                "reporter_user_id": row.reporter_user_id,
-                "team1_player1_id": row.team1_player1_id,
-                "team1_player2_id": row.team1_player2_id,
-                "team2_player1_id": row.team2_player1_id,
-                "team2_player2_id": row.team2_player2_id,
-                "team1_score": row.team1_score,
-                "team2_score": row.team2_score,
-                "winner_team": row.winner_team,
-                "is_bagel": row.is_bagel,
-                "created_at": str(row.created_at)
-            }
-            for row in result
-        ]
+        return query_records(Match.mapper, query, tuple(params), serialize=True, columnar=columnar)
+    
+    @staticmethod
+    def get_matches_after(match_id, limit=100):
+        """Get matches with an ID greater than match_id, oldest first, as dicts.
+        Used to replay the match feed to reconnecting clients.
+        
+        match_id is not commit order on SQL Server: an identity value is taken
+        at insert but only becomes visible at commit, so a slow transaction can
+        commit a lower ID after a higher one was already returned. Resuming
+        after that higher ID skips the late match. SQLite assigns IDs under its
+        single write lock, so there the order holds.
+        """
+        query = f"""
+            SELECT * FROM Matches WHERE match_id > ?
+            ORDER BY match_id
+            {get_dialect().limit}
+        """
+        return query_records(Match.mapper, query, (match_id, limit), serialize=True)
+    
+    def to_dict(self):
+        """Serialize the match for API responses."""
+        return Match.mapper.to_dict(self)
     
     def calculate_winner_and_bagel(self):
         """Calculate the winner team and whether the match was a bagel."""
@@ -119,69 +140,186 @@ class Match:
                         (self.team1_score == 0 and self.team2_score == 6)
     
     def save(self):
-        """Save match to database."""
+        """Save match to database.
+        Raises LookupError when editing (match_id set) a match that does not exist.
+        """
         # Calculate winner and bagel status before saving
         self.calculate_winner_and_bagel()
+        dialect = get_dialect()
+        inserting = not self.match_id
         
-        if self.match_id:
-            # Update existing match
-            query = """
-                UPDATE Matches 
-                SET match_type = ?, match_date = ?, reporter_user_id = ?,
-                    team1_player1_id = ?, team1_player2_id = ?, 
-                    team2_player1_id = ?, team2_player2_id = ?,
-                    team1_score = ?, team2_score = ?, 
-                    winner_team = ?, is_bagel = ?, updated_at = GETDATE()
-                WHERE match_id = ?
-            """
-            execute_query(query, (
-                self.match_type, self.match_date, self.reporter_user_id,
-                self.team1_player1_id, self.team1_player2_id,
-                self.team2_player1_id, self.team2_player2_id,
-                self.team1_score, self.team2_score,
-                self.winner_team, self.is_bagel, self.match_id
-            ), fetch=False)
-        else:
-            # Insert new match
-            conn = get_db_connection()
+        with db_connection() as conn:
             cursor = conn.cursor()
             
             try:
-                # Insert the match
-                insert_query = """
-                    INSERT INTO Matches (
-                        match_type, match_date, reporter_user_id,
-                        team1_player1_id, team1_player2_id, 
-                        team2_player1_id, team2_player2_id,
-                        team1_score, team2_score, winner_team, is_bagel
+                stat_deltas = {}
+                pair_deltas = {}
+                partnership_deltas = {}
+                touched_user_ids = []
+                if self.match_id:
+                    # Take back the previous version's contribution to PlayerStats
+                    cursor.execute(
+                        f"SELECT * FROM Matches {dialect.table_hint('UPDLOCK')} WHERE match_id = ?",
+                        (self.match_id,)
                     )
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """
-                cursor.execute(insert_query, (
-                    self.match_type, self.match_date, self.reporter_user_id,
-                    self.team1_player1_id, self.team1_player2_id,
-                    self.team2_player1_id, self.team2_player2_id,
-                    self.team1_score, self.team2_score,
-                    self.winner_team, self.is_bagel
-                ))
+                    previous = Match.mapper.map_one(cursor.description, cursor.fetchone())
+                    if previous is None:
+                        raise LookupError(f"Match {self.match_id} does not exist")
+                    PlayerStats.deltas([previous], sign=-1, into=stat_deltas)
+                    HeadToHead.deltas([previous], sign=-1, into=pair_deltas)
+                    Partnership.deltas([previous], sign=-1, into=partnership_deltas)
+                    touched_user_ids += [row[1] for row in previous.participant_rows()]
+                    
+                    # Update existing match
+                    query = """
+                        UPDATE Matches 
+                        SET match_type = ?, match_date = ?, reporter_user_id = ?,
+                            team1_player1_id = ?, team1_player2_id = ?, 
+                            team2_player1_id = ?, team2_player2_id = ?,
+                            team1_score = ?, team2_score = ?, 
+                            winner_team = ?, is_bagel = ?, updated_at = CURRENT_TIMESTAMP
+                        WHERE match_id = ?
+                    """
+                    cursor.execute(query, self._insert_params() + (self.match_id,))
+                    
+                    # Players or date may have changed, so rewrite the participant rows
+                    cursor.execute("DELETE FROM MatchParticipants WHERE match_id = ?", (self.match_id,))
+                else:
+                    # Insert new match, reading back the ID and defaults in the same statement
+                    row = insert_returning(
+                        cursor, 'Matches', Match.INSERT_COLUMNS, self._insert_params(),
+                        ['match_id', 'created_at', 'updated_at']
+                    )
+                    self.match_id = int(row.match_id)
+                    self.created_at = row.created_at
+                    self.updated_at = row.updated_at
+                    
+                    # Ratings are order-dependent, so only new matches are rated here
+                    PlayerRating.apply(cursor, [self])
                 
-                # Get the ID
-                cursor.execute("SELECT SCOPE_IDENTITY() AS match_id")
-                result = cursor.fetchone()
-                self.match_id = result.match_id
+                Match._insert_participants(cursor, [self])
+                PlayerStats.apply(cursor, PlayerStats.deltas([self], into=stat_deltas))
+                # Taking back a previous version can leave last_played pointing at it
+                edited_pairs = list(pair_deltas)
+                HeadToHead.apply(cursor, HeadToHead.deltas([self], into=pair_deltas))
+                HeadToHead.refresh_last_played(cursor, edited_pairs)
+                edited_partnerships = list(partnership_deltas)
+                Partnership.apply(cursor, Partnership.deltas([self], into=partnership_deltas))
+                Partnership.refresh_last_played(cursor, edited_partnerships)
+                # Players removed by an edit see their match lists change too
+                touched_user_ids += [row[1] for row in self.participant_rows()]
+                MatchVersion.bump(cursor, touched_user_ids)
                 
                 conn.commit()
-            except pyodbc.IntegrityError as e:
+            except dialect.integrity_error as e:
                 conn.rollback()
-                error_msg = str(e)
-                if "FOREIGN KEY constraint" in error_msg:
+                if inserting:
+                    self.match_id = None
+                if dialect.is_foreign_key_violation(e):
                     raise ValueError("One or more players do not exist in the system")
                 raise e
             except Exception as e:
                 conn.rollback()
+                # Nothing was inserted, so a retry must insert again rather than edit
+                if inserting:
+                    self.match_id = None
                 raise e
             finally:
                 cursor.close()
-                conn.close()
         
-        return self
\ No newline at end of file
+        return self
+    
+    def _insert_params(self):
+        """Parameters for inserting this match, in INSERT column order."""
+        return (
+            self.match_type, self.match_date, self.reporter_user_id,
+            self.team1_player1_id, self.team1_player2_id,
+            self.team2_player1_id, self.team2_player2_id,
+            self.team1_score, self.team2_score,
+            self.winner_team, self.is_bagel
+        )
+    
+    def participant_rows(self):
+        """(match_id, user_id, team, match_date) rows for each player in this match."""
+        players = [
+            (self.team1_player1_id, 1),
+            (self.team1_player2_id, 1),
+            (self.team2_player1_id, 2),
+            (self.team2_player2_id, 2)
+        ]
+        return [
+            (self.match_id, user_id, team, self.match_date)
+            for user_id, team in players
+            if user_id is not None
+        ]
+    
+    @staticmethod
+    def _insert_participants(cursor, matches):
+        """Write MatchParticipants rows for saved matches on the caller's transaction."""
+        rows = [row for match in matches for row in match.participant_rows()]
+        for start in range(0, len(rows), Match.PARTICIPANT_CHUNK_SIZE):
+            chunk = rows[start:start + Match.PARTICIPANT_CHUNK_SIZE]
+            values = ", ".join("(?, ?, ?, ?)" for _ in chunk)
+            cursor.execute(
+                f"INSERT INTO MatchParticipants (match_id, user_id, team, match_date) VALUES {values}",
+                [param for row in chunk for param in row]
+            )
+    
+    @staticmethod
+    def save_many(matches):
+        """Insert new matches in a single transaction using multi-row INSERTs.
+        Sets match_id on each match; either every match is saved or none are.
+        """
+        for match in matches:
+            match.calculate_winner_and_bagel()
+        dialect = get_dialect()
+        
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            
+            try:
+                for start in range(0, len(matches), Match.BULK_INSERT_CHUNK_SIZE):
+                    chunk = matches[start:start + Match.BULK_INSERT_CHUNK_SIZE]
+                    insert_query = dialect.insert(
+                        'Matches', Match.INSERT_COLUMNS, len(chunk),
+                        returning=['match_id', 'created_at', 'updated_at']
+                    )
+                    params = [param for match in chunk for param in match._insert_params()]
+                    cursor.execute(insert_query, params)
+                    
+                    # Identities are assigned in VALUES order, but neither engine
+                    # promises to return them in that order
+                    rows = sorted(cursor.fetchall(), key=lambda row: row.match_id)
+                    for match, row in zip(chunk, rows):
+                        match.match_id = int(row.match_id)
+                        match.created_at = row.created_at
+                        match.updated_at = row.updated_at
+                
+                Match._insert_participants(cursor, matches)
+                PlayerStats.apply(cursor, PlayerStats.deltas(matches))
+                HeadToHead.apply(cursor, HeadToHead.deltas(matches))
+                Partnership.apply(cursor, Partnership.deltas(matches))
+                PlayerRating.apply(cursor, matches)
+                MatchVersion.bump(cursor, [
+                    row[1] for match in matches for row in match.participant_rows()
+                ])
+                
+                conn.commit()
+            except dialect.integrity_error as e:
+                conn.rollback()
+                for match in matches:
+                    match.match_id = None
+                if dialect.is_foreign_key_violation(e):
+                    raise ValueError("One or more players do not exist in the system")
+                raise e
+            except Exception as e:
+                conn.rollback()
+                for match in matches:
+                    match.match_id = None
+                raise e
+            finally:
+                cursor.close()
+        
+        return matches
+
+Match.mapper = RowMapper(Match)
@@ -0,0 +1,43 @@
+from app.utils.db import execute_query, get_dialect
+
+class MatchVersion:
+    """Change counters for match data, used to validate cached responses.
+    
+    The 'all' scope is bumped by every match write and 'user:<id>' by writes
+    to matches that player is (or was) in. Versions are bumped on the
+    writer's transaction, so every worker sees the same numbers.
+    """
+    GLOBAL_SCOPE = 'all'
+    
+    @staticmethod
+    def user_scope(user_id):
+        return f"user:{user_id}"
+    
+    @staticmethod
+    def bump(cursor, user_ids):
+        """Increment the global version and those of `user_ids` on the caller's transaction."""
+        scopes = [MatchVersion.GLOBAL_SCOPE] + [
+            MatchVersion.user_scope(user_id) for user_id in sorted(set(user_ids))
+        ]
+        dialect = get_dialect()
+        query = dialect.upsert(
+            'MatchVersions', ['scope'], ['scope', 'version'], len(scopes),
+            {'version': "{target}.version + {source}.version", 'updated_at': dialect.utc_now}
+        )
+        cursor.execute(query, [param for scope in scopes for param in (scope, 1)])
+    
+    @staticmethod
+    def current(scopes):
+        """Return ({scope: version}, last_modified) for `scopes`.
+        Scopes that were never written are version 0; last_modified is the
+        newest change among them (naive UTC), or None.
+        """
+        placeholders = ", ".join("?" for _ in scopes)
+        query = f"SELECT scope, version, updated_at FROM MatchVersions WHERE scope IN ({placeholders})"
+        versions = {scope: 0 for scope in scopes}
+        last_modified = None
+        for row in execute_query(query, tuple(scopes)):
+            versions[row.scope] = row.version
+            if last_modified is None or row.updated_at > last_modified:
+                last_modified = row.updated_at
+        return versions, last_modified
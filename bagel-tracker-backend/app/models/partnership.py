@@ -0,0 +1,238 @@
+from app.utils.db import execute_query, db_connection, get_dialect
+
+class Partnership:
+    """Doubles records of pairs of partners.
+    
+    A partnership is keyed by its two players in canonical order
+    (player_low < player_high), so the same pair on either team, listed in
+    either slot, is one row. Counters are the team's results, shared by both
+    partners.
+    """
+    # Counters kept per (player_low, player_high), in column order
+    COUNTERS = ['matches_played', 'wins', 'losses', 'bagels_given', 'bagels_received']
+    # Rows per upsert; 8 parameters each keeps us under SQL Server's 2100 limit
+    MERGE_CHUNK_SIZE = 250
+    # Matches read per batch by rebuild()
+    REBUILD_CHUNK_SIZE = 5000
+    # Upsert assignments: add each delta and keep the latest match date
+    MERGE_UPDATES = dict(
+        {counter: f"{{target}}.{counter} + {{source}}.{counter}" for counter in COUNTERS},
+        last_played="""CASE WHEN {target}.last_played IS NULL OR {source}.last_played > {target}.last_played
+                            THEN {source}.last_played ELSE {target}.last_played END""",
+        updated_at="CURRENT_TIMESTAMP"
+    )
+    
+    @staticmethod
+    def key(player_a, player_b):
+        """Canonical (player_low, player_high) key of a partnership."""
+        return (player_a, player_b) if player_a < player_b else (player_b, player_a)
+    
+    @staticmethod
+    def teams(match):
+        """(partnership key, team) for each full two-player team in a doubles match."""
+        if match.match_type != 'doubles':
+            return []
+        teams = [
+            ((match.team1_player1_id, match.team1_player2_id), 1),
+            ((match.team2_player1_id, match.team2_player2_id), 2)
+        ]
+        return [
+            (Partnership.key(*players), team)
+            for players, team in teams
+            if None not in players
+        ]
+    
+    @staticmethod
+    def deltas(matches, sign=1, into=None):
+        """Accumulate the changes a set of matches makes to Partnerships.
+        Use sign=-1 to take back the contribution of a match's previous version.
+        Returns a dict of (player_low, player_high) -> counter deltas followed
+        by the latest match date added (None if only removals).
+        """
+        totals = into if into is not None else {}
+        for match in matches:
+            for key, team in Partnership.teams(match):
+                won = match.winner_team == team
+                lost = match.winner_team is not None and not won
+                row = totals.setdefault(key, [0] * len(Partnership.COUNTERS) + [None])
+                row[0] += sign
+                row[1] += sign if won else 0
+                row[2] += sign if lost else 0
+                row[3] += sign if match.is_bagel and won else 0
+                row[4] += sign if match.is_bagel and lost else 0
+                if sign > 0 and (row[5] is None or match.match_date > row[5]):
+                    row[5] = match.match_date
+        return totals
+    
+    @staticmethod
+    def apply(cursor, deltas):
+        """Add deltas to Partnerships on the caller's transaction."""
+        rows = [
+            (low, high, *values)
+            for (low, high), values in deltas.items()
+            if any(values[:-1]) or values[-1] is not None
+        ]
+        columns = ['player_low', 'player_high'] + Partnership.COUNTERS + ['last_played']
+        for start in range(0, len(rows), Partnership.MERGE_CHUNK_SIZE):
+            chunk = rows[start:start + Partnership.MERGE_CHUNK_SIZE]
+            query = get_dialect().upsert(
+                'Partnerships', ['player_low', 'player_high'], columns, len(chunk),
+                Partnership.MERGE_UPDATES
+            )
+            cursor.execute(query, [param for row in chunk for param in row])
+    
+    @staticmethod
+    def refresh_last_played(cursor, keys):
+        """Recompute last_played for (player_low, player_high) keys on the
+        caller's transaction, after an edit may have moved or removed a
+        partnership's latest match.
+        """
+        for low, high in keys:
+            cursor.execute("""
+                UPDATE Partnerships SET last_played = (
+                    SELECT MAX(m.match_date)
+                    FROM MatchParticipants a
+                    JOIN MatchParticipants b ON b.match_id = a.match_id AND b.team = a.team
+                    JOIN Matches m ON m.match_id = a.match_id
+                    WHERE a.user_id = ? AND b.user_id = ? AND m.match_type = 'doubles'
+                )
+                WHERE player_low = ? AND player_high = ?
+            """, (low, high, low, high))
+    
+    # A user's partnerships from either side of the key, with partner names;
+    # binds user_id, user_id, min_matches
+    PARTNERS_QUERY = """
+        SELECT p.partner_id, u.name, p.matches_played, p.wins, p.losses,
+               p.bagels_given, p.bagels_received, p.last_played
+        FROM (
+            SELECT player_high AS partner_id, matches_played, wins, losses,
+                   bagels_given, bagels_received, last_played
+            FROM Partnerships WHERE player_low = ?
+            UNION ALL
+            SELECT player_low, matches_played, wins, losses,
+                   bagels_given, bagels_received, last_played
+            FROM Partnerships WHERE player_high = ?
+        ) AS p
+        JOIN Users u ON u.user_id = p.partner_id
+        WHERE p.matches_played >= ?
+    """
+    
+    @staticmethod
+    def _to_dict(row):
+        return {
+            "partner_id": row.partner_id,
+            "name": row.name,
+            **{counter: getattr(row, counter) for counter in Partnership.COUNTERS},
+            "win_rate": round(row.wins / row.matches_played, 4),
+            "last_played": row.last_played
+        }
+    
+    @staticmethod
+    def find_partners(user_id, limit=5, min_matches=3, worst=False):
+        """Get a user's partners ranked by win rate, best first (or worst first).
+        Only partnerships with at least `min_matches` matches are ranked;
+        ties go to the partnership with more matches.
+        """
+        order = "ASC" if worst else "DESC"
+        query = f"""
+            {Partnership.PARTNERS_QUERY}
+            ORDER BY p.wins * 1.0 / p.matches_played {order}, p.matches_played DESC, p.partner_id
+            {get_dialect().limit}
+        """
+        result = execute_query(query, (user_id, user_id, max(min_matches, 1), limit))
+        return [Partnership._to_dict(row) for row in result]
+    
+    @staticmethod
+    def find_best_and_worst(user_id, limit=5, min_matches=3):
+        """Get a user's best and worst partners in one query, each list ranked
+        as find_partners ranks it. A player has few enough partners that every
+        qualifying partnership is read and both ends are taken here.
+        """
+        result = execute_query(Partnership.PARTNERS_QUERY, (user_id, user_id, max(min_matches, 1)))
+        
+        # Ties go to the partnership with more matches, then the lower partner_id
+        best = sorted(result, key=lambda row: (-row.wins / row.matches_played, -row.matches_played, row.partner_id))
+        worst = sorted(result, key=lambda row: (row.wins / row.matches_played, -row.matches_played, row.partner_id))
+        return (
+            [Partnership._to_dict(row) for row in best[:limit]],
+            [Partnership._to_dict(row) for row in worst[:limit]]
+        )
+    
+    @staticmethod
+    def rebuild():
+        """Replace Partnerships with aggregates recomputed from Matches.
+        
+        Doubles matches are read in match_id order, REBUILD_CHUNK_SIZE at a
+        time, and each chunk's deltas are upserted before the next is read, so
+        memory stays bounded however large Matches grows. Everything happens
+        in one transaction. Returns the number of matches processed.
+        """
+        from app.models.match import Match
+        
+        dialect = get_dialect()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(f"DELETE FROM Partnerships {dialect.table_hint('TABLOCKX')}")
+                processed = 0
+                after = 0
+                while True:
+                    cursor.execute(f"""
+                        SELECT * FROM Matches
+                        WHERE match_type = 'doubles' AND match_id > ?
+                        ORDER BY match_id
+                        {dialect.limit}
+                    """, (after, Partnership.REBUILD_CHUNK_SIZE))
+                    matches = Match.mapper.map(cursor.description, cursor.fetchall())
+                    if not matches:
+                        break
+                    Partnership.apply(cursor, Partnership.deltas(matches))
+                    processed += len(matches)
+                    after = matches[-1].match_id
+                conn.commit()
+                return processed
+            except Exception as e:
+                conn.rollback()
+                raise e
+            finally:
+                cursor.close()
+    
+    # Recompute every partnership from Matches (via MatchParticipants), for checks
+    AGGREGATE_QUERY = """
+        SELECT a.user_id AS player_low, b.user_id AS player_high,
+            COUNT(*) AS matches_played,
+            SUM(CASE WHEN m.winner_team = a.team THEN 1 ELSE 0 END) AS wins,
+            SUM(CASE WHEN m.winner_team <> a.team THEN 1 ELSE 0 END) AS losses,
+            SUM(CASE WHEN m.is_bagel = 1 AND m.winner_team = a.team THEN 1 ELSE 0 END) AS bagels_given,
+            SUM(CASE WHEN m.is_bagel = 1 AND m.winner_team <> a.team THEN 1 ELSE 0 END) AS bagels_received,
+            MAX(m.match_date) AS last_played
+        FROM MatchParticipants a
+        JOIN MatchParticipants b
+            ON b.match_id = a.match_id AND b.team = a.team AND b.user_id > a.user_id
+        JOIN Matches m ON m.match_id = a.match_id
+        WHERE m.match_type = 'doubles'
+        GROUP BY a.user_id, b.user_id
+    """
+    
+    @staticmethod
+    def find_mismatches():
+        """Compare Partnerships with a fresh aggregate without writing anything.
+        Returns (player_low, player_high) keys whose stored row is wrong or missing.
+        """
+        query = f"""
+            SELECT COALESCE(fresh.player_low, stored.player_low) AS player_low,
+                   COALESCE(fresh.player_high, stored.player_high) AS player_high
+            FROM ({Partnership.AGGREGATE_QUERY}) AS fresh
+            FULL OUTER JOIN (
+                SELECT * FROM Partnerships WHERE matches_played <> 0
+            ) AS stored
+                ON stored.player_low = fresh.player_low AND stored.player_high = fresh.player_high
+            WHERE fresh.player_low IS NULL OR stored.player_low IS NULL
+               OR fresh.matches_played <> stored.matches_played
+               OR fresh.wins <> stored.wins
+               OR fresh.losses <> stored.losses
+               OR fresh.bagels_given <> stored.bagels_given
+               OR fresh.bagels_received <> stored.bagels_received
+               OR {get_dialect().is_distinct('fresh.last_played', 'stored.last_played')}
+        """
+        return [(row.player_low, row.player_high) for row in execute_query(query)]
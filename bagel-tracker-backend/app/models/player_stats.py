@@ -0,0 +1,130 @@
+from app.utils.db import execute_query, db_connection, get_dialect
+
+class PlayerStats:
+    # Counters kept per (user_id, match_type), in column order
+    COUNTERS = ['matches_played', 'wins', 'losses', 'bagels_given', 'bagels_received']
+    # Rows per upsert; 7 parameters each keeps us under SQL Server's 2100 limit
+    MERGE_CHUNK_SIZE = 250
+    # Upsert assignments: add each delta to the stored counter
+    MERGE_UPDATES = dict(
+        {counter: f"{{target}}.{counter} + {{source}}.{counter}" for counter in COUNTERS},
+        updated_at="CURRENT_TIMESTAMP"
+    )
+    
+    @staticmethod
+    def deltas(matches, sign=1, into=None):
+        """Accumulate the counter changes a set of matches makes to PlayerStats.
+        Use sign=-1 to take back the contribution of a match's previous version.
+        Returns a dict of (user_id, match_type) -> list of counter deltas.
+        """
+        totals = into if into is not None else {}
+        for match in matches:
+            for _, user_id, team, _ in match.participant_rows():
+                won = match.winner_team == team
+                lost = match.winner_team is not None and not won
+                row = totals.setdefault((user_id, match.match_type), [0] * len(PlayerStats.COUNTERS))
+                row[0] += sign
+                row[1] += sign if won else 0
+                row[2] += sign if lost else 0
+                row[3] += sign if match.is_bagel and won else 0
+                row[4] += sign if match.is_bagel and lost else 0
+        return totals
+    
+    @staticmethod
+    def apply(cursor, deltas):
+        """Add counter deltas to PlayerStats on the caller's transaction."""
+        rows = [
+            (user_id, match_type, *counters)
+            for (user_id, match_type), counters in deltas.items()
+            if any(counters)
+        ]
+        columns = ['user_id', 'match_type'] + PlayerStats.COUNTERS
+        for start in range(0, len(rows), PlayerStats.MERGE_CHUNK_SIZE):
+            chunk = rows[start:start + PlayerStats.MERGE_CHUNK_SIZE]
+            query = get_dialect().upsert(
+                'PlayerStats', ['user_id', 'match_type'], columns, len(chunk), PlayerStats.MERGE_UPDATES
+            )
+            cursor.execute(query, [param for row in chunk for param in row])
+    
+    @staticmethod
+    def find_by_user(user_id):
+        """Get a user's stats split by match type, plus overall totals."""
+        query = """
+            SELECT match_type, matches_played, wins, losses, bagels_given, bagels_received
+            FROM PlayerStats
+            WHERE user_id = ?
+        """
+        result = execute_query(query, (user_id,))
+        
+        empty = {counter: 0 for counter in PlayerStats.COUNTERS}
+        stats = {"singles": dict(empty), "doubles": dict(empty), "totals": dict(empty)}
+        for row in result:
+            for counter in PlayerStats.COUNTERS:
+                value = getattr(row, counter)
+                stats[row.match_type][counter] = value
+                stats["totals"][counter] += value
+        
+        for summary in stats.values():
+            played = summary["matches_played"]
+            summary["win_rate"] = round(summary["wins"] / played, 4) if played else None
+        return stats
+    
+    # Recompute every counter from Matches (via MatchParticipants)
+    AGGREGATE_QUERY = """
+        SELECT mp.user_id, m.match_type,
+            COUNT(*) AS matches_played,
+            SUM(CASE WHEN m.winner_team = mp.team THEN 1 ELSE 0 END) AS wins,
+            SUM(CASE WHEN m.winner_team <> mp.team THEN 1 ELSE 0 END) AS losses,
+            SUM(CASE WHEN m.is_bagel = 1 AND m.winner_team = mp.team THEN 1 ELSE 0 END) AS bagels_given,
+            SUM(CASE WHEN m.is_bagel = 1 AND m.winner_team <> mp.team THEN 1 ELSE 0 END) AS bagels_received
+        FROM MatchParticipants mp
+        JOIN Matches m ON m.match_id = mp.match_id
+        GROUP BY mp.user_id, m.match_type
+    """
+    
+    @staticmethod
+    def rebuild():
+        """Replace PlayerStats with aggregates recomputed from Matches.
+        Returns the number of rows written.
+        """
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(f"DELETE FROM PlayerStats {get_dialect().table_hint('TABLOCKX')}")
+                cursor.execute(f"""
+                    INSERT INTO PlayerStats (
+                        user_id, match_type, matches_played, wins, losses,
+                        bagels_given, bagels_received
+                    )
+                    {PlayerStats.AGGREGATE_QUERY}
+                """)
+                rows = cursor.rowcount
+                conn.commit()
+                return rows
+            except Exception as e:
+                conn.rollback()
+                raise e
+            finally:
+                cursor.close()
+    
+    @staticmethod
+    def find_mismatches():
+        """Compare PlayerStats with a fresh aggregate without writing anything.
+        Returns (user_id, match_type) keys whose stored counters are wrong or missing.
+        """
+        query = f"""
+            SELECT COALESCE(fresh.user_id, stored.user_id) AS user_id,
+                   COALESCE(fresh.match_type, stored.match_type) AS match_type
+            FROM ({PlayerStats.AGGREGATE_QUERY}) AS fresh
+            FULL OUTER JOIN (
+                SELECT * FROM PlayerStats WHERE matches_played <> 0
+            ) AS stored
+                ON stored.user_id = fresh.user_id AND stored.match_type = fresh.match_type
+            WHERE fresh.user_id IS NULL OR stored.user_id IS NULL
+               OR fresh.matches_played <> stored.matches_played
+               OR fresh.wins <> stored.wins
+               OR fresh.losses <> stored.losses
+               OR fresh.bagels_given <> stored.bagels_given
+               OR fresh.bagels_received <> stored.bagels_received
+        """
+        return [(row.user_id, row.match_type) for row in execute_query(query)]
@@ -0,0 +1,160 @@
+from app.utils.db import execute_query, db_connection, get_dialect
+
+class PlayerRating:
+    """Elo ratings per (user_id, match_type).
+
+    Singles and doubles are rated separately. In doubles a team is rated as
+    the mean of its two partners, and both partners move by the team's delta.
+    Ratings depend on match order, so edits to existing matches are only
+    reflected after `python -m app.utils.rebuild ratings`.
+    """
+    INITIAL_RATING = 1500.0
+    K_FACTOR = 32.0
+    # Rows per upsert; 4 parameters each keeps us under SQL Server's 2100 limit
+    MERGE_CHUNK_SIZE = 500
+    
+    @staticmethod
+    def expected_score(rating, opponent_rating):
+        """Probability that a side rated `rating` beats one rated `opponent_rating`."""
+        return 1.0 / (1.0 + 10 ** ((opponent_rating - rating) / 400.0))
+    
+    @staticmethod
+    def rate(ratings, match):
+        """Apply one match to a {(user_id, match_type): rating} dict in place.
+        Returns the (user_id, match_type) keys that were updated.
+        """
+        team1 = [(p, match.match_type) for p in (match.team1_player1_id, match.team1_player2_id) if p is not None]
+        team2 = [(p, match.match_type) for p in (match.team2_player1_id, match.team2_player2_id) if p is not None]
+        
+        team1_rating = sum(ratings.get(key, PlayerRating.INITIAL_RATING) for key in team1) / len(team1)
+        team2_rating = sum(ratings.get(key, PlayerRating.INITIAL_RATING) for key in team2) / len(team2)
+        
+        # A tie (no winner) scores half a win for each side
+        actual = {1: 1.0, 2: 0.0}.get(match.winner_team, 0.5)
+        delta = PlayerRating.K_FACTOR * (actual - PlayerRating.expected_score(team1_rating, team2_rating))
+        
+        for key in team1:
+            ratings[key] = ratings.get(key, PlayerRating.INITIAL_RATING) + delta
+        for key in team2:
+            ratings[key] = ratings.get(key, PlayerRating.INITIAL_RATING) - delta
+        return team1 + team2
+    
+    @staticmethod
+    def apply(cursor, matches):
+        """Rate newly inserted matches, in order, on the caller's transaction."""
+        keys = {
+            (user_id, match.match_type)
+            for match in matches
+            for _, user_id, _, _ in match.participant_rows()
+        }
+        if not keys:
+            return
+        
+        # Lock the current ratings of everyone involved so concurrent writers serialize
+        ratings = {}
+        for match_type in {match_type for _, match_type in keys}:
+            user_ids = [user_id for user_id, key_type in keys if key_type == match_type]
+            placeholders = ", ".join("?" for _ in user_ids)
+            cursor.execute(f"""
+                SELECT user_id, rating FROM PlayerRatings {get_dialect().table_hint('UPDLOCK', 'HOLDLOCK')}
+                WHERE match_type = ? AND user_id IN ({placeholders})
+            """, [match_type] + user_ids)
+            for row in cursor.fetchall():
+                ratings[(row.user_id, match_type)] = row.rating
+        
+        counts = {}
+        for match in matches:
+            for key in PlayerRating.rate(ratings, match):
+                counts[key] = counts.get(key, 0) + 1
+        
+        PlayerRating._merge(cursor, [
+            (user_id, match_type, ratings[(user_id, match_type)], count)
+            for (user_id, match_type), count in counts.items()
+        ], replace_counts=False)
+    
+    @staticmethod
+    def _merge(cursor, rows, replace_counts):
+        """Upsert (user_id, match_type, rating, matches_rated) rows."""
+        updates = {
+            'rating': "{source}.rating",
+            'matches_rated': "{source}.matches_rated" if replace_counts else
+                             "{target}.matches_rated + {source}.matches_rated",
+            'updated_at': "CURRENT_TIMESTAMP"
+        }
+        columns = ['user_id', 'match_type', 'rating', 'matches_rated']
+        for start in range(0, len(rows), PlayerRating.MERGE_CHUNK_SIZE):
+            chunk = rows[start:start + PlayerRating.MERGE_CHUNK_SIZE]
+            query = get_dialect().upsert(
+                'PlayerRatings', ['user_id', 'match_type'], columns, len(chunk), updates
+            )
+            cursor.execute(query, [param for row in chunk for param in row])
+    
+    @staticmethod
+    def find_by_user(user_id):
+        """Get a user's singles and doubles ratings, defaulting unrated types."""
+        query = """
+            SELECT match_type, rating, matches_rated
+            FROM PlayerRatings
+            WHERE user_id = ?
+        """
+        ratings = {
+            match_type: {"rating": PlayerRating.INITIAL_RATING, "matches_rated": 0}
+            for match_type in ('singles', 'doubles')
+        }
+        for row in execute_query(query, (user_id,)):
+            ratings[row.match_type] = {
+                "rating": round(row.rating, 1),
+                "matches_rated": row.matches_rated
+            }
+        return ratings
+    
+    @staticmethod
+    def all_ratings():
+        """Return every stored rating as {(user_id, match_type): rating}."""
+        result = execute_query("SELECT user_id, match_type, rating FROM PlayerRatings")
+        return {(row.user_id, row.match_type): row.rating for row in result}
+    
+    @staticmethod
+    def load_history(batch_size=10000):
+        """Yield every match's rating inputs in chronological order.
+        Rows are (match_type, team1_player1_id, team1_player2_id,
+        team2_player1_id, team2_player2_id, winner_team).
+        """
+        query = """
+            SELECT match_type, team1_player1_id, team1_player2_id,
+                   team2_player1_id, team2_player2_id, winner_team
+            FROM Matches
+            ORDER BY match_date, match_id
+        """
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(query)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield tuple(row)
+            finally:
+                cursor.close()
+    
+    @staticmethod
+    def replace_all(ratings, counts):
+        """Overwrite PlayerRatings with replayed ratings and match counts."""
+        rows = [
+            (user_id, match_type, rating, counts[(user_id, match_type)])
+            for (user_id, match_type), rating in ratings.items()
+        ]
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(f"DELETE FROM PlayerRatings {get_dialect().table_hint('TABLOCKX')}")
+                PlayerRating._merge(cursor, rows, replace_counts=True)
+                conn.commit()
+                return len(rows)
+            except Exception as e:
+                conn.rollback()
+                raise e
+            finally:
+                cursor.close()
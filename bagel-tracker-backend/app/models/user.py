@@ -1,9 +1,25 @@
-from app.utils.db import execute_query
-from passlib.hash import pbkdf2_sha256
-from app.utils.db import get_db_connection
-import pyodbc
+from app.utils.db import db_connection, execute_query, get_dialect, insert_returning, query_records
+from app.utils.hashing import password_hasher
+from app.utils.rows import RowMapper
+from app.models.user_index import UserNameIndex
+from collections import OrderedDict
+import os
+import threading
+import time
 
 class User:
+    # Users columns, in constructor order
+    FIELDS = ('user_id', 'name', 'email', 'password_hash', 'created_at', 'updated_at', 'is_active')
+    __slots__ = FIELDS
+    # Fields returned by the API, in response order
+    PUBLIC_FIELDS = ('user_id', 'name', 'email', 'created_at', 'is_active')
+    
+    # Names per IN (...) lookup, well under SQL Server's 2100 parameter limit
+    NAME_LOOKUP_CHUNK_SIZE = 1000
+    # Default and largest number of typeahead search results
+    SEARCH_LIMIT = int(os.getenv('USER_SEARCH_LIMIT', 5))
+    MAX_SEARCH_LIMIT = 20
+    
     def __init__(self, user_id=None, name=None, email=None, password_hash=None, 
                  created_at=None, updated_at=None, is_active=True):
         self.user_id = user_id
@@ -16,102 +32,198 @@ class User:
     
     @staticmethod
     def hash_password(password):
-        """Hash a password for storing."""
-        return pbkdf2_sha256.hash(password)
+        """Hash a password for storing.
+        Runs on the hashing pool; raises HashingBusyError when it is saturated.
+        """
+        return password_hasher.hash(password)
     
     @staticmethod
     def verify_password(stored_password, provided_password):
         """Verify a stored password against a provided password."""
-        return pbkdf2_sha256.verify(provided_password, stored_password)
+        valid, _ = password_hasher.verify_and_update(stored_password, provided_password)
+        return valid
     
     @staticmethod
-    def find_by_email(email):
-        """Find a user by email."""
-        query = "SELECT * FROM Users WHERE email = ?"
-        result = execute_query(query, (email,))
+    def verify_and_update_password(stored_password, provided_password):
+        """Verify a password and return (valid, new_hash).
+        new_hash is set when the stored hash uses outdated parameters.
+        """
+        return password_hasher.verify_and_update(stored_password, provided_password)
+    
+    @staticmethod
+    def _find_by(field, value, require_password):
+        """Look a user up by a unique column, reading through the user cache."""
+        user = User.cache.get(field, value, require_password)
+        if user:
+            return user
+        
+        query = f"SELECT * FROM Users WHERE {field} = ?"
+        result = query_records(User.mapper, query, (value,))
         if result:
-            user_data = result[0]
-            return User(
-                user_id=user_data.user_id,
-                name=user_data.name,
-                email=user_data.email,
-                password_hash=user_data.password_hash,
-                created_at=user_data.created_at,
-                updated_at=user_data.updated_at,
-                is_active=user_data.is_active
-            )
+            user = result[0]
+            User.cache.put(user)
+            return user
         return None
     
+    @staticmethod
+    def find_by_id(user_id):
+        """Find a user by ID. password_hash may be None when served from a shared cache."""
+        return User._find_by('user_id', user_id, require_password=False)
+    
+    @staticmethod
+    def find_by_email(email):
+        """Find a user by email."""
+        # Login verifies the password, so never accept a record without its hash
+        return User._find_by('email', email, require_password=True)
+    
     @staticmethod
     def find_by_name(name):
-        """Find a user by name."""
-        query = "SELECT * FROM Users WHERE name = ?"
-        result = execute_query(query, (name,))
-        if result:
-            user_data = result[0]
-            return User(
-                user_id=user_data.user_id,
-                name=user_data.name,
-                email=user_data.email,
-                password_hash=user_data.password_hash,
-                created_at=user_data.created_at,
-                updated_at=user_data.updated_at,
-                is_active=user_data.is_active
-            )
-        return None
+        """Find a user by name. password_hash may be None when served from a shared cache."""
+        return User._find_by('name', name, require_password=False)
     
     @staticmethod
-    def search_users_by_prefix(prefix):
-        """Search for users whose name starts with the given prefix.
-        Returns a maximum of 5 results.
+    def find_conflict(email, name):
+        """Check whether an email or name is already taken, in at most one query.
+        Returns 'email', 'name' or None; email wins when both are taken.
         """
-        query = """
-            SELECT TOP 5 user_id, name, email, created_at, is_active 
+        if User.cache.get('email', email, require_password=False):
+            return 'email'
+        name_taken = User.cache.get('name', name, require_password=False) is not None
+        
+        query = "SELECT * FROM Users WHERE email = ? OR name = ?"
+        for user in query_records(User.mapper, query, (email, name)):
+            User.cache.put(user)
+            if user.email.lower() == email.lower():
+                return 'email'
+            name_taken = True
+        return 'name' if name_taken else None
+    
+    @staticmethod
+    def find_many_by_names(names):
+        """Resolve user names to IDs with as few queries as possible.
+        Returns a dict mapping each requested name that exists to its user_id.
+        """
+        names = list(dict.fromkeys(name for name in names if name))
+        
+        # Serve what we can from the cache and query only the rest
+        user_ids = {}
+        misses = []
+        for name in names:
+            user = User.cache.get('name', name, require_password=False)
+            if user:
+                user_ids[name] = user.user_id
+            else:
+                misses.append(name)
+        
+        # Match case-insensitively, like the database collation does
+        ids_by_name = {}
+        for start in range(0, len(misses), User.NAME_LOOKUP_CHUNK_SIZE):
+            chunk = misses[start:start + User.NAME_LOOKUP_CHUNK_SIZE]
+            placeholders = ", ".join("?" for _ in chunk)
+            query = f"SELECT * FROM Users WHERE name IN ({placeholders})"
+            for user in query_records(User.mapper, query, tuple(chunk)):
+                User.cache.put(user)
+                ids_by_name[user.name.lower()] = user.user_id
+        
+        for name in misses:
+            if name.lower() in ids_by_name:
+                user_ids[name] = ids_by_name[name.lower()]
+        return user_ids
+    
+    @staticmethod
+    def search_users_by_prefix(prefix, limit=None):
+        """Search for users whose name starts with the given prefix, ignoring case.
+        Returns at most `limit` results (USER_SEARCH_LIMIT, 5 by default).
+        """
+        limit = limit or User.SEARCH_LIMIT
+        
+        # Answer from the in-memory index once it has loaded
+        users = User.name_index.search(prefix, limit)
+        if users is not None:
+            return users
+        
+        cache_key = f"{limit}:{prefix}"
+        cached = User.cache.get_prefix(cache_key)
+        if cached is not None:
+            return cached
+        
+        query = f"""
+            SELECT user_id, name, email, created_at, is_active 
             FROM Users 
             WHERE name LIKE ?
             ORDER BY name
+            {get_dialect().limit}
         """
         search_param = f"{prefix}%"  # Add wildcard to search by prefix
-        result = execute_query(query, (search_param,))
-        return [
-            {
-                "user_id": row.user_id,
-                "name": row.name,
-                "email": row.email,
-                "created_at": str(row.created_at),
-                "is_active": row.is_active
-            }
-            for row in result
-        ]
+        users = query_records(User.mapper, query, (search_param, limit), serialize=True)
+        User.cache.put_prefix(cache_key, users)
+        return users
+    
+    def to_dict(self):
+        """Public fields, as returned by the user listing and search."""
+        return User.mapper.to_dict(self)
     
     @staticmethod
     def get_all_users():
         """Get all users from the database."""
+        return list(User.iter_users())
+    
+    @staticmethod
+    def iter_users(batch_size=500):
+        """Yield every user ordered by name, fetching `batch_size` rows at a time
+        so memory stays flat however large the table is.
+        """
         query = """
             SELECT user_id, name, email, created_at, is_active 
             FROM Users
             ORDER BY name
         """
-        result = execute_query(query)
-        return [
-            {
-                "user_id": row.user_id,
-                "name": row.name,
-                "email": row.email,
-                "created_at": str(row.created_at),
-                "is_active": row.is_active
-            }
-            for row in result
-        ]
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(query)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield from User.mapper.serialize(cursor.description, rows)
+            finally:
+                cursor.close()
+    
+    @staticmethod
+    def get_users_page(limit, after=None):
+        """Get up to `limit` users ordered by name, starting after the name `after`.
+        Returns (users, next_after) where next_after is None on the last page.
+        """
+        params = []
+        keyset = ""
+        if after:
+            keyset = "WHERE name > ?"
+            params.append(after)
+        params.append(limit + 1)
+        query = f"""
+            SELECT user_id, name, email, created_at, is_active 
+            FROM Users {keyset}
+            ORDER BY name
+            {get_dialect().limit}
+        """
+        users = query_records(User.mapper, query, tuple(params), serialize=True)
+        if len(users) > limit:
+            users = users[:limit]
+            return users, users[-1]["name"]
+        return users, None
     
     def save(self):
         """Save user to database."""
+        # Drop cached copies, including entries under an old name or email
+        User.cache.invalidate(self)
+        
         if self.user_id:
             # Update existing user
             query = """
                 UPDATE Users 
                 SET name = ?, email = ?, password_hash = ?, 
-                    updated_at = GETDATE(), is_active = ?
+                    updated_at = CURRENT_TIMESTAMP, is_active = ?
                 WHERE user_id = ?
             """
             execute_query(query, (
@@ -120,41 +232,191 @@ class User:
             ), fetch=False)
         else:
             # Insert new user
-            conn = get_db_connection()
-            cursor = conn.cursor()
+            dialect = get_dialect()
+            with db_connection() as conn:
+                cursor = conn.cursor()
             
-            try:
-                # First, insert the user
-                insert_query = """
-                    INSERT INTO Users (name, email, password_hash)
-                    VALUES (?, ?, ?)
-                """
-                cursor.execute(insert_query, (
-                    self.name, self.email, self.password_hash
-                ))
+                try:
+                    # Insert the user, reading back the ID and defaults in the same statement
+                    row = insert_returning(
+                        cursor, 'Users', ['name', 'email', 'password_hash'],
+                        (self.name, self.email, self.password_hash),
+                        ['user_id', 'created_at', 'updated_at', 'is_active']
+                    )
+                    self.user_id = int(row.user_id)
+                    self.created_at = row.created_at
+                    self.updated_at = row.updated_at
+                    self.is_active = row.is_active
                 
-                # Then get the ID
-                cursor.execute("SELECT SCOPE_IDENTITY() AS user_id")
-                result = cursor.fetchone()
-                self.user_id = result.user_id
-                
-                conn.commit()
-            except pyodbc.IntegrityError as e:
-                conn.rollback()
-                error_msg = str(e)
-                if "Violation of UNIQUE KEY constraint" in error_msg:
-                    if "idx_users_email" in error_msg:
-                        raise ValueError("Email address is already registered")
-                    elif "idx_users_name" in error_msg:
-                        raise ValueError("Username is already taken")
-                    else:
-                        raise ValueError("A user with this information already exists")
-                raise e
-            except Exception as e:
-                conn.rollback()
-                raise e
-            finally:
-                cursor.close()
-                conn.close()
+                    conn.commit()
+                except dialect.integrity_error as e:
+                    conn.rollback()
+                    column = dialect.unique_violation(e)
+                    if column is not None:
+                        if column == 'email':
+                            raise ValueError("Email address is already registered")
+                        elif column == 'name':
+                            raise ValueError("Username is already taken")
+                        else:
+                            raise ValueError("A user with this information already exists")
+                    raise e
+                except Exception as e:
+                    conn.rollback()
+                    raise e
+                finally:
+                    cursor.close()
         
-        return self
\ No newline at end of file
+        # And again after commit, in case a concurrent read re-cached the old row
+        User.cache.invalidate(self)
+        User.name_index.upsert(self)
+        
+        return self
+
+class UserCache:
+    """Read-through cache of users keyed by id, name and email.
+
+    The first tier is an in-process LRU with a TTL. An optional shared
+    `backend` (any object with get(key), set(key, value, ttl) and delete(key),
+    such as a thin Redis adapter or a dict-backed stand-in) is consulted on
+    local misses. The shared backend only ever receives public fields:
+    password_hash stays in process memory, so a user served from the backend
+    has password_hash=None and lookups that need it go to the database.
+    Prefix search results are cached locally and dropped on any user write.
+    """
+    
+    KEY_FIELDS = ('user_id', 'name', 'email')
+    PUBLIC_FIELDS = ('user_id', 'name', 'email', 'created_at', 'updated_at', 'is_active')
+    
+    def __init__(self, max_size=1024, ttl=60, backend=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.backend = backend
+        self._entries = OrderedDict()  # (field, value) -> (expires_at, fields)
+        self._prefixes = OrderedDict()  # lowercased prefix -> (expires_at, results)
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "backend_hits": 0, "misses": 0, "invalidations": 0}
+    
+    @staticmethod
+    def _key(field, value):
+        # Names and emails compare case-insensitively in the database
+        return (field, value.lower() if isinstance(value, str) else value)
+    
+    @staticmethod
+    def _backend_key(field, value):
+        return "user:%s:%s" % UserCache._key(field, value)
+    
+    def get(self, field, value, require_password=False):
+        """Return a cached User, or None on a miss."""
+        key = self._key(field, value)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now and (entry[1]["password_hash"] or not require_password):
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return User(**entry[1])
+        
+        if self.backend is not None and not require_password:
+            try:
+                fields = self.backend.get(self._backend_key(field, value))
+            except Exception:
+                fields = None
+            if fields:
+                with self._lock:
+                    self._counters["backend_hits"] += 1
+                user = User(password_hash=None, **fields)
+                self._store_local(user)
+                return user
+        
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+    
+    def put(self, user):
+        """Cache a user loaded from the database under all of its keys."""
+        self._store_local(user)
+        if self.backend is not None:
+            public = {field: getattr(user, field) for field in self.PUBLIC_FIELDS}
+            try:
+                for field in self.KEY_FIELDS:
+                    self.backend.set(self._backend_key(field, getattr(user, field)), public, self.ttl)
+            except Exception:
+                pass
+    
+    def _store_local(self, user):
+        fields = {field: getattr(user, field) for field in self.PUBLIC_FIELDS}
+        fields["password_hash"] = user.password_hash
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for field in self.KEY_FIELDS:
+                key = self._key(field, fields[field])
+                self._entries[key] = (expires_at, fields)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, user):
+        """Forget a user under its current keys and any keys cached for its ID."""
+        keys = {self._key(field, getattr(user, field)) for field in self.KEY_FIELDS
+                if getattr(user, field) is not None}
+        with self._lock:
+            if user.user_id is not None:
+                entry = self._entries.get(self._key('user_id', user.user_id))
+                if entry:
+                    # Catch the old name and email when they are being changed
+                    keys.update(self._key(field, entry[1][field]) for field in self.KEY_FIELDS)
+            for key in keys:
+                self._entries.pop(key, None)
+            self._prefixes.clear()
+            self._counters["invalidations"] += 1
+        
+        if self.backend is not None:
+            try:
+                for field, value in keys:
+                    self.backend.delete("user:%s:%s" % (field, value))
+            except Exception:
+                pass
+    
+    def get_prefix(self, prefix):
+        """Return cached prefix search results, or None on a miss."""
+        key = prefix.lower()
+        with self._lock:
+            entry = self._prefixes.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._prefixes.move_to_end(key)
+                self._counters["hits"] += 1
+                return entry[1]
+            self._counters["misses"] += 1
+        return None
+    
+    def put_prefix(self, prefix, results):
+        """Cache prefix search results until the TTL or the next user write."""
+        with self._lock:
+            self._prefixes[prefix.lower()] = (time.monotonic() + self.ttl, results)
+            while len(self._prefixes) > self.max_size:
+                self._prefixes.popitem(last=False)
+    
+    def clear(self):
+        """Empty the local tier."""
+        with self._lock:
+            self._entries.clear()
+            self._prefixes.clear()
+    
+    def stats(self):
+        """Return hit/miss counters and the local tier's size."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+            stats["prefixes"] = len(self._prefixes)
+        lookups = stats["hits"] + stats["backend_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["backend_hits"]) / lookups, 4) if lookups else None
+        return stats
+
+User.cache = UserCache(
+    max_size=int(os.getenv('USER_CACHE_SIZE', 1024)),
+    ttl=float(os.getenv('USER_CACHE_TTL', 60))
+)
+User.name_index = UserNameIndex(
+    refresh_interval=float(os.getenv('USER_INDEX_REFRESH_INTERVAL', 300))
+)
+User.mapper = RowMapper(User)
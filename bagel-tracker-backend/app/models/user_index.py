@@ -0,0 +1,113 @@
+from bisect import bisect_left, insort
+import logging
+import threading
+import time
+from app.utils.db import query_records
+
+logger = logging.getLogger(__name__)
+
+class UserNameIndex:
+    """Process-local sorted index of user names for typeahead search.
+
+    Names are kept in a list sorted by their casefolded form, so a prefix
+    query is a bisect plus a short scan. The index is loaded from Users in a
+    background thread, kept current by User.save() in this process, and
+    reloaded every `refresh_interval` seconds to pick up users created by
+    other workers. Until the first load finishes `search` returns None and
+    callers fall back to SQL.
+    """
+    
+    # Seconds to wait before retrying a failed load
+    RETRY_INTERVAL = 30
+    
+    def __init__(self, refresh_interval=300):
+        self.refresh_interval = refresh_interval
+        self._keys = []   # sorted (casefolded name, user_id)
+        self._users = {}  # user_id -> public fields returned by search
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._loading = False
+        self._failed_at = None
+    
+    @property
+    def ready(self):
+        return self._loaded_at is not None
+    
+    def load(self):
+        """Rebuild the index from the Users table."""
+        query = """
+            SELECT user_id, name, email, created_at, is_active
+            FROM Users
+        """
+        from app.models.user import User
+        
+        users = {user["user_id"]: user for user in query_records(User.mapper, query, serialize=True)}
+        keys = sorted((user["name"].casefold(), user_id) for user_id, user in users.items())
+        with self._lock:
+            self._keys = keys
+            self._users = users
+            self._loaded_at = time.monotonic()
+        return len(keys)
+    
+    def warm_in_background(self):
+        """Start a load on a daemon thread unless one is already running."""
+        with self._lock:
+            if self._loading:
+                return
+            self._loading = True
+        threading.Thread(target=self._warm, name="user-name-index", daemon=True).start()
+    
+    def _warm(self):
+        try:
+            count = self.load()
+            logger.info("User name index loaded with %d users", count)
+        except Exception:
+            logger.exception("Loading the user name index failed; searches fall back to SQL")
+        finally:
+            with self._lock:
+                self._loading = False
+                if self._loaded_at is None:
+                    self._failed_at = time.monotonic()
+    
+    def search(self, prefix, limit):
+        """Return up to `limit` users whose name starts with prefix, ignoring case.
+        Returns None while the index is cold.
+        """
+        if not self.ready:
+            # Back off between attempts if the last load failed
+            if self._failed_at is None or time.monotonic() - self._failed_at > self.RETRY_INTERVAL:
+                self.warm_in_background()
+            return None
+        if time.monotonic() - self._loaded_at > self.refresh_interval:
+            self.warm_in_background()
+        
+        folded = prefix.casefold()
+        results = []
+        with self._lock:
+            i = bisect_left(self._keys, (folded,))
+            while i < len(self._keys) and len(results) < limit:
+                name, user_id = self._keys[i]
+                if not name.startswith(folded):
+                    break
+                results.append(dict(self._users[user_id]))
+                i += 1
+        return results
+    
+    def upsert(self, user):
+        """Add a saved user, or move them if their name changed."""
+        with self._lock:
+            if not self.ready:
+                return
+            self._remove(user.user_id)
+            self._users[user.user_id] = user.to_dict()
+            insort(self._keys, (user.name.casefold(), user.user_id))
+    
+    def _remove(self, user_id):
+        """Drop a user's key (lock held)."""
+        previous = self._users.pop(user_id, None)
+        if previous:
+            key = (previous["name"].casefold(), user_id)
+            i = bisect_left(self._keys, key)
+            if i < len(self._keys) and self._keys[i] == key:
+                del self._keys[i]
+
@@ -1,5 +1,7 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, json, Response, stream_with_context
+from app.utils.current_user import login_required
 from app.services.auth_service import AuthService
+from app.utils.pagination import clamp_page_size
 from flask_cors import cross_origin
 
 auth_bp = Blueprint('auth', __name__)
@@ -28,6 +30,8 @@ def register():
     
     if result["success"]:
         return jsonify(result), 201
+    elif "retry_after" in result:
+        return jsonify(result), 503, {"Retry-After": str(result["retry_after"])}
     else:
         return jsonify(result), 400
 
@@ -54,18 +58,53 @@ def login():
     
     if result["success"]:
         return jsonify(result), 200
+    elif "retry_after" in result:
+        return jsonify(result), 503, {"Retry-After": str(result["retry_after"])}
     else:
         return jsonify(result), 401
 
+def _stream_users(first, users, ndjson):
+    """Serialize users one at a time, as NDJSON lines or a chunked JSON document."""
+    if ndjson:
+        if first is not None:
+            yield json.dumps(first) + "\n"
+        for user in users:
+            yield json.dumps(user) + "\n"
+        return
+    
+    yield '{"success": true, "users": ['
+    if first is not None:
+        yield json.dumps(first)
+        for user in users:
+            yield "," + json.dumps(user)
+    yield "]}"
+
 @auth_bp.route('/users', methods=['GET'])
+@login_required()
 def get_all_users():
-    """Get all users from the database."""
+    """Get users from the database, one page at a time or as a stream."""
     from app.models.user import User
+    
+    # Keyset pagination by name when a page is requested
+    if 'limit' in request.args or 'after' in request.args:
+        limit = clamp_page_size(request.args.get('limit'), 50)
+        try:
+            users, next_after = User.get_users_page(limit, request.args.get('after'))
+            return jsonify({"success": True, "users": users, "next_after": next_after}), 200
+        except Exception as e:
+            return jsonify({"success": False, "message": str(e)}), 500
+    
+    # Otherwise stream every user straight from the cursor
+    ndjson = request.args.get('format') == 'ndjson'
     try:
-        users = User.get_all_users()
-        return jsonify({"success": True, "users": users}), 200
+        users = User.iter_users()
+        # Run the query before committing to a 200 response
+        first = next(users, None)
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
+    
+    mimetype = 'application/x-ndjson' if ndjson else 'application/json'
+    return Response(stream_with_context(_stream_users(first, users, ndjson)), mimetype=mimetype)
 
 @auth_bp.route('/users/search', methods=['GET'])
 def search_users():
@@ -73,7 +112,12 @@ def search_users():
     from app.models.user import User
     try:
         prefix = request.args.get('prefix', '')
-        users = User.search_users_by_prefix(prefix)
+        try:
+            limit = int(request.args.get('limit', User.SEARCH_LIMIT))
+        except ValueError:
+            limit = User.SEARCH_LIMIT
+        limit = max(1, min(limit, User.MAX_SEARCH_LIMIT))
+        users = User.search_users_by_prefix(prefix, limit)
         return jsonify({"success": True, "users": users}), 200
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
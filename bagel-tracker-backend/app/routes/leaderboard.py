@@ -0,0 +1,25 @@
+from flask import Blueprint, request, jsonify
+from app.utils.current_user import login_required
+from app.services.leaderboard_service import LeaderboardService
+
+leaderboard_bp = Blueprint('leaderboard', __name__)
+
+@leaderboard_bp.route('', methods=['GET'])
+@login_required()
+def get_leaderboard():
+    """Get the top players by bagels dealt, wins, win rate or match count."""
+    metric = request.args.get('metric', 'bagels_given')
+    match_type = request.args.get('type') or None
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        limit = 10
+    
+    result = LeaderboardService.get_leaderboard(metric, match_type, limit)
+    
+    if result["success"]:
+        return jsonify(result), 200
+    elif result.get("error") == "invalid_request":
+        return jsonify(result), 400
+    else:
+        return jsonify(result), 500
@@ -1,56 +1,28 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, Response, current_app, request, jsonify
 from app.services.match_service import MatchService
-from app.models.user import User
-import json
+from app.utils.pagination import clamp_page_size, decode_cursor
+from app.utils.current_user import get_current_user, login_required
+from app.utils.http_cache import conditional_get
+from app.models.match_version import MatchVersion
 
 matches_bp = Blueprint('matches', __name__)
 
 @matches_bp.route('', methods=['POST'])
-@jwt_required()
+@login_required()
 def record_match():
     """Record a new tennis match."""
-    # Get current user from JWT
-    current_user_json = get_jwt_identity()
-    try:
-        current_user = json.loads(current_user_json)
-        reporter_user_id = current_user.get('user_id')
-    except:
-        return jsonify({"success": False, "message": "Invalid user identity in token"}), 400
+    # The reporter is the authenticated user
+    reporter_user_id = get_current_user().user_id
     
     # Get match data from request
     match_data = request.get_json()
     if not match_data:
         return jsonify({"success": False, "message": "No match data provided"}), 400
     
-    # Handle username to user_id conversion for player fields
-    username_fields = {
-        'team1_player1_name': 'team1_player1_id',
-        'team1_player2_name': 'team1_player2_id',
-        'team2_player1_name': 'team2_player1_id',
-        'team2_player2_name': 'team2_player2_id'
-    }
-    
-    # Convert usernames to user IDs if usernames are provided
-    for name_field, id_field in username_fields.items():
-        if name_field in match_data and match_data[name_field]:
-            username = match_data[name_field]
-            user = User.find_by_name(username)
-            if not user:
-                return jsonify({"success": False, "message": f"User not found: {username}"}), 400
-            
-            # Add the user ID to match data
-            match_data[id_field] = user.user_id
-    
     # Process integers for player IDs and scores
-    for field in ['team1_player1_id', 'team1_player2_id', 'team2_player1_id', 
-                  'team2_player2_id', 'team1_score', 'team2_score']:
-        if field in match_data and match_data[field] is not None:
-            try:
-                match_data[field] = int(match_data[field])
-            except (ValueError, TypeError):
-                if field.endswith('score'):
-                    return jsonify({"success": False, "message": f"{field} must be an integer"}), 400
+    error = MatchService.coerce_integer_fields(match_data)
+    if error:
+        return jsonify({"success": False, "message": error}), 400
     
     # Call service to record match
     result = MatchService.record_match(reporter_user_id, match_data)
@@ -60,18 +32,67 @@ def record_match():
     else:
         return jsonify(result), 400
 
+@matches_bp.route('/bulk', methods=['POST'])
+@login_required()
+def record_matches():
+    """Record a batch of tennis matches in one transaction."""
+    # The reporter is the authenticated user
+    reporter_user_id = get_current_user().user_id
+    
+    # Get the batch from request
+    data = request.get_json()
+    if not data or 'matches' not in data:
+        return jsonify({"success": False, "message": "No match data provided"}), 400
+    
+    # Call service to validate and record all matches
+    result = MatchService.record_matches(reporter_user_id, data['matches'])
+    
+    if result["success"]:
+        return jsonify(result), 201
+    else:
+        return jsonify(result), 400
+
+@matches_bp.route('/stream', methods=['GET'])
+@login_required()
+def stream_matches():
+    """Stream newly recorded matches as server-sent events."""
+    # EventSource sends Last-Event-ID when it reconnects; last_event_id lets a
+    # client resume from a match it already has on its first connection
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({"success": False, "message": "Invalid Last-Event-ID"}), 400
+    
+    # Subscribe before responding so matches recorded meanwhile are queued
+    subscription = MatchService.feed.subscribe()
+    if subscription is None:
+        return jsonify({"success": False, "message": "Too many match streams are open"}), 503
+    
+    # Each open stream holds a worker thread, so the generator runs outside the
+    # request context and checks out pooled connections only while replaying
+    stream = MatchService.stream_matches(subscription, last_event_id, current_app.json_encoder)
+    response = Response(stream, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # don't let a proxy buffer the stream
+    response.call_on_close(lambda: MatchService.feed.unsubscribe(subscription))
+    return response
+
 @matches_bp.route('/user/<int:user_id>', methods=['GET'])
-@jwt_required()
+@login_required()
+@conditional_get(lambda user_id: [MatchVersion.user_scope(user_id)], "private, no-cache")
 def get_user_matches(user_id):
-    """Get matches for a specific user."""
-    # Get limit parameter from query string (default to 10)
+    """Get a page of matches for a specific user."""
+    # Get page size (default 10, capped server-side) and cursor from query string
+    limit = clamp_page_size(request.args.get('limit'), 10)
     try:
-        limit = int(request.args.get('limit', 10))
-    except ValueError:
-        limit = 10
+        before = decode_cursor(request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
     
-    # Call service to get matches
-    result = MatchService.get_user_matches(user_id, limit)
+    # Call service to get matches; format=columnar sends the field names once
+    columnar = request.args.get('format') == 'columnar'
+    result = MatchService.get_user_matches(user_id, limit, before, columnar)
     
     if result["success"]:
         return jsonify(result), 200
@@ -79,44 +100,35 @@ def get_user_matches(user_id):
         return jsonify(result), 500
 
 @matches_bp.route('/<int:match_id>', methods=['GET'])
-@jwt_required()
+@login_required()
+# Recorded matches are rarely edited, so clients may reuse them for a few minutes;
+# any write could be that edit, so revalidation uses the global version
+@conditional_get(lambda match_id: [MatchVersion.GLOBAL_SCOPE], "private, max-age=300")
 def get_match(match_id):
     """Get a specific match by ID."""
     from app.models.match import Match
     
     match = Match.find_by_id(match_id)
     if match:
-        match_data = {
-            "match_id": match.match_id,
-            "match_type": match.match_type,
-            "match_date": str(match.match_date),
-            "reporter_user_id": match.reporter_user_id,
-            "team1_player1_id": match.team1_player1_id,
-            "team1_player2_id": match.team1_player2_id,
-            "team2_player1_id": match.team2_player1_id,
-            "team2_player2_id": match.team2_player2_id,
-            "team1_score": match.team1_score,
-            "team2_score": match.team2_score,
-            "winner_team": match.winner_team,
-            "is_bagel": match.is_bagel,
-            "created_at": str(match.created_at)
-        }
-        return jsonify({"success": True, "match": match_data}), 200
+        return jsonify({"success": True, "match": match.to_dict()}), 200
     else:
         return jsonify({"success": False, "message": "Match not found"}), 404
 
 @matches_bp.route('/all', methods=['GET'])
-@jwt_required()
+@login_required()
+@conditional_get(lambda: [MatchVersion.GLOBAL_SCOPE], "private, no-cache")
 def get_all_matches():
-    """Get all tennis matches from the database."""
+    """Get a page of tennis matches from the database."""
+    # Get page size (default 50, capped server-side) and cursor from query string
+    limit = clamp_page_size(request.args.get('limit'), 50)
     try:
-        # Get limit parameter from query string (default to 50)
-        limit = int(request.args.get('limit', 50))
-    except ValueError:
-        limit = 50
+        before = decode_cursor(request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
     
-    # Call service to get all matches
-    result = MatchService.get_all_matches(limit)
+    # Call service to get all matches; format=columnar sends the field names once
+    columnar = request.args.get('format') == 'columnar'
+    result = MatchService.get_all_matches(limit, before, columnar)
     
     if result["success"]:
         return jsonify(result), 200
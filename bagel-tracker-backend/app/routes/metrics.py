@@ -0,0 +1,56 @@
+import ipaddress
+import os
+from flask import Blueprint, jsonify, request
+from app.utils.db import get_pool
+from app.models.user import User
+from app.services.match_service import MatchService
+from app.utils.current_user import identity_cache
+from app.utils.db_metrics import query_metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# Addresses or networks allowed to read metrics (comma-separated); loopback only by default
+ALLOWED_NETWORKS = [
+    ipaddress.ip_network(network.strip(), strict=False)
+    for network in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+    if network.strip()
+]
+
+def metrics_allowed(address):
+    """Whether a client address may read metrics."""
+    try:
+        address = ipaddress.ip_address(address)
+    except (TypeError, ValueError):
+        return False
+    return any(address in network for network in ALLOWED_NETWORKS)
+
+@metrics_bp.before_request
+def restrict_to_allowed_ips():
+    """Metrics expose SQL and internals, so they are not served to the public."""
+    if not metrics_allowed(request.remote_addr):
+        return jsonify({"success": False, "message": "Forbidden"}), 403
+
+@metrics_bp.route('/pool', methods=['GET'])
+def pool_metrics():
+    """Expose connection pool counters for monitoring."""
+    return jsonify({"success": True, "pool": get_pool().metrics()}), 200
+
+@metrics_bp.route('/user-cache', methods=['GET'])
+def user_cache_metrics():
+    """Expose user cache hit/miss counters for monitoring."""
+    return jsonify({"success": True, "user_cache": User.cache.stats()}), 200
+
+@metrics_bp.route('/identity-cache', methods=['GET'])
+def identity_cache_metrics():
+    """Expose verified-token cache hit/miss counters for monitoring."""
+    return jsonify({"success": True, "identity_cache": identity_cache.stats()}), 200
+
+@metrics_bp.route('/match-feed', methods=['GET'])
+def match_feed_metrics():
+    """Expose match stream subscriber and delivery counters for monitoring."""
+    return jsonify({"success": True, "match_feed": MatchService.feed.stats()}), 200
+
+@metrics_bp.route('/db', methods=['GET'])
+def db_metrics():
+    """Expose statement latency histograms by fingerprint for monitoring."""
+    return jsonify({"success": True, "db": query_metrics.snapshot()}), 200
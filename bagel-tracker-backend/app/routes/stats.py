@@ -0,0 +1,59 @@
+from flask import Blueprint, request, jsonify
+from app.utils.current_user import login_required
+from app.services.stats_service import StatsService
+from app.utils.pagination import clamp_page_size
+
+stats_bp = Blueprint('stats', __name__)
+
+@stats_bp.route('/user/<int:user_id>', methods=['GET'])
+@login_required()
+def get_user_stats(user_id):
+    """Get wins, losses and bagels for a specific user."""
+    result = StatsService.get_user_stats(user_id)
+    
+    if result["success"]:
+        return jsonify(result), 200
+    else:
+        return jsonify(result), 500
+
+@stats_bp.route('/ratings/<int:user_id>', methods=['GET'])
+@login_required()
+def get_user_ratings(user_id):
+    """Get singles and doubles Elo ratings for a specific user."""
+    result = StatsService.get_user_ratings(user_id)
+    
+    if result["success"]:
+        return jsonify(result), 200
+    else:
+        return jsonify(result), 500
+
+@stats_bp.route('/head-to-head', methods=['GET'])
+@login_required()
+def get_head_to_head():
+    """Get the record between players `a` and `b`, from a's side."""
+    a = request.args.get('a', type=int)
+    b = request.args.get('b', type=int)
+    if a is None or b is None:
+        return jsonify({"success": False, "message": "Query parameters a and b must be user IDs"}), 400
+    
+    result = StatsService.get_head_to_head(a, b)
+    
+    if result["success"]:
+        return jsonify(result), 200
+    elif a == b:
+        return jsonify(result), 400
+    else:
+        return jsonify(result), 500
+
+@stats_bp.route('/partners/<int:user_id>', methods=['GET'])
+@login_required()
+def get_partners(user_id):
+    """Get a user's best and worst doubles partners by win rate."""
+    limit = clamp_page_size(request.args.get('limit'), 5)
+    min_matches = request.args.get('min_matches', 3, type=int)
+    result = StatsService.get_partners(user_id, limit, max(min_matches, 1))
+    
+    if result["success"]:
+        return jsonify(result), 200
+    else:
+        return jsonify(result), 500
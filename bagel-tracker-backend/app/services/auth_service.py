@@ -1,24 +1,37 @@
 from app.models.user import User
+from app.utils.hashing import HashingBusyError
+from app.utils.current_user import CurrentUser
 from flask_jwt_extended import create_access_token
 import datetime
-import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 class AuthService:
+    @staticmethod
+    def _busy(error):
+        """Result telling the client to back off while hashing is saturated."""
+        return {
+            "success": False,
+            "message": "Server is busy, please try again shortly",
+            "retry_after": error.retry_after
+        }
+    
     @staticmethod
     def register_user(name, email, password):
         """Register a new user."""
-        # Check if user email already exists
-        existing_email = User.find_by_email(email)
-        if existing_email:
+        # Check if the email or username is taken before paying for a hash
+        conflict = User.find_conflict(email, name)
+        if conflict == 'email':
             return {"success": False, "message": "Email already registered"}
-            
-        # Check if username already exists
-        existing_name = User.find_by_name(name)
-        if existing_name:
+        if conflict == 'name':
             return {"success": False, "message": "Username already taken"}
         
         # Create new user
-        password_hash = User.hash_password(password)
+        try:
+            password_hash = User.hash_password(password)
+        except HashingBusyError as e:
+            return AuthService._busy(e)
         new_user = User(
             name=name,
             email=email,
@@ -30,9 +43,8 @@ class AuthService:
             new_user.save()
             
             # Generate JWT token - using string identity
-            identity = {"user_id": new_user.user_id, "email": email, "name": name}
             token = create_access_token(
-                identity=json.dumps(identity),
+                identity=CurrentUser.identity_for(new_user),
                 expires_delta=datetime.timedelta(hours=1)
             )
             
@@ -43,7 +55,9 @@ class AuthService:
                 "user": {
                     "user_id": new_user.user_id,
                     "name": name,
-                    "email": email
+                    "email": email,
+                    "created_at": new_user.created_at,
+                    "is_active": new_user.is_active
                 }
             }
         except ValueError as e:
@@ -56,14 +70,28 @@ class AuthService:
     def login_user(email, password):
         """Login a user."""
         user = User.find_by_email(email)
+        if not user:
+            return {"success": False, "message": "Invalid email or password"}
+        
+        try:
+            valid, new_hash = User.verify_and_update_password(user.password_hash, password)
+        except HashingBusyError as e:
+            return AuthService._busy(e)
         
-        if not user or not User.verify_password(user.password_hash, password):
+        if not valid:
             return {"success": False, "message": "Invalid email or password"}
         
+        # Upgrade hashes made with outdated parameters while we have the password
+        if new_hash:
+            try:
+                user.password_hash = new_hash
+                user.save()
+            except Exception:
+                logger.exception("Rehashing password for user %s failed", user.user_id)
+        
         # Generate JWT token - using string identity
-        identity = {"user_id": user.user_id, "email": user.email, "name": user.name}
         token = create_access_token(
-            identity=json.dumps(identity),
+            identity=CurrentUser.identity_for(user),
             expires_delta=datetime.timedelta(hours=1)
         )
         
@@ -0,0 +1,79 @@
+import os
+import threading
+import time
+from app.models.leaderboard import Leaderboard
+
+class LeaderboardService:
+    # Rankings are computed at this depth once and sliced for smaller requests
+    MAX_LIMIT = 100
+    # Upper bound on staleness for writes made by other worker processes
+    CACHE_TTL = float(os.getenv('LEADERBOARD_CACHE_TTL', 60))
+    
+    _cache = {}  # (metric, match_type) -> (computed_at, ranking)
+    _generation = 0  # bumped by invalidate(), so rankings read before it are not stored
+    _lock = threading.Lock()
+    
+    @staticmethod
+    def invalidate():
+        """Drop every cached ranking; called after matches are recorded."""
+        with LeaderboardService._lock:
+            LeaderboardService._generation += 1
+            LeaderboardService._cache.clear()
+    
+    @staticmethod
+    def _ranking(metric, match_type):
+        """Return the cached ranking for a metric and match type, refreshing if stale."""
+        key = (metric, match_type)
+        now = time.monotonic()
+        with LeaderboardService._lock:
+            cached = LeaderboardService._cache.get(key)
+            generation = LeaderboardService._generation
+        if cached and now - cached[0] < LeaderboardService.CACHE_TTL:
+            return cached[1]
+        
+        ranking = Leaderboard.top(metric, match_type, LeaderboardService.MAX_LIMIT)
+        with LeaderboardService._lock:
+            # A match recorded during the query may be missing from this ranking
+            if LeaderboardService._generation == generation:
+                LeaderboardService._cache[key] = (now, ranking)
+        return ranking
+    
+    @staticmethod
+    def get_leaderboard(metric='bagels_given', match_type=None, limit=10):
+        """
+        Get the top players for a metric.
+        
+        Args:
+            metric (str): One of Leaderboard.METRICS
+            match_type (str): 'singles', 'doubles', or None for both combined
+            limit (int): Number of players to return (at most MAX_LIMIT)
+            
+        Returns:
+            dict: Result with the ranked players and success status; bad
+                arguments are flagged with error "invalid_request"
+        """
+        if metric not in Leaderboard.METRICS:
+            return {
+                "success": False,
+                "error": "invalid_request",
+                "message": f"Invalid metric. Must be one of: {', '.join(Leaderboard.METRICS)}"
+            }
+        
+        if match_type is not None and match_type not in Leaderboard.MATCH_TYPES:
+            return {
+                "success": False,
+                "error": "invalid_request",
+                "message": "Invalid match type. Must be 'singles' or 'doubles'"
+            }
+        
+        try:
+            ranking = LeaderboardService._ranking(metric, match_type)
+            return {
+                "success": True,
+                "message": "Leaderboard retrieved successfully",
+                "metric": metric,
+                "type": match_type,
+                "leaderboard": ranking[:max(1, min(limit, LeaderboardService.MAX_LIMIT))]
+            }
+        except Exception as e:
+            return {"success": False, "message": f"Error retrieving leaderboard: {str(e)}"}
@@ -0,0 +1,104 @@
+import json
+import queue
+import threading
+
+class MatchEvent:
+    """A recorded match, published to every feed subscriber.
+    The SSE text is encoded once, by the first subscriber that sends it.
+    """
+    __slots__ = ('match_id', 'match', '_text')
+    
+    def __init__(self, match):
+        self.match_id = match["match_id"]
+        self.match = match
+        self._text = None
+    
+    def text(self, encoder):
+        if self._text is None:
+            self._text = MatchEvent.format(self.match, encoder)
+        return self._text
+    
+    @staticmethod
+    def format(match, encoder):
+        """Format a match dict as an SSE `match` event whose id is its match_id."""
+        data = json.dumps(match, cls=encoder, separators=(',', ':'))
+        return f"id: {match['match_id']}\nevent: match\ndata: {data}\n\n"
+
+class Subscription:
+    """One connected client's bounded queue of MatchEvents."""
+    
+    def __init__(self, queue_size):
+        self.queue = queue.Queue(maxsize=queue_size)
+        # Set when the client fell queue_size events behind and was cut off
+        self.dropped = False
+    
+    def get(self, timeout):
+        """Return the next event, or None after `timeout` seconds without one."""
+        try:
+            # A dropped subscriber only drains what is already queued
+            return self.queue.get(block=not self.dropped, timeout=timeout)
+        except queue.Empty:
+            return None
+
+class MatchFeed:
+    """In-process pub/sub hub for newly recorded matches.
+    
+    MatchService publishes after each commit; every subscriber has its own
+    bounded queue, so publishing never blocks on a slow client. A subscriber
+    whose queue is full is dropped instead: its stream ends after the events
+    already queued, and the client reconnects with Last-Event-ID and replays
+    what it missed from the Matches table. The hub only sees matches recorded
+    by this process; with several workers, clients pick up other workers'
+    matches on their next replay.
+    """
+    
+    def __init__(self, queue_size=100, max_subscribers=100):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._counters = {"published": 0, "delivered": 0, "dropped_subscribers": 0, "rejected": 0}
+    
+    def subscribe(self):
+        """Register a new subscriber, or return None when max_subscribers are connected."""
+        subscription = Subscription(self.queue_size)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                self._counters["rejected"] += 1
+                return None
+            self._subscribers.add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+    
+    def publish(self, matches):
+        """Queue an event for each match dict on every subscriber, without blocking."""
+        events = [MatchEvent(match) for match in matches]
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self._counters["published"] += len(events)
+        
+        delivered = 0
+        dropped = []
+        for subscription in subscribers:
+            try:
+                for event in events:
+                    subscription.queue.put_nowait(event)
+                    delivered += 1
+            except queue.Full:
+                subscription.dropped = True
+                dropped.append(subscription)
+        
+        with self._lock:
+            self._subscribers.difference_update(dropped)
+            self._counters["delivered"] += delivered
+            self._counters["dropped_subscribers"] += len(dropped)
+    
+    def stats(self):
+        """Return publish/delivery counters and the number of connected subscribers."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["subscribers"] = len(self._subscribers)
+        return stats
@@ -1,7 +1,153 @@
+import os
 from app.models.match import Match
 from app.models.user import User
+from app.services.leaderboard_service import LeaderboardService
+from app.services.match_feed import MatchEvent, MatchFeed
+from app.utils.pagination import encode_cursor
 
 class MatchService:
+    # Player name fields and the ID fields they resolve to
+    NAME_TO_ID_FIELDS = {
+        'team1_player1_name': 'team1_player1_id',
+        'team1_player2_name': 'team1_player2_id',
+        'team2_player1_name': 'team2_player1_id',
+        'team2_player2_name': 'team2_player2_id'
+    }
+    
+    # Largest batch accepted by record_matches
+    MAX_BULK_MATCHES = 1000
+    
+    # Seconds between keep-alive comments on idle match streams
+    STREAM_HEARTBEAT_INTERVAL = float(os.getenv('MATCH_FEED_HEARTBEAT', 15))
+    # Matches replayed to a reconnecting stream before it is told to reload instead
+    STREAM_REPLAY_LIMIT = 1000
+    STREAM_REPLAY_PAGE_SIZE = 100
+    
+    @staticmethod
+    def player_names(match_data):
+        """Return the player names present in match_data."""
+        return [
+            match_data[name_field]
+            for name_field in MatchService.NAME_TO_ID_FIELDS
+            if match_data.get(name_field)
+        ]
+    
+    @staticmethod
+    def resolve_player_names(match_data, user_ids=None):
+        """
+        Replace player names in match_data with user IDs using one lookup.
+        
+        Args:
+            match_data (dict): Match data that may contain *_name player fields
+            user_ids (dict): Optional name to user_id map already resolved by the caller
+            
+        Returns:
+            str: An error message if a name does not exist, otherwise None
+        """
+        if user_ids is None:
+            names = MatchService.player_names(match_data)
+            if not names:
+                return None
+            user_ids = User.find_many_by_names(names)
+        
+        for name_field, id_field in MatchService.NAME_TO_ID_FIELDS.items():
+            username = match_data.get(name_field)
+            if username:
+                if username not in user_ids:
+                    return f"User not found: {username}"
+                match_data[id_field] = user_ids[username]
+        return None
+    
+    @staticmethod
+    def coerce_integer_fields(match_data):
+        """
+        Convert player ID and score fields in match_data to integers.
+        
+        Args:
+            match_data (dict): Raw match data from the request body
+            
+        Returns:
+            str: An error message if a score is not an integer, otherwise None
+        """
+        for field in ['team1_player1_id', 'team1_player2_id', 'team2_player1_id', 
+                      'team2_player2_id', 'team1_score', 'team2_score']:
+            if field in match_data and match_data[field] is not None:
+                try:
+                    match_data[field] = int(match_data[field])
+                except (ValueError, TypeError):
+                    if field.endswith('score'):
+                        return f"{field} must be an integer"
+        return None
+    
+    @staticmethod
+    def build_match(reporter_user_id, match_data):
+        """
+        Validates match data and builds an unsaved Match.
+        
+        Args:
+            reporter_user_id (int): The user ID of the person reporting the match
+            match_data (dict): Data for the match with player names already resolved to IDs
+            
+        Returns:
+            tuple: (Match, None) if the data is valid, otherwise (None, error message)
+        """
+        # Validate required fields - now checking for IDs that may have been converted from names
+        required_fields = ['match_type', 'team1_player1_id', 'team2_player1_id', 
+                          'team1_score', 'team2_score']
+        
+        for field in required_fields:
+            if field not in match_data or match_data[field] is None:
+                return None, f"Missing required field: {field}"
+        
+        # Validate match type
+        match_type = match_data['match_type']
+        if match_type not in ['singles', 'doubles']:
+            return None, "Invalid match type. Must be 'singles' or 'doubles'"
+        
+        # Validate players
+        team1_player1_id = match_data['team1_player1_id']
+        team2_player1_id = match_data['team2_player1_id']
+        team1_player2_id = match_data.get('team1_player2_id')
+        team2_player2_id = match_data.get('team2_player2_id')
+        
+        # Check if all specified players exist
+        player_ids = [team1_player1_id, team2_player1_id]
+        if match_type == 'doubles':
+            if team1_player2_id is None or team2_player2_id is None:
+                return None, "Doubles match requires four players"
+            player_ids.extend([team1_player2_id, team2_player2_id])
+        
+        # Validate no player is listed twice
+        if len(set(player_ids)) < len(player_ids):
+            return None, "A player cannot be listed more than once in a match"
+        
+        # Validate scores (must be non-negative integers)
+        team1_score = match_data['team1_score']
+        team2_score = match_data['team2_score']
+        
+        if not isinstance(team1_score, int) or not isinstance(team2_score, int):
+            return None, "Scores must be integers"
+        
+        if team1_score < 0 or team2_score < 0:
+            return None, "Scores cannot be negative"
+        
+        # Validate at least one team has a valid tennis score (usually 6 for a standard set)
+        if max(team1_score, team2_score) < 6:
+            return None, "At least one team should have a score of 6 or higher for a completed match"
+        
+        # Create the match
+        match = Match(
+            match_type=match_type,
+            reporter_user_id=reporter_user_id,
+            team1_player1_id=team1_player1_id,
+            team1_player2_id=team1_player2_id,
+            team2_player1_id=team2_player1_id,
+            team2_player2_id=team2_player2_id,
+            team1_score=team1_score,
+            team2_score=team2_score
+        )
+        return match, None
+    
     @staticmethod
     def record_match(reporter_user_id, match_data):
         """
@@ -12,160 +158,233 @@ class MatchService:
             match_data (dict): Data for the match (match_type, player names/IDs, scores)
             
         Returns:
-            dict: Result of the operation with success status, message, and match_id if successful
+            dict: Result of the operation with success status, message, match_id and
+                the saved match if successful
         """
         try:
             # Convert player names to IDs if names are provided
-            name_to_id_mapping = {
-                'team1_player1_name': 'team1_player1_id',
-                'team1_player2_name': 'team1_player2_id',
-                'team2_player1_name': 'team2_player1_id',
-                'team2_player2_name': 'team2_player2_id'
-            }
+            error = MatchService.resolve_player_names(match_data)
+            if error:
+                return {"success": False, "message": error}
             
-            for name_field, id_field in name_to_id_mapping.items():
-                if name_field in match_data and match_data[name_field]:
-                    username = match_data[name_field]
-                    user = User.find_by_name(username)
-                    if not user:
-                        return {
-                            "success": False,
-                            "message": f"User not found: {username}"
-                        }
-                    match_data[id_field] = user.user_id
-            
-            # Validate required fields - now checking for IDs that may have been converted from names
-            required_fields = ['match_type', 'team1_player1_id', 'team2_player1_id', 
-                              'team1_score', 'team2_score']
-            
-            for field in required_fields:
-                if field not in match_data or match_data[field] is None:
-                    return {
-                        "success": False, 
-                        "message": f"Missing required field: {field}"
-                    }
-            
-            # Validate match type
-            match_type = match_data['match_type']
-            if match_type not in ['singles', 'doubles']:
-                return {
-                    "success": False,
-                    "message": "Invalid match type. Must be 'singles' or 'doubles'"
-                }
+            match, error = MatchService.build_match(reporter_user_id, match_data)
+            if error:
+                return {"success": False, "message": error}
             
-            # Validate players
-            team1_player1_id = match_data['team1_player1_id']
-            team2_player1_id = match_data['team2_player1_id']
-            team1_player2_id = match_data.get('team1_player2_id')
-            team2_player2_id = match_data.get('team2_player2_id')
-            
-            # Check if all specified players exist
-            player_ids = [team1_player1_id, team2_player1_id]
-            if match_type == 'doubles':
-                if team1_player2_id is None or team2_player2_id is None:
-                    return {
-                        "success": False,
-                        "message": "Doubles match requires four players"
-                    }
-                player_ids.extend([team1_player2_id, team2_player2_id])
-            
-            # Validate no player is listed twice
-            if len(set(player_ids)) < len(player_ids):
-                return {
-                    "success": False,
-                    "message": "A player cannot be listed more than once in a match"
-                }
+            # Save will calculate winner and bagel status
+            match.save()
+            LeaderboardService.invalidate()
             
-            # Validate scores (must be non-negative integers)
-            team1_score = match_data['team1_score']
-            team2_score = match_data['team2_score']
+            saved = match.to_dict()
+            MatchService.feed.publish([saved])
             
-            if not isinstance(team1_score, int) or not isinstance(team2_score, int):
-                return {
-                    "success": False,
-                    "message": "Scores must be integers"
-                }
+            return {
+                "success": True,
+                "message": "Match recorded successfully",
+                "match_id": match.match_id,
+                "is_bagel": match.is_bagel,
+                "match": saved
+            }
             
-            if team1_score < 0 or team2_score < 0:
-                return {
-                    "success": False,
-                    "message": "Scores cannot be negative"
-                }
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+        except Exception as e:
+            return {"success": False, "message": f"Error recording match: {str(e)}"}
+            
+    @staticmethod
+    def record_matches(reporter_user_id, matches_data):
+        """
+        Records a batch of tennis matches in a single transaction.
+        
+        Every row is validated with the same rules as record_match before anything
+        is written; if any row is invalid nothing is saved and the per-row errors
+        are returned.
+        
+        Args:
+            reporter_user_id (int): The user ID of the person reporting the matches
+            matches_data (list): Match data dicts, each shaped like record_match input
+            
+        Returns:
+            dict: Result with success status, message, and match_ids or per-row errors
+        """
+        if not isinstance(matches_data, list) or not matches_data:
+            return {"success": False, "message": "matches must be a non-empty list"}
+        
+        if len(matches_data) > MatchService.MAX_BULK_MATCHES:
+            return {
+                "success": False,
+                "message": f"At most {MatchService.MAX_BULK_MATCHES} matches can be recorded at once"
+            }
+        
+        try:
+            # Resolve every player name in the batch with one lookup
+            names = [
+                name
+                for match_data in matches_data if isinstance(match_data, dict)
+                for name in MatchService.player_names(match_data)
+            ]
+            user_ids = User.find_many_by_names(names)
             
-            # Validate at least one team has a valid tennis score (usually 6 for a standard set)
-            if max(team1_score, team2_score) < 6:
+            matches = []
+            errors = []
+            for index, match_data in enumerate(matches_data):
+                if not isinstance(match_data, dict):
+                    errors.append({"index": index, "message": "Match data must be an object"})
+                    continue
+                
+                error = (MatchService.coerce_integer_fields(match_data)
+                         or MatchService.resolve_player_names(match_data, user_ids))
+                if not error:
+                    match, error = MatchService.build_match(reporter_user_id, match_data)
+                if error:
+                    errors.append({"index": index, "message": error})
+                else:
+                    matches.append(match)
+            
+            if errors:
                 return {
                     "success": False,
-                    "message": "At least one team should have a score of 6 or higher for a completed match"
+                    "message": f"{len(errors)} of {len(matches_data)} matches are invalid; nothing was recorded",
+                    "errors": errors
                 }
             
-            # Create and save the match
-            match = Match(
-                match_type=match_type,
-                reporter_user_id=reporter_user_id,
-                team1_player1_id=team1_player1_id,
-                team1_player2_id=team1_player2_id,
-                team2_player1_id=team2_player1_id,
-                team2_player2_id=team2_player2_id,
-                team1_score=team1_score,
-                team2_score=team2_score
-            )
-            
-            # Save will calculate winner and bagel status
-            match.save()
+            Match.save_many(matches)
+            LeaderboardService.invalidate()
+            MatchService.feed.publish([match.to_dict() for match in matches])
             
             return {
                 "success": True,
-                "message": "Match recorded successfully",
-                "match_id": match.match_id,
-                "is_bagel": match.is_bagel
+                "message": f"{len(matches)} matches recorded successfully",
+                "match_ids": [match.match_id for match in matches],
+                "bagel_count": sum(1 for match in matches if match.is_bagel)
             }
             
         except ValueError as e:
             return {"success": False, "message": str(e)}
         except Exception as e:
-            return {"success": False, "message": f"Error recording match: {str(e)}"}
-            
+            return {"success": False, "message": f"Error recording matches: {str(e)}"}
+    
+    @staticmethod
+    def _page(matches, limit, columnar=False):
+        """Trim a limit + 1 fetch to one page and build the cursor for the next."""
+        if len(matches) <= limit:
+            return matches, None
+        matches = matches[:limit]
+        last = matches[-1]
+        if columnar:
+            last = dict(zip(Match.PUBLIC_FIELDS, last))
+        return matches, encode_cursor(last["match_date"], last["match_id"])
+    
+    @staticmethod
+    def _page_result(matches, next_cursor, columnar):
+        """Build a match listing response, with a column header when columnar."""
+        result = {
+            "success": True,
+            "message": "Matches retrieved successfully",
+            "matches": matches,
+            "next_cursor": next_cursor
+        }
+        if columnar:
+            result["columns"] = list(Match.PUBLIC_FIELDS)
+        return result
+    
     @staticmethod
-    def get_user_matches(user_id, limit=10):
+    def get_user_matches(user_id, limit=10, before=None, columnar=False):
         """
-        Get recent matches for a specific user.
+        Get a page of recent matches for a specific user.
         
         Args:
             user_id (int): The user ID to fetch matches for
             limit (int): Maximum number of matches to return
+            before (tuple): Decoded cursor (match_date, match_id) to continue from
+            columnar (bool): Return each match as a row of values under a single
+                "columns" header instead of as an object
             
         Returns:
-            dict: Result with matches list and success status
+            dict: Result with matches list, next_cursor and success status
         """
         try:
-            matches = Match.get_matches_by_user(user_id, limit)
-            return {
-                "success": True,
-                "message": "Matches retrieved successfully",
-                "matches": matches
-            }
+            # Fetch one extra row to learn whether another page exists
+            matches = Match.get_matches_by_user(user_id, limit + 1, before, columnar)
+            matches, next_cursor = MatchService._page(matches, limit, columnar)
+            return MatchService._page_result(matches, next_cursor, columnar)
         except Exception as e:
             return {"success": False, "message": f"Error retrieving matches: {str(e)}"}
     
     @staticmethod
-    def get_all_matches(limit=50):
+    def get_all_matches(limit=50, before=None, columnar=False):
         """
-        Get all matches from the database, with an optional limit.
+        Get a page of matches from the database, newest first.
         
         Args:
             limit (int): Maximum number of matches to return
+            before (tuple): Decoded cursor (match_date, match_id) to continue from
+            columnar (bool): Return each match as a row of values under a single
+                "columns" header instead of as an object
             
         Returns:
-            dict: Result with matches list and success status
+            dict: Result with matches list, next_cursor and success status
         """
         try:
-            # Call the static method on Match model
-            matches = Match.get_all_matches(limit)
-            return {
-                "success": True,
-                "message": "Matches retrieved successfully",
-                "matches": matches
-            }
+            # Fetch one extra row to learn whether another page exists
+            matches = Match.get_all_matches(limit + 1, before, columnar)
+            matches, next_cursor = MatchService._page(matches, limit, columnar)
+            return MatchService._page_result(matches, next_cursor, columnar)
         except Exception as e:
-            return {"success": False, "message": f"Error retrieving matches: {str(e)}"}
\ No newline at end of file
+            return {"success": False, "message": f"Error retrieving matches: {str(e)}"}
+    
+    @staticmethod
+    def stream_matches(subscription, last_event_id, encoder):
+        """
+        Generate the server-sent events for one match stream.
+        
+        Matches recorded after `last_event_id` are replayed from the database
+        first, then events published to the subscription follow as they arrive,
+        with a comment line whenever the stream is idle for the heartbeat
+        interval. The stream ends if the subscriber is dropped for falling behind.
+        
+        The replay resumes by match_id, which on SQL Server can skip a match
+        whose transaction committed after a higher ID was sent (see
+        Match.get_matches_after). Clients that must not miss one should reload
+        their lists after a reconnect rather than rely on the replay alone.
+        
+        Args:
+            subscription (Subscription): Registered with MatchService.feed before the
+                response starts, so nothing recorded meanwhile is missed
+            last_event_id (int): match_id of the last event the client saw, or None
+            encoder (type): JSON encoder class for the match payloads
+            
+        Yields:
+            str: SSE text
+        """
+        # Reconnect quickly after a drop; the replay covers the gap
+        yield "retry: 1000\n\n"
+        
+        replayed = set()
+        if last_event_id is not None:
+            after = last_event_id
+            while len(replayed) < MatchService.STREAM_REPLAY_LIMIT:
+                matches = Match.get_matches_after(after, MatchService.STREAM_REPLAY_PAGE_SIZE)
+                for match in matches:
+                    replayed.add(match["match_id"])
+                    yield MatchEvent.format(match, encoder)
+                if len(matches) < MatchService.STREAM_REPLAY_PAGE_SIZE:
+                    break
+                after = matches[-1]["match_id"]
+            else:
+                # Too far behind to catch up event by event
+                yield "event: reset\ndata: {}\n\n"
+        
+        while True:
+            event = subscription.get(MatchService.STREAM_HEARTBEAT_INTERVAL)
+            if event is None:
+                if subscription.dropped:
+                    return
+                yield ": keep-alive\n\n"
+            elif event.match_id not in replayed:
+                yield event.text(encoder)
+
+MatchService.feed = MatchFeed(
+    queue_size=int(os.getenv('MATCH_FEED_QUEUE_SIZE', 100)),
+    max_subscribers=int(os.getenv('MATCH_FEED_MAX_SUBSCRIBERS', 100))
+)
@@ -0,0 +1,103 @@
+from app.models.head_to_head import HeadToHead
+from app.models.partnership import Partnership
+from app.models.player_stats import PlayerStats
+from app.models.rating import PlayerRating
+
+class StatsService:
+    @staticmethod
+    def get_user_stats(user_id):
+        """
+        Get win/loss and bagel counters for a user.
+        
+        Args:
+            user_id (int): The user ID to fetch stats for
+            
+        Returns:
+            dict: Result with stats split by singles, doubles and totals
+        """
+        try:
+            stats = PlayerStats.find_by_user(user_id)
+            return {
+                "success": True,
+                "message": "Stats retrieved successfully",
+                "user_id": user_id,
+                "stats": stats
+            }
+        except Exception as e:
+            return {"success": False, "message": f"Error retrieving stats: {str(e)}"}
+    
+    @staticmethod
+    def get_user_ratings(user_id):
+        """
+        Get a user's Elo ratings.
+        
+        Args:
+            user_id (int): The user ID to fetch ratings for
+            
+        Returns:
+            dict: Result with singles and doubles ratings
+        """
+        try:
+            ratings = PlayerRating.find_by_user(user_id)
+            return {
+                "success": True,
+                "message": "Ratings retrieved successfully",
+                "user_id": user_id,
+                "ratings": ratings
+            }
+        except Exception as e:
+            return {"success": False, "message": f"Error retrieving ratings: {str(e)}"}
+    
+    @staticmethod
+    def get_head_to_head(a, b):
+        """
+        Get the record between two players.
+        
+        Args:
+            a (int): The user ID whose side the record is told from
+            b (int): The opponent's user ID
+            
+        Returns:
+            dict: Result with a's wins, losses, bagels and last match against b,
+                split by singles, doubles and totals
+        """
+        if a == b:
+            return {"success": False, "message": "Choose two different players"}
+        
+        try:
+            record = HeadToHead.find_pair(a, b)
+            return {
+                "success": True,
+                "message": "Head-to-head record retrieved successfully",
+                "a": a,
+                "b": b,
+                "head_to_head": record
+            }
+        except Exception as e:
+            return {"success": False, "message": f"Error retrieving head-to-head record: {str(e)}"}
+    
+    @staticmethod
+    def get_partners(user_id, limit=5, min_matches=3):
+        """
+        Get a user's best and worst doubles partners.
+        
+        Args:
+            user_id (int): The user ID to fetch partners for
+            limit (int): Number of partners in each list
+            min_matches (int): Matches a partnership needs to be ranked
+            
+        Returns:
+            dict: Result with best and worst partners by win rate
+        """
+        try:
+            best, worst = Partnership.find_best_and_worst(user_id, limit, min_matches)
+            return {
+                "success": True,
+                "message": "Partners retrieved successfully",
+                "user_id": user_id,
+                "min_matches": min_matches,
+                "best": best,
+                "worst": worst
+            }
+        except Exception as e:
+            return {"success": False, "message": f"Error retrieving partners: {str(e)}"}
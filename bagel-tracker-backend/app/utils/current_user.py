@@ -0,0 +1,149 @@
+"""The authenticated user of a request.
+
+`login_required` replaces flask_jwt_extended's `jwt_required` on protected
+routes. It resolves the token's identity once per request into a
+`CurrentUser` on `g`, which views read with `get_current_user()` instead of
+parsing `get_jwt_identity()` themselves.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from flask import g, jsonify, request
+from flask_jwt_extended import get_jwt, get_jwt_identity, get_jwt_request_location, verify_jwt_in_request
+from app.models.user import User
+
+class CurrentUser:
+    """Identity carried in access tokens (as a JSON string)."""
+    __slots__ = ('user_id', 'email', 'name')
+
+    def __init__(self, user_id, email, name):
+        self.user_id = user_id
+        self.email = email
+        self.name = name
+
+    @staticmethod
+    def from_identity(identity):
+        """Parse a token identity; raises ValueError if it is malformed."""
+        try:
+            fields = json.loads(identity)
+            return CurrentUser(int(fields['user_id']), fields.get('email'), fields.get('name'))
+        except (TypeError, KeyError, ValueError) as e:
+            raise ValueError("Invalid user identity in token") from e
+
+    @staticmethod
+    def identity_for(user):
+        """Build the token identity for a User."""
+        return json.dumps({"user_id": user.user_id, "email": user.email, "name": user.name})
+
+    def to_dict(self):
+        return {"user_id": self.user_id, "email": self.email, "name": self.name}
+
+class IdentityCache:
+    """LRU of Authorization header -> (expires_at, CurrentUser) for tokens that
+    already passed verification, so repeat requests skip decoding the JWT.
+    Entries never outlive the token's own expiry. A ttl of 0 disables it.
+    """
+
+    def __init__(self, max_size=4096, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0}
+
+    def get(self, header):
+        if not self.ttl:
+            return None
+        with self._lock:
+            entry = self._entries.get(header)
+            if entry and entry[0] > time.time():
+                self._entries.move_to_end(header)
+                self._counters["hits"] += 1
+                return entry[1]
+            self._entries.pop(header, None)
+            self._counters["misses"] += 1
+        return None
+
+    def put(self, header, user, token_expires_at):
+        if not self.ttl:
+            return
+        expires_at = min(time.time() + self.ttl, token_expires_at)
+        with self._lock:
+            self._entries[header] = (expires_at, user)
+            self._entries.move_to_end(header)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else None
+        return stats
+
+identity_cache = IdentityCache(
+    max_size=int(os.getenv('AUTH_IDENTITY_CACHE_SIZE', 4096)),
+    ttl=float(os.getenv('AUTH_IDENTITY_CACHE_TTL', 60))
+)
+
+# Reject tokens of deactivated users (looked up through User.cache)
+REQUIRE_ACTIVE = os.getenv('AUTH_REQUIRE_ACTIVE', 'true').lower() in ('1', 'true', 'yes')
+
+def _resolve_current_user():
+    """Return the request's CurrentUser, verifying the token unless it is cached."""
+    header = request.headers.get('Authorization')
+    user = identity_cache.get(header) if header else None
+    if user is not None:
+        return user
+
+    # Raises the usual flask_jwt_extended errors (401 responses) for bad tokens
+    verify_jwt_in_request()
+    user = CurrentUser.from_identity(get_jwt_identity())
+    if header and get_jwt_request_location() == 'headers':
+        identity_cache.put(header, user, get_jwt()['exp'])
+    return user
+
+def login_required(require_active=None):
+    """Require a valid access token and set `g.current_user` for the view.
+
+    Args:
+        require_active (bool): Reject users that no longer exist or are not
+            is_active; defaults to the AUTH_REQUIRE_ACTIVE setting
+    """
+    if require_active is None:
+        require_active = REQUIRE_ACTIVE
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method == 'OPTIONS':
+                return view(*args, **kwargs)
+
+            try:
+                user = _resolve_current_user()
+            except ValueError as e:
+                return jsonify({"success": False, "message": str(e)}), 400
+
+            if require_active:
+                account = User.find_by_id(user.user_id)
+                if account is None:
+                    return jsonify({"success": False, "message": "User no longer exists"}), 401
+                if not account.is_active:
+                    return jsonify({"success": False, "message": "Account is deactivated"}), 403
+
+            g.current_user = user
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def get_current_user():
+    """Return the CurrentUser set by login_required for this request."""
+    return g.current_user
@@ -1,45 +1,313 @@
 import os
-import pyodbc
+import threading
+import time
+from contextlib import contextmanager
 from dotenv import load_dotenv
+from flask import g, has_app_context
+from app.utils.db_metrics import init_app as init_db_metrics, instrument_connection, record_acquire
+from app.utils.dialects import create_dialect
 
 # Load environment variables
 load_dotenv()
 
+_dialect = None
+
+def get_dialect():
+    """Return the SQL dialect for the configured DB_BACKEND (default sqlserver)."""
+    global _dialect
+    if _dialect is None:
+        _dialect = create_dialect(os.getenv('DB_BACKEND', 'sqlserver'))
+    return _dialect
+
+def set_dialect(dialect):
+    """Switch backends, dropping the pool so new connections use `dialect`."""
+    global _dialect
+    _dialect = dialect
+    set_pool(None)
+
 def get_db_connection():
-    """Create and return a connection to the database"""
-    connection_string = (
-        f"Driver={os.getenv('DB_DRIVER')};"
-        f"Server={os.getenv('DB_SERVER')};"
-        f"Database={os.getenv('DB_NAME')};"
-        f"Uid={os.getenv('DB_USER')};"
-        f"Pwd={os.getenv('DB_PASSWORD')};"
-        f"Encrypt=yes;"
-        f"TrustServerCertificate=no;"
-        f"Connection Timeout=30;"
-    )
-    
-    return pyodbc.connect(connection_string)
+    """Create and return a connection to the database, instrumented unless
+    DB_INSTRUMENTATION is off
+    """
+    return instrument_connection(get_dialect().connect())
 
-def execute_query(query, params=None, fetch=True):
-    """Execute a query and return results if needed"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available in time."""
+
+class ConnectionPool:
+    """A bounded, thread-safe pool of database connections.
+
+    `connect` is any callable returning a DB-API connection, so the pool can
+    be driven by pyodbc in production and by sqlite3 locally.
+    """
+
+    def __init__(self, connect, max_size=10, idle_timeout=300,
+                 checkout_timeout=30, health_check_interval=30,
+                 health_check_query="SELECT 1"):
+        self._connect = connect
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self.health_check_query = health_check_query
+
+        self._lock = threading.Condition()
+        self._idle = []  # (connection, last_used) pairs, most recently used last
+        self._size = 0   # open connections, idle and checked out
+        self._metrics = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time_ms": 0.0,
+            "creations": 0,
+            "evictions": 0,
+            "health_check_failures": 0,
+            "timeouts": 0
+        }
+
+    def acquire(self):
+        """Check out a connection, creating one if the pool is not full."""
+        deadline = time.monotonic() + self.checkout_timeout
+        waited_since = None
+
+        with self._lock:
+            while True:
+                self._evict_idle()
+
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+
+                if self._size < self.max_size:
+                    # Reserve the slot before connecting outside the lock
+                    self._size += 1
+                    conn, last_used = None, None
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._metrics["timeouts"] += 1
+                    raise PoolTimeoutError(
+                        f"No database connection available after {self.checkout_timeout}s"
+                    )
+
+                if waited_since is None:
+                    waited_since = time.monotonic()
+                    self._metrics["waits"] += 1
+                self._lock.wait(remaining)
+
+            if waited_since is not None:
+                self._metrics["wait_time_ms"] += (time.monotonic() - waited_since) * 1000
+            self._metrics["checkouts"] += 1
+
+        if conn is not None and not self._is_healthy(conn, last_used):
+            # Replace the dead connection, keeping its slot reserved
+            self._discard(conn)
+            with self._lock:
+                self._metrics["health_check_failures"] += 1
+            conn = None
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                    self._lock.notify()
+                raise
+            with self._lock:
+                self._metrics["creations"] += 1
+
+        return conn
+
+    def release(self, conn, discard=False):
+        """Return a connection to the pool, or close it if it is broken."""
+        if not discard:
+            try:
+                # Never hand uncommitted work to the next borrower
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        if discard:
+            self._discard(conn)
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            return
+
+        with self._lock:
+            self._idle.append((conn, time.monotonic()))
+            self._lock.notify()
+
+    def close(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def metrics(self):
+        """Return a snapshot of the pool counters."""
+        with self._lock:
+            snapshot = dict(self._metrics)
+            snapshot.update({
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self.max_size
+            })
+        return snapshot
+
+    def _evict_idle(self):
+        """Drop connections that have sat idle longer than idle_timeout (lock held)."""
+        if not self._idle:
+            return
+        cutoff = time.monotonic() - self.idle_timeout
+        stale = [conn for conn, last_used in self._idle if last_used < cutoff]
+        if stale:
+            self._idle = [(conn, last_used) for conn, last_used in self._idle if last_used >= cutoff]
+            self._size -= len(stale)
+            self._metrics["evictions"] += len(stale)
+            for conn in stale:
+                self._discard(conn)
+
+    def _is_healthy(self, conn, last_used):
+        """Ping connections that have been idle for a while before reuse."""
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(self.health_check_query)
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _discard(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    get_db_connection,
+                    max_size=int(os.getenv('DB_POOL_SIZE', 10)),
+                    idle_timeout=float(os.getenv('DB_POOL_IDLE_TIMEOUT', 300)),
+                    checkout_timeout=float(os.getenv('DB_POOL_TIMEOUT', 30)),
+                    health_check_interval=float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', 30)),
+                    health_check_query=get_dialect().health_check_query
+                )
+    return _pool
+
+def set_pool(pool):
+    """Replace the process-wide pool, or drop it with None to recreate on next use."""
+    global _pool
+    with _pool_lock:
+        old, _pool = _pool, pool
+    if old is not None:
+        old.close()
+
+def _acquire(pool):
+    """Check out a connection, recording how long it took."""
+    start = time.perf_counter()
+    conn = pool.acquire()
+    record_acquire((time.perf_counter() - start) * 1000)
+    return conn
+
+@contextmanager
+def db_connection():
+    """Yield a pooled connection.
+
+    Inside a Flask app context the connection is checked out once and reused
+    for the rest of the request; it is returned by `release_request_connection`.
+    """
+    if has_app_context():
+        conn = g.get('_db_conn')
+        if conn is None:
+            conn = _acquire(get_pool())
+            g._db_conn = conn
+        yield conn
+        return
+
+    pool = get_pool()
+    conn = _acquire(pool)
     try:
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
-            
-        if fetch:
-            result = cursor.fetchall()
-            return result
-        else:
-            conn.commit()
-            return cursor.rowcount
-    except Exception as e:
-        conn.rollback()
-        raise e
+        yield conn
     finally:
-        cursor.close()
-        conn.close()
\ No newline at end of file
+        pool.release(conn)
+
+def release_request_connection(exception=None):
+    """Return the request's connection to the pool at app context teardown."""
+    conn = g.pop('_db_conn', None)
+    if conn is not None:
+        get_pool().release(conn)
+
+def init_app(app):
+    """Register the per-request connection teardown and DB report on a Flask app."""
+    init_db_metrics(app)
+    app.teardown_appcontext(release_request_connection)
+
+def query_records(mapper, query, params=None, serialize=False, columnar=False):
+    """Execute a query and return its rows as records built by a RowMapper,
+    with serialize=True as the mapper's API dicts, or with columnar=True as
+    tuples of the mapper's public fields.
+    """
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        
+        try:
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            if columnar:
+                return mapper.columns(cursor.description, cursor.fetchall())
+            if serialize:
+                return mapper.serialize(cursor.description, cursor.fetchall())
+            return mapper.map(cursor.description, cursor.fetchall())
+        finally:
+            cursor.close()
+
+def insert_returning(cursor, table, columns, params, returning):
+    """Insert one row on the caller's transaction and return its generated
+    `returning` columns (identity, server-side defaults) from the same statement.
+    """
+    cursor.execute(get_dialect().insert(table, columns, returning=returning), params)
+    return cursor.fetchall()[0]
+
+def execute_query(query, params=None, fetch=True):
+    """Execute a query and return results if needed"""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+
+        try:
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+
+            if fetch:
+                result = cursor.fetchall()
+                return result
+            else:
+                conn.commit()
+                return cursor.rowcount
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
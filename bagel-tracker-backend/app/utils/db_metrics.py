@@ -0,0 +1,298 @@
+"""Database instrumentation: statement timings, per-request totals and slow queries.
+
+Connections handed out by the pool are wrapped so that every `execute` and
+`executemany` is timed and recorded under a fingerprint of its SQL (literals
+and repeated VALUES rows folded away). Each request accumulates its statement
+count, DB time and connection-acquire time on `g`; these are sent back in a
+`Server-Timing` header and logged as one JSON line per request. Statements
+slower than DB_SLOW_QUERY_MS are logged as warnings. Process-wide histograms
+per fingerprint are exposed by `query_metrics.snapshot()`.
+"""
+import functools
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from flask import g, has_app_context, has_request_context, request
+
+logger = logging.getLogger(__name__)
+
+# Wrap connections and record timings (DB_INSTRUMENTATION=false turns it off)
+ENABLED = os.getenv('DB_INSTRUMENTATION', 'true').lower() in ('1', 'true', 'yes')
+# Statements slower than this are logged as warnings; 0 disables
+SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', 250))
+# Add a Server-Timing header with the request's DB totals
+SERVER_TIMING = os.getenv('DB_SERVER_TIMING', 'true').lower() in ('1', 'true', 'yes')
+
+# Upper bounds (ms) of the latency histogram buckets
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+_PLACEHOLDERS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ROWS = re.compile(r"\(\?\+\)(?:\s*,\s*\(\?\+\))+")
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(query):
+    """(id, normalized SQL) of a statement. Literals become ?, placeholder
+    lists become (?+) and multi-row VALUES collapse to one row, so statements
+    differing only in parameters or batch size share a fingerprint.
+    """
+    normalized = _SPACE.sub(' ', query).strip()
+    normalized = _STRING.sub('?', normalized)
+    normalized = _NUMBER.sub('?', normalized)
+    normalized = _PLACEHOLDERS.sub('(?+)', normalized)
+    normalized = _ROWS.sub('(?+), ...', normalized)
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12], normalized
+
+class Histogram:
+    """Count, total, max and bucketed durations (ms) of one series."""
+    __slots__ = ('count', 'total_ms', 'max_ms', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def observe(self, duration_ms):
+        self.count += 1
+        self.total_ms += duration_ms
+        if duration_ms > self.max_ms:
+            self.max_ms = duration_ms
+        for index, bound in enumerate(BUCKETS_MS):
+            if duration_ms <= bound:
+                self.buckets[index] += 1
+                return
+        self.buckets[-1] += 1
+
+    def to_dict(self):
+        # Cumulative counts per upper bound, as Prometheus histograms report them
+        cumulative = []
+        running = 0
+        for bound, count in zip(BUCKETS_MS + ('+Inf',), self.buckets):
+            running += count
+            cumulative.append({"le": bound, "count": running})
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else None,
+            "max_ms": round(self.max_ms, 3),
+            "buckets": cumulative
+        }
+
+class QueryMetrics:
+    """Process-wide statement histograms by fingerprint, plus connection
+    acquire times and per-request DB time. At most `max_statements`
+    fingerprints are tracked; later ones are recorded under 'other'.
+    """
+
+    def __init__(self, max_statements=500):
+        self.max_statements = max_statements
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.statements = 0
+            self.connections = 0
+            self.slow_queries = 0
+            self._by_statement = {}
+            self._acquire = Histogram()
+            self._requests = Histogram()
+
+    def record_statement(self, statement_id, statement, duration_ms, slow):
+        with self._lock:
+            self.statements += 1
+            self.slow_queries += slow
+            entry = self._by_statement.get(statement_id)
+            if entry is None:
+                if len(self._by_statement) >= self.max_statements:
+                    statement_id, statement = 'other', None
+                entry = self._by_statement.setdefault(statement_id, (statement, Histogram()))
+            entry[1].observe(duration_ms)
+
+    def record_acquire(self, duration_ms):
+        with self._lock:
+            self.connections += 1
+            self._acquire.observe(duration_ms)
+
+    def record_request(self, db_time_ms):
+        with self._lock:
+            self._requests.observe(db_time_ms)
+
+    def snapshot(self):
+        """Counters and histograms, statements ordered by total time."""
+        with self._lock:
+            statements = [
+                {"fingerprint": statement_id, "statement": statement, **histogram.to_dict()}
+                for statement_id, (statement, histogram) in self._by_statement.items()
+            ]
+            snapshot = {
+                "statements": self.statements,
+                "connections": self.connections,
+                "slow_queries": self.slow_queries,
+                "slow_query_ms": SLOW_QUERY_MS,
+                "acquire": self._acquire.to_dict(),
+                "request_db_time": self._requests.to_dict()
+            }
+        snapshot["by_statement"] = sorted(statements, key=lambda s: s["total_ms"], reverse=True)
+        return snapshot
+
+query_metrics = QueryMetrics(max_statements=int(os.getenv('DB_METRICS_MAX_STATEMENTS', 500)))
+
+class RequestDbStats:
+    """Database work done on behalf of one request (kept on `g`)."""
+    __slots__ = ('statements', 'db_time_ms', 'acquire_ms', 'connections', '_lock')
+
+    def __init__(self):
+        self.statements = 0
+        self.db_time_ms = 0.0
+        self.acquire_ms = 0.0
+        self.connections = 0
+        # Async views may run several DB calls on executor threads at once
+        self._lock = threading.Lock()
+
+    def to_dict(self):
+        return {
+            "statements": self.statements,
+            "db_time_ms": round(self.db_time_ms, 3),
+            "acquire_ms": round(self.acquire_ms, 3),
+            "connections": self.connections
+        }
+
+def get_request_db_stats():
+    """Return the RequestDbStats of the current app context, or None outside one."""
+    if not has_app_context():
+        return None
+    return g.setdefault('_db_stats', RequestDbStats())
+
+def record_statement(query, duration_ms):
+    statement_id, statement = fingerprint(query)
+    slow = bool(SLOW_QUERY_MS) and duration_ms >= SLOW_QUERY_MS
+    query_metrics.record_statement(statement_id, statement, duration_ms, slow)
+
+    stats = get_request_db_stats()
+    if stats is not None:
+        with stats._lock:
+            stats.statements += 1
+            stats.db_time_ms += duration_ms
+
+    if slow:
+        event = {"event": "slow_query", "fingerprint": statement_id,
+                 "duration_ms": round(duration_ms, 3), "statement": statement[:500]}
+        if has_request_context():
+            event.update(method=request.method, path=request.path)
+        logger.warning(json.dumps(event))
+
+def record_fetch(duration_ms):
+    """Count time spent fetching rows towards the request's DB time."""
+    stats = get_request_db_stats()
+    if stats is not None:
+        with stats._lock:
+            stats.db_time_ms += duration_ms
+
+def record_acquire(duration_ms):
+    query_metrics.record_acquire(duration_ms)
+    stats = get_request_db_stats()
+    if stats is not None:
+        with stats._lock:
+            stats.connections += 1
+            stats.acquire_ms += duration_ms
+
+class InstrumentedCursor:
+    """DB-API cursor proxy that records every statement it executes."""
+    __slots__ = ('_cursor',)
+
+    def __init__(self, cursor):
+        object.__setattr__(self, '_cursor', cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        # e.g. pyodbc's fast_executemany
+        setattr(self._cursor, name, value)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def _timed(self, method, query, *args):
+        start = time.perf_counter()
+        try:
+            result = method(query, *args)
+        finally:
+            record_statement(query, (time.perf_counter() - start) * 1000)
+        return self if result is self._cursor else result
+
+    def execute(self, query, *args):
+        return self._timed(self._cursor.execute, query, *args)
+
+    def executemany(self, query, *args):
+        return self._timed(self._cursor.executemany, query, *args)
+
+    def _fetch(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            record_fetch((time.perf_counter() - start) * 1000)
+
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone)
+
+    def fetchmany(self, *args):
+        return self._fetch(self._cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+
+class InstrumentedConnection:
+    """DB-API connection proxy whose cursors are InstrumentedCursors."""
+    __slots__ = ('_conn',)
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self):
+        return InstrumentedCursor(self._conn.cursor())
+
+    def execute(self, query, *args):
+        return self.cursor().execute(query, *args)
+
+def instrument_connection(conn):
+    """Wrap a new connection if instrumentation is enabled."""
+    return InstrumentedConnection(conn) if ENABLED else conn
+
+def server_timing(stats):
+    """Server-Timing header value for a request's DB totals."""
+    return (f'db;dur={stats.db_time_ms:.2f};desc="{stats.statements} queries", '
+            f'db-acquire;dur={stats.acquire_ms:.2f};desc="{stats.connections} connections"')
+
+def report_request(response):
+    """after_request hook: add Server-Timing and log the request's DB totals."""
+    stats = g.get('_db_stats')
+    if stats is None:
+        return response
+
+    query_metrics.record_request(stats.db_time_ms)
+    if SERVER_TIMING:
+        response.headers.add('Server-Timing', server_timing(stats))
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({
+            "event": "request_db", "method": request.method, "path": request.path,
+            "status": response.status_code, **stats.to_dict()
+        }))
+    return response
+
+def init_app(app):
+    """Register the per-request DB report on a Flask app."""
+    if ENABLED:
+        app.after_request(report_request)
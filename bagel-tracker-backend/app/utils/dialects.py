@@ -0,0 +1,195 @@
+"""SQL dialects for the supported database backends.
+
+Models write portable SQL (`?` placeholders, CURRENT_TIMESTAMP) and ask the
+active dialect for the pieces that differ between engines: paging, locking
+hints, INSERT ... RETURNING, upserts and integrity error classification.
+"""
+import os
+import sqlite3
+from collections import namedtuple
+from datetime import datetime
+
+class SqlServerDialect:
+    """SQL Server (Azure SQL) through pyodbc."""
+    name = 'sqlserver'
+    health_check_query = "SELECT 1"
+    # Appended after ORDER BY; binds the row limit as the last parameter
+    limit = "OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY"
+    # CURRENT_TIMESTAMP is server-local time here; HTTP dates need UTC
+    utc_now = "GETUTCDATE()"
+    # Placeholder for a value compared with a DATETIME column. pyodbc binds
+    # Python datetimes as DATETIME2, which keeps the microseconds DATETIME's
+    # 1/300 s ticks round away, so equal timestamps would compare unequal
+    datetime_param = "CAST(? AS DATETIME)"
+
+    @property
+    def integrity_error(self):
+        import pyodbc
+        return pyodbc.IntegrityError
+
+    def connect(self):
+        """Open a new pyodbc connection from the DB_* environment variables."""
+        # Imported lazily so other backends run without the ODBC driver installed
+        import pyodbc
+
+        connection_string = (
+            f"Driver={os.getenv('DB_DRIVER')};"
+            f"Server={os.getenv('DB_SERVER')};"
+            f"Database={os.getenv('DB_NAME')};"
+            f"Uid={os.getenv('DB_USER')};"
+            f"Pwd={os.getenv('DB_PASSWORD')};"
+            f"Encrypt=yes;"
+            f"TrustServerCertificate=no;"
+            f"Connection Timeout=30;"
+        )
+
+        return pyodbc.connect(connection_string)
+
+    def table_hint(self, *hints):
+        """Table hint clause, e.g. table_hint("UPDLOCK") -> "WITH (UPDLOCK)"."""
+        return f"WITH ({', '.join(hints)})"
+
+    def insert(self, table, columns, row_count=1, returning=None):
+        """Multi-row INSERT statement, optionally returning generated columns."""
+        values = ", ".join(f"({', '.join('?' for _ in columns)})" for _ in range(row_count))
+        output = ""
+        if returning:
+            output = "OUTPUT " + ", ".join(f"INSERTED.{column}" for column in returning)
+        return f"INSERT INTO {table} ({', '.join(columns)}) {output} VALUES {values}"
+
+    def upsert(self, table, keys, columns, row_count, updates):
+        """Insert rows of `columns`, updating rows whose `keys` already exist.
+        `updates` maps column -> expression, written with {target} for the
+        existing row and {source} for the incoming one.
+        """
+        values = ", ".join(f"({', '.join('?' for _ in columns)})" for _ in range(row_count))
+        match = " AND ".join(f"target.{key} = source.{key}" for key in keys)
+        assignments = ", ".join(
+            f"{column} = {expression.format(target='target', source='source')}"
+            for column, expression in updates.items()
+        )
+        return f"""
+            MERGE {table} WITH (HOLDLOCK) AS target
+            USING (VALUES {values}) AS source ({', '.join(columns)})
+            ON {match}
+            WHEN MATCHED THEN UPDATE SET {assignments}
+            WHEN NOT MATCHED THEN INSERT ({', '.join(columns)})
+            VALUES ({', '.join(f'source.{column}' for column in columns)});
+        """
+
+    def is_distinct(self, left, right):
+        """NULL-safe inequality: true when exactly one side is NULL, too."""
+        return f"EXISTS (SELECT {left} EXCEPT SELECT {right})"
+
+    def is_foreign_key_violation(self, error):
+        return "FOREIGN KEY constraint" in str(error)
+
+    def unique_violation(self, error):
+        """Column behind a unique constraint violation, '' if unknown, None if not one."""
+        error_msg = str(error)
+        if "Violation of UNIQUE KEY constraint" not in error_msg:
+            return None
+        if "idx_users_email" in error_msg:
+            return 'email'
+        if "idx_users_name" in error_msg:
+            return 'name'
+        return ''
+
+def _sqlite_row_factory(cursor, row):
+    """Rows with attribute access by column name, like pyodbc rows."""
+    columns = tuple(column[0] for column in cursor.description)
+    row_type = _sqlite_row_types.get(columns)
+    if row_type is None:
+        row_type = _sqlite_row_types[columns] = namedtuple('Row', columns, rename=True)
+    return row_type(*row)
+
+_sqlite_row_types = {}
+
+# Store datetimes as ISO text and read DATETIME/BIT columns back as Python types
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("DATETIME", lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("BIT", lambda value: bool(int(value)))
+
+class SqliteDialect:
+    """SQLite, for running and benchmarking locally without SQL Server.
+
+    SQLITE_PATH names the database file; a `file:` URI such as
+    `file:bagels?mode=memory&cache=shared` keeps it in memory while
+    letting every pooled connection see the same data.
+    """
+    name = 'sqlite'
+    health_check_query = "SELECT 1"
+    limit = "LIMIT ?"
+    utc_now = "CURRENT_TIMESTAMP"
+    # Datetimes are stored and bound as the same ISO text
+    datetime_param = "?"
+    integrity_error = sqlite3.IntegrityError
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv('SQLITE_PATH', 'bagel_tracker.db')
+
+    def connect(self):
+        """Open a new sqlite3 connection to SQLITE_PATH."""
+        conn = sqlite3.connect(
+            self.path,
+            timeout=30,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,  # connections move between threads via the pool
+            uri=self.path.startswith('file:')
+        )
+        conn.row_factory = _sqlite_row_factory
+        conn.execute("PRAGMA foreign_keys = ON")
+        if not self.path.startswith('file:') and self.path != ':memory:':
+            conn.execute("PRAGMA journal_mode = WAL")
+        return conn
+
+    def table_hint(self, *hints):
+        # SQLite locks the whole database for writes, so there is nothing to hint
+        return ""
+
+    def insert(self, table, columns, row_count=1, returning=None):
+        values = ", ".join(f"({', '.join('?' for _ in columns)})" for _ in range(row_count))
+        output = ""
+        if returning:
+            output = "RETURNING " + ", ".join(returning)
+        return f"INSERT INTO {table} ({', '.join(columns)}) VALUES {values} {output}"
+
+    def upsert(self, table, keys, columns, row_count, updates):
+        values = ", ".join(f"({', '.join('?' for _ in columns)})" for _ in range(row_count))
+        assignments = ", ".join(
+            f"{column} = {expression.format(target=table, source='excluded')}"
+            for column, expression in updates.items()
+        )
+        return f"""
+            INSERT INTO {table} ({', '.join(columns)}) VALUES {values}
+            ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {assignments}
+        """
+
+    def is_distinct(self, left, right):
+        # IS NOT is SQLite's null-safe comparison (IS DISTINCT FROM needs 3.39)
+        return f"{left} IS NOT {right}"
+
+    def is_foreign_key_violation(self, error):
+        return "FOREIGN KEY constraint" in str(error)
+
+    def unique_violation(self, error):
+        error_msg = str(error)
+        if "UNIQUE constraint failed" not in error_msg:
+            return None
+        if "Users.email" in error_msg:
+            return 'email'
+        if "Users.name" in error_msg:
+            return 'name'
+        return ''
+
+DIALECTS = {
+    'sqlserver': SqlServerDialect,
+    'sqlite': SqliteDialect
+}
+
+def create_dialect(backend):
+    """Instantiate the dialect for a DB_BACKEND name."""
+    try:
+        return DIALECTS[backend]()
+    except KeyError:
+        raise ValueError(f"Unknown DB_BACKEND '{backend}', expected one of: {', '.join(DIALECTS)}")
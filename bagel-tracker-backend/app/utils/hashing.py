@@ -0,0 +1,124 @@
+"""Password hashing on a bounded pool of worker processes.
+
+PBKDF2 is deliberately CPU-heavy. Running it in the request thread holds the
+GIL and starves every other request served by the same worker, so hashes are
+computed in separate processes instead. The number of hashes queued or
+running is bounded; when it is reached callers get HashingBusyError right
+away rather than piling up behind a login storm. Hashes that time out, or
+that were lost to a crashed worker, are reported the same way.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from passlib.context import CryptContext
+
+class HashingBusyError(Exception):
+    """Raised when the hashing queue is full; retry after `retry_after` seconds."""
+    
+    def __init__(self, retry_after):
+        super().__init__("Password hashing is at capacity")
+        self.retry_after = retry_after
+
+@lru_cache(maxsize=None)
+def _context(rounds):
+    # Hashes with fewer rounds than configured are flagged for rehashing
+    return CryptContext(
+        schemes=["pbkdf2_sha256"],
+        pbkdf2_sha256__default_rounds=rounds,
+        pbkdf2_sha256__min_rounds=rounds
+    )
+
+def _hash(password, rounds):
+    return _context(rounds).hash(password)
+
+def _verify_and_update(password, stored_hash, rounds):
+    return _context(rounds).verify_and_update(password, stored_hash)
+
+class PasswordHasher:
+    """Runs hash/verify on a process pool with a bounded queue.
+
+    With workers=0 the work runs inline in the calling thread, which is
+    handy for local runs and scripts.
+    """
+    
+    def __init__(self, rounds=29000, workers=None, max_pending=None, timeout=30, retry_after=1):
+        self.rounds = rounds
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_pending = max_pending or max(1, self.workers) * 4
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+    
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # spawn, not fork: forking a threaded server can deadlock the child
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn')
+                    )
+        return self._executor
+    
+    def _reset_executor(self, broken):
+        """Drop a pool whose worker died; the next call starts a fresh one."""
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False)
+    
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusyError(self.retry_after)
+        if not self.workers:
+            try:
+                return fn(*args)
+            finally:
+                self._slots.release()
+        
+        executor = self._get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._slots.release()
+            self._reset_executor(executor)
+            raise HashingBusyError(self.retry_after)
+        except Exception:
+            self._slots.release()
+            raise
+        # Free the slot when the work finishes, even if the caller stops waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise HashingBusyError(self.retry_after)
+        except BrokenProcessPool:
+            self._reset_executor(executor)
+            raise HashingBusyError(self.retry_after)
+    
+    def hash(self, password):
+        """Hash a password with the configured number of rounds."""
+        return self._run(_hash, password, self.rounds)
+    
+    def verify_and_update(self, stored_hash, password):
+        """Check a password. Returns (valid, new_hash), where new_hash is set
+        when the stored hash uses outdated parameters and should be replaced.
+        """
+        return self._run(_verify_and_update, password, stored_hash, self.rounds)
+    
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+_workers = os.getenv('PASSWORD_HASH_WORKERS')
+password_hasher = PasswordHasher(
+    rounds=int(os.getenv('PASSWORD_HASH_ROUNDS', 29000)),
+    workers=int(_workers) if _workers is not None else None,
+    max_pending=int(os.getenv('PASSWORD_HASH_QUEUE', 0)) or None
+)
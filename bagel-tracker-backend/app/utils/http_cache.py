@@ -0,0 +1,58 @@
+"""HTTP validation (ETag / Last-Modified) for match read endpoints."""
+import functools
+import hashlib
+import json
+from datetime import timezone
+from flask import make_response, request
+from app.models.match_version import MatchVersion
+
+def match_etag(versions):
+    """Weak ETag for this request's URL at the given MatchVersion counters.
+    The full path is included so every limit/cursor/format gets its own tag.
+    """
+    payload = json.dumps([request.full_path, sorted(versions.items())], separators=(',', ':'))
+    return hashlib.sha1(payload.encode()).hexdigest()[:20]
+
+def conditional_get(scopes, cache_control):
+    """Answer GETs with 304 Not Modified while the matches they show are unchanged.
+
+    Args:
+        scopes: Function of the view's URL arguments returning the MatchVersion
+            scopes the response depends on
+        cache_control: Cache-Control header value for 200 and 304 responses
+
+    The versions are read before the view runs, so a response is never
+    labelled with a version newer than its body. A matching If-None-Match
+    (or, without one, If-Modified-Since) is answered without calling the view.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            versions, last_modified = MatchVersion.current(scopes(**kwargs))
+            etag = match_etag(versions)
+            if last_modified is not None:
+                # HTTP dates have whole-second precision
+                last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                not_modified = (
+                    last_modified is not None and request.if_modified_since is not None
+                    and last_modified <= request.if_modified_since
+                )
+
+            if not_modified:
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = cache_control
+            return response
+        return wrapper
+    return decorator
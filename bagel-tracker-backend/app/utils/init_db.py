@@ -1,7 +1,122 @@
-from app.utils.db import execute_query
+from app.utils.db import execute_query, db_connection, get_dialect
+
+# SQLite equivalent of the SQL Server schema below, used when DB_BACKEND=sqlite.
+# Names and emails use NOCASE to match SQL Server's case-insensitive collation.
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS Users (
+    user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name NVARCHAR(100) NOT NULL UNIQUE COLLATE NOCASE,
+    email NVARCHAR(100) NOT NULL UNIQUE COLLATE NOCASE,
+    password_hash NVARCHAR(255) NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    is_active BIT DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS Matches (
+    match_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    match_type NVARCHAR(10) NOT NULL CHECK (match_type IN ('singles', 'doubles')),
+    match_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+    reporter_user_id INT NOT NULL REFERENCES Users(user_id),
+    team1_player1_id INT NOT NULL REFERENCES Users(user_id),
+    team1_player2_id INT NULL REFERENCES Users(user_id),
+    team2_player1_id INT NOT NULL REFERENCES Users(user_id),
+    team2_player2_id INT NULL REFERENCES Users(user_id),
+    team1_score INT NOT NULL,
+    team2_score INT NOT NULL,
+    winner_team INT NULL,
+    is_bagel BIT DEFAULT 0,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_matches_reporter ON Matches(reporter_user_id);
+CREATE INDEX IF NOT EXISTS idx_matches_date ON Matches(match_date DESC, match_id DESC);
+
+CREATE TABLE IF NOT EXISTS MatchParticipants (
+    match_id INT NOT NULL REFERENCES Matches(match_id) ON DELETE CASCADE,
+    user_id INT NOT NULL REFERENCES Users(user_id),
+    team INT NOT NULL CHECK (team IN (1, 2)),
+    match_date DATETIME NOT NULL,
+    PRIMARY KEY (match_id, user_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_match_participants_user_date
+    ON MatchParticipants(user_id, match_date DESC, match_id DESC);
+
+CREATE TABLE IF NOT EXISTS PlayerStats (
+    user_id INT NOT NULL REFERENCES Users(user_id),
+    match_type NVARCHAR(10) NOT NULL CHECK (match_type IN ('singles', 'doubles')),
+    matches_played INT NOT NULL DEFAULT 0,
+    wins INT NOT NULL DEFAULT 0,
+    losses INT NOT NULL DEFAULT 0,
+    bagels_given INT NOT NULL DEFAULT 0,
+    bagels_received INT NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, match_type)
+);
+
+CREATE TABLE IF NOT EXISTS PlayerRatings (
+    user_id INT NOT NULL REFERENCES Users(user_id),
+    match_type NVARCHAR(10) NOT NULL CHECK (match_type IN ('singles', 'doubles')),
+    rating FLOAT NOT NULL,
+    matches_rated INT NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, match_type)
+);
+
+CREATE TABLE IF NOT EXISTS HeadToHead (
+    player_low INT NOT NULL REFERENCES Users(user_id),
+    player_high INT NOT NULL REFERENCES Users(user_id),
+    match_type NVARCHAR(10) NOT NULL CHECK (match_type IN ('singles', 'doubles')),
+    matches_played INT NOT NULL DEFAULT 0,
+    low_wins INT NOT NULL DEFAULT 0,
+    high_wins INT NOT NULL DEFAULT 0,
+    low_bagels INT NOT NULL DEFAULT 0,
+    high_bagels INT NOT NULL DEFAULT 0,
+    last_played DATETIME NULL,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (player_low, player_high, match_type),
+    CHECK (player_low < player_high)
+);
+
+CREATE TABLE IF NOT EXISTS Partnerships (
+    player_low INT NOT NULL REFERENCES Users(user_id),
+    player_high INT NOT NULL REFERENCES Users(user_id),
+    matches_played INT NOT NULL DEFAULT 0,
+    wins INT NOT NULL DEFAULT 0,
+    losses INT NOT NULL DEFAULT 0,
+    bagels_given INT NOT NULL DEFAULT 0,
+    bagels_received INT NOT NULL DEFAULT 0,
+    last_played DATETIME NULL,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (player_low, player_high),
+    CHECK (player_low < player_high)
+);
+
+CREATE INDEX IF NOT EXISTS idx_partnerships_high ON Partnerships(player_high);
+
+CREATE TABLE IF NOT EXISTS MatchVersions (
+    scope NVARCHAR(20) NOT NULL PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+def create_sqlite_tables():
+    """Create the SQLite schema if it doesn't exist."""
+    with db_connection() as conn:
+        conn.executescript(SQLITE_SCHEMA)
+        conn.commit()
+    
+    print("Database tables created successfully!")
 
 def create_tables():
     """Create the necessary tables if they don't exist."""
+    if get_dialect().name == 'sqlite':
+        create_sqlite_tables()
+        return
+    
     # Create Users table
     users_table_query = """
     IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='Users' AND xtype='U')
@@ -55,12 +170,179 @@ def create_tables():
 
     IF NOT EXISTS (SELECT * FROM sysindexes WHERE name='idx_matches_players')
     CREATE INDEX idx_matches_players ON Matches(team1_player1_id, team1_player2_id, team2_player1_id, team2_player2_id);
+
+    IF NOT EXISTS (SELECT * FROM sysindexes WHERE name='idx_matches_date')
+    CREATE INDEX idx_matches_date ON Matches(match_date DESC, match_id DESC);
     """
     
     # Execute query
     execute_query(matches_table_query, fetch=False)
     
+    # Create MatchParticipants table: one row per player per match, so
+    # per-user history can seek on (user_id, match_date) instead of
+    # scanning the four player columns on Matches
+    participants_table_query = """
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='MatchParticipants' AND xtype='U')
+    CREATE TABLE MatchParticipants (
+        match_id INT NOT NULL,
+        user_id INT NOT NULL,
+        team INT NOT NULL CHECK (team IN (1, 2)),
+        match_date DATETIME NOT NULL,
+        CONSTRAINT PK_MatchParticipants PRIMARY KEY (match_id, user_id),
+        CONSTRAINT FK_MatchParticipants_Match FOREIGN KEY (match_id) REFERENCES Matches(match_id) ON DELETE CASCADE,
+        CONSTRAINT FK_MatchParticipants_User FOREIGN KEY (user_id) REFERENCES Users(user_id)
+    );
+
+    IF NOT EXISTS (SELECT * FROM sysindexes WHERE name='idx_match_participants_user_date')
+    CREATE INDEX idx_match_participants_user_date ON MatchParticipants(user_id, match_date DESC, match_id DESC);
+    """
+    
+    # Execute query
+    execute_query(participants_table_query, fetch=False)
+    
+    # Create PlayerStats table: per-player counters maintained by Match.save()
+    player_stats_table_query = """
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='PlayerStats' AND xtype='U')
+    CREATE TABLE PlayerStats (
+        user_id INT NOT NULL,
+        match_type NVARCHAR(10) NOT NULL CHECK (match_type IN ('singles', 'doubles')),
+        matches_played INT NOT NULL DEFAULT 0,
+        wins INT NOT NULL DEFAULT 0,
+        losses INT NOT NULL DEFAULT 0,
+        bagels_given INT NOT NULL DEFAULT 0,
+        bagels_received INT NOT NULL DEFAULT 0,
+        updated_at DATETIME DEFAULT GETDATE(),
+        CONSTRAINT PK_PlayerStats PRIMARY KEY (user_id, match_type),
+        CONSTRAINT FK_PlayerStats_User FOREIGN KEY (user_id) REFERENCES Users(user_id)
+    );
+    """
+    
+    # Execute query
+    execute_query(player_stats_table_query, fetch=False)
+    
+    # Create PlayerRatings table: Elo rating per player and match type
+    player_ratings_table_query = """
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='PlayerRatings' AND xtype='U')
+    CREATE TABLE PlayerRatings (
+        user_id INT NOT NULL,
+        match_type NVARCHAR(10) NOT NULL CHECK (match_type IN ('singles', 'doubles')),
+        rating FLOAT NOT NULL,
+        matches_rated INT NOT NULL DEFAULT 0,
+        updated_at DATETIME DEFAULT GETDATE(),
+        CONSTRAINT PK_PlayerRatings PRIMARY KEY (user_id, match_type),
+        CONSTRAINT FK_PlayerRatings_User FOREIGN KEY (user_id) REFERENCES Users(user_id)
+    );
+    """
+    
+    # Execute query
+    execute_query(player_ratings_table_query, fetch=False)
+    
+    # Create HeadToHead table: records between pairs of opponents
+    head_to_head_table_query = """
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='HeadToHead' AND xtype='U')
+    CREATE TABLE HeadToHead (
+        player_low INT NOT NULL,
+        player_high INT NOT NULL,
+        match_type NVARCHAR(10) NOT NULL CHECK (match_type IN ('singles', 'doubles')),
+        matches_played INT NOT NULL DEFAULT 0,
+        low_wins INT NOT NULL DEFAULT 0,
+        high_wins INT NOT NULL DEFAULT 0,
+        low_bagels INT NOT NULL DEFAULT 0,
+        high_bagels INT NOT NULL DEFAULT 0,
+        last_played DATETIME NULL,
+        updated_at DATETIME DEFAULT GETDATE(),
+        CONSTRAINT PK_HeadToHead PRIMARY KEY (player_low, player_high, match_type),
+        CONSTRAINT CK_HeadToHead_Order CHECK (player_low < player_high),
+        CONSTRAINT FK_HeadToHead_Low FOREIGN KEY (player_low) REFERENCES Users(user_id),
+        CONSTRAINT FK_HeadToHead_High FOREIGN KEY (player_high) REFERENCES Users(user_id)
+    );
+    """
+    
+    # Execute query
+    execute_query(head_to_head_table_query, fetch=False)
+    
+    # Create Partnerships table: doubles records of pairs of partners
+    partnerships_table_query = """
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='Partnerships' AND xtype='U')
+    CREATE TABLE Partnerships (
+        player_low INT NOT NULL,
+        player_high INT NOT NULL,
+        matches_played INT NOT NULL DEFAULT 0,
+        wins INT NOT NULL DEFAULT 0,
+        losses INT NOT NULL DEFAULT 0,
+        bagels_given INT NOT NULL DEFAULT 0,
+        bagels_received INT NOT NULL DEFAULT 0,
+        last_played DATETIME NULL,
+        updated_at DATETIME DEFAULT GETDATE(),
+        CONSTRAINT PK_Partnerships PRIMARY KEY (player_low, player_high),
+        CONSTRAINT CK_Partnerships_Order CHECK (player_low < player_high),
+        CONSTRAINT FK_Partnerships_Low FOREIGN KEY (player_low) REFERENCES Users(user_id),
+        CONSTRAINT FK_Partnerships_High FOREIGN KEY (player_high) REFERENCES Users(user_id)
+    );
+
+    IF NOT EXISTS (SELECT * FROM sysindexes WHERE name='idx_partnerships_high')
+    CREATE INDEX idx_partnerships_high ON Partnerships(player_high);
+    """
+    
+    # Execute query
+    execute_query(partnerships_table_query, fetch=False)
+    
+    # Create MatchVersions table: change counters behind the match ETags
+    match_versions_table_query = """
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='MatchVersions' AND xtype='U')
+    CREATE TABLE MatchVersions (
+        scope NVARCHAR(20) NOT NULL,
+        version BIGINT NOT NULL DEFAULT 0,
+        updated_at DATETIME DEFAULT GETUTCDATE(),
+        CONSTRAINT PK_MatchVersions PRIMARY KEY (scope)
+    );
+    """
+    
+    # Execute query
+    execute_query(match_versions_table_query, fetch=False)
+    
     print("Database tables created successfully!")
 
+def backfill_match_participants():
+    """Create MatchParticipants rows for matches recorded before the table existed."""
+    if get_dialect().name == 'sqlite':
+        # No CROSS APPLY in SQLite, so unpivot the player columns with UNION ALL
+        backfill_query = """
+        INSERT INTO MatchParticipants (match_id, user_id, team, match_date)
+        SELECT p.match_id, p.user_id, p.team, p.match_date
+        FROM (
+            SELECT match_id, team1_player1_id AS user_id, 1 AS team, COALESCE(match_date, created_at) AS match_date FROM Matches
+            UNION ALL SELECT match_id, team1_player2_id, 1, COALESCE(match_date, created_at) FROM Matches
+            UNION ALL SELECT match_id, team2_player1_id, 2, COALESCE(match_date, created_at) FROM Matches
+            UNION ALL SELECT match_id, team2_player2_id, 2, COALESCE(match_date, created_at) FROM Matches
+        ) AS p
+        WHERE p.user_id IS NOT NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM MatchParticipants mp
+              WHERE mp.match_id = p.match_id AND mp.user_id = p.user_id
+          );
+        """
+    else:
+        backfill_query = """
+    INSERT INTO MatchParticipants (match_id, user_id, team, match_date)
+    SELECT m.match_id, p.user_id, p.team, COALESCE(m.match_date, m.created_at)
+    FROM Matches m
+    CROSS APPLY (VALUES
+        (m.team1_player1_id, 1), (m.team1_player2_id, 1),
+        (m.team2_player1_id, 2), (m.team2_player2_id, 2)
+    ) AS p(user_id, team)
+    WHERE p.user_id IS NOT NULL
+      AND NOT EXISTS (
+          SELECT 1 FROM MatchParticipants mp
+          WHERE mp.match_id = m.match_id AND mp.user_id = p.user_id
+      );
+    """
+    
+    # Execute query
+    rows = execute_query(backfill_query, fetch=False)
+    
+    print(f"Backfilled {rows} match participant rows")
+
 if __name__ == "__main__":
-    create_tables()
\ No newline at end of file
+    create_tables()
+    backfill_match_participants()
\ No newline at end of file
@@ -0,0 +1,57 @@
+"""JSON encoders for API responses.
+
+Flask 2.0 builds every jsonify() body, and every flask.json.dumps() call
+inside an app context, with `app.json_encoder`. `get_json_encoder` picks
+the class to install there: orjson when it is importable, otherwise the
+standard library. Both write datetimes as ISO 8601
+(e.g. "2024-05-01T18:30:00.123000"), so models hand datetimes to the
+encoder instead of formatting them row by row.
+"""
+from datetime import date
+from flask.json import JSONEncoder as FlaskJSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used instead
+    orjson = None
+
+class JSONEncoder(FlaskJSONEncoder):
+    """Standard library encoder with ISO 8601 dates instead of HTTP dates."""
+
+    def default(self, o):
+        if isinstance(o, date):
+            return o.isoformat()
+        return super().default(o)
+
+class OrjsonEncoder(JSONEncoder):
+    """Encodes whole documents with orjson, which serializes datetimes natively.
+    Types orjson does not know fall back to JSONEncoder.default.
+    """
+
+    def encode(self, o):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(o, default=self.default, option=option).decode()
+
+    def iterencode(self, o, _one_shot=False):
+        yield self.encode(o)
+
+ENCODERS = {
+    'stdlib': JSONEncoder,
+    'orjson': OrjsonEncoder
+}
+
+def get_json_encoder(name='auto'):
+    """Return the encoder class for a JSON_ENCODER setting.
+    'auto' prefers orjson and falls back to the standard library.
+    """
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'stdlib'
+    if name not in ENCODERS:
+        raise ValueError(f"Unknown JSON_ENCODER '{name}', expected auto or one of: {', '.join(ENCODERS)}")
+    if name == 'orjson' and orjson is None:
+        raise ValueError("JSON_ENCODER is orjson but orjson is not installed")
+    return ENCODERS[name]
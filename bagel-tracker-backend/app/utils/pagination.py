@@ -0,0 +1,36 @@
+import base64
+import json
+from datetime import datetime
+
+# Largest page any listing endpoint will return, whatever the client asks for
+MAX_PAGE_SIZE = 100
+
+def clamp_page_size(limit, default):
+    """Parse a requested page size and keep it within 1..MAX_PAGE_SIZE."""
+    try:
+        limit = int(limit) if limit is not None else default
+    except (ValueError, TypeError):
+        limit = default
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def encode_cursor(match_date, match_id):
+    """Build an opaque cursor pointing just past the given (match_date, match_id).
+    match_date must be the value as read from the database, so that rows
+    sharing it compare equal when the next page is fetched.
+    """
+    payload = json.dumps([str(match_date), match_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Turn a cursor back into a (match_date, match_id) tuple.
+
+    Returns None for an empty cursor and raises ValueError for a malformed one.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        match_date, match_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(match_date), int(match_id)
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise ValueError("Invalid cursor")
@@ -0,0 +1,109 @@
+"""Rebuild Elo ratings by replaying the whole match history.
+
+Elo is sequential per player, but two matches that share no player do not
+affect each other. The replay therefore assigns each match to the earliest
+"round" after every previous match of its players, then rates each round as
+one vectorized NumPy step. The result is identical to rating the matches
+one at a time in chronological order.
+"""
+from collections import namedtuple
+import numpy as np
+from app.models.rating import PlayerRating
+
+# One row of rating input, in the column order of PlayerRating.load_history()
+HistoryMatch = namedtuple('HistoryMatch', [
+    'match_type', 'team1_player1_id', 'team1_player2_id',
+    'team2_player1_id', 'team2_player2_id', 'winner_team'
+])
+
+def encode_history(rows):
+    """Convert history rows to dense arrays.
+
+    Returns (keys, players, outcomes): `keys` lists the (user_id, match_type)
+    rated in each slot, `players` is an (n, 4) array of slot indices with
+    len(keys) marking an empty position, and `outcomes` is team 1's score.
+    """
+    rows = list(rows)
+    if not rows:
+        return [], np.empty((0, 4), dtype=np.int64), np.empty(0)
+    
+    columns = list(zip(*rows))
+    is_doubles = np.array(columns[0]) == 'doubles'
+    # None becomes NaN, which marks an empty player position
+    user_ids = np.array(columns[1:5], dtype=np.float64).T
+    winners = np.array(columns[5], dtype=np.float64)
+    
+    # Rate singles and doubles independently by keying slots on (user_id, type)
+    present = ~np.isnan(user_ids)
+    slot_keys = user_ids[present].astype(np.int64) * 2 + np.repeat(is_doubles, 4).reshape(-1, 4)[present]
+    unique_keys, slots = np.unique(slot_keys, return_inverse=True)
+    
+    players = np.full(user_ids.shape, len(unique_keys), dtype=np.int64)
+    players[present] = slots.ravel()
+    
+    keys = [
+        (int(key // 2), 'doubles' if key % 2 else 'singles')
+        for key in unique_keys.tolist()
+    ]
+    outcomes = np.where(winners == 1, 1.0, np.where(winners == 2, 0.0, 0.5))
+    return keys, players, outcomes
+
+def schedule_rounds(players, empty_slot):
+    """Assign each match the first round after all earlier matches of its players."""
+    last_round = [0] * (empty_slot + 1)
+    rounds = np.empty(len(players), dtype=np.int64)
+    for i, (a, b, c, d) in enumerate(players.tolist()):
+        current = max(last_round[a], last_round[b], last_round[c], last_round[d]) + 1
+        rounds[i] = current
+        last_round[a] = last_round[b] = last_round[c] = last_round[d] = current
+        # The empty slot never orders anything
+        last_round[empty_slot] = 0
+    return rounds
+
+def replay(rows, initial=PlayerRating.INITIAL_RATING, k_factor=PlayerRating.K_FACTOR):
+    """Replay chronological history rows and return (ratings, counts) dicts
+    keyed by (user_id, match_type).
+    """
+    keys, players, outcomes = encode_history(rows)
+    empty_slot = len(keys)
+    if not len(players):
+        return {}, {}
+    
+    present = players != empty_slot
+    team1_size = present[:, :2].sum(axis=1)
+    team2_size = present[:, 2:].sum(axis=1)
+    
+    rounds = schedule_rounds(players, empty_slot)
+    order = np.argsort(rounds, kind='stable')
+    boundaries = np.flatnonzero(np.diff(rounds[order])) + 1
+    
+    ratings = np.full(empty_slot + 1, initial, dtype=np.float64)
+    for batch in np.split(order, boundaries):
+        p = players[batch]
+        # The empty slot contributes nothing to a team's mean rating
+        ratings[empty_slot] = 0.0
+        team1 = (ratings[p[:, 0]] + ratings[p[:, 1]]) / team1_size[batch]
+        team2 = (ratings[p[:, 2]] + ratings[p[:, 3]]) / team2_size[batch]
+        expected = 1.0 / (1.0 + 10 ** ((team2 - team1) / 400.0))
+        delta = k_factor * (outcomes[batch] - expected)
+        
+        # No player appears twice within a round, so plain fancy indexing is safe
+        ratings[p[:, 0]] += delta
+        ratings[p[:, 1]] += delta
+        ratings[p[:, 2]] -= delta
+        ratings[p[:, 3]] -= delta
+    
+    counts = np.bincount(players[present], minlength=empty_slot)
+    return (
+        {key: float(ratings[i]) for i, key in enumerate(keys)},
+        {key: int(counts[i]) for i, key in enumerate(keys)}
+    )
+
+def replay_sequential(rows):
+    """Reference replay that rates one match at a time with PlayerRating.rate."""
+    ratings = {}
+    counts = {}
+    for row in rows:
+        for key in PlayerRating.rate(ratings, HistoryMatch(*row)):
+            counts[key] = counts.get(key, 0) + 1
+    return ratings, counts
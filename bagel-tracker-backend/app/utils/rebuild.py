@@ -0,0 +1,98 @@
+"""Recompute derived tables from the Matches table.
+
+Usage:
+    python -m app.utils.rebuild stats           # rebuild PlayerStats
+    python -m app.utils.rebuild stats --check   # report drift without writing
+    python -m app.utils.rebuild ratings         # replay Elo ratings from history
+    python -m app.utils.rebuild head-to-head    # rebuild HeadToHead
+    python -m app.utils.rebuild partners        # rebuild Partnerships in chunks
+"""
+import argparse
+import sys
+import time
+from app.models.head_to_head import HeadToHead
+from app.models.partnership import Partnership
+from app.models.player_stats import PlayerStats
+from app.models.rating import PlayerRating
+
+def rebuild_stats(check=False):
+    """Rebuild PlayerStats, or only report rows that disagree with Matches."""
+    if check:
+        mismatches = PlayerStats.find_mismatches()
+        for user_id, match_type in mismatches:
+            print(f"PlayerStats out of date for user {user_id} ({match_type})")
+        print(f"{len(mismatches)} PlayerStats rows differ from Matches")
+        return not mismatches
+    
+    rows = PlayerStats.rebuild()
+    print(f"Rebuilt {rows} PlayerStats rows")
+    return True
+
+def rebuild_ratings(check=False):
+    """Replay every match in chronological order and rewrite PlayerRatings."""
+    from app.utils.rating_replay import replay
+    
+    start = time.perf_counter()
+    history = list(PlayerRating.load_history())
+    loaded = time.perf_counter()
+    ratings, counts = replay(history)
+    replayed = time.perf_counter()
+    print(f"Loaded {len(history)} matches in {loaded - start:.2f}s, "
+          f"replayed in {replayed - loaded:.2f}s")
+    
+    if check:
+        stored = PlayerRating.all_ratings()
+        drifted = [
+            key for key, rating in ratings.items()
+            if key not in stored or abs(stored[key] - rating) > 0.05
+        ]
+        for user_id, match_type in drifted:
+            print(f"PlayerRatings out of date for user {user_id} ({match_type})")
+        print(f"{len(drifted)} PlayerRatings rows differ from a full replay")
+        return not drifted
+    
+    rows = PlayerRating.replace_all(ratings, counts)
+    print(f"Rebuilt {rows} PlayerRatings rows")
+    return True
+
+def rebuild_head_to_head(check=False):
+    """Rebuild HeadToHead, or only report pairs that disagree with Matches."""
+    if check:
+        mismatches = HeadToHead.find_mismatches()
+        for low, high, match_type in mismatches:
+            print(f"HeadToHead out of date for users {low} and {high} ({match_type})")
+        print(f"{len(mismatches)} HeadToHead rows differ from Matches")
+        return not mismatches
+    
+    rows = HeadToHead.rebuild()
+    print(f"Rebuilt {rows} HeadToHead rows")
+    return True
+
+def rebuild_partners(check=False):
+    """Rebuild Partnerships chunk by chunk, or only report pairs that disagree with Matches."""
+    if check:
+        mismatches = Partnership.find_mismatches()
+        for low, high in mismatches:
+            print(f"Partnerships out of date for users {low} and {high}")
+        print(f"{len(mismatches)} Partnerships rows differ from Matches")
+        return not mismatches
+    
+    start = time.perf_counter()
+    matches = Partnership.rebuild()
+    print(f"Rebuilt Partnerships from {matches} doubles matches in {time.perf_counter() - start:.2f}s")
+    return True
+
+TARGETS = {
+    'stats': rebuild_stats,
+    'ratings': rebuild_ratings,
+    'head-to-head': rebuild_head_to_head,
+    'partners': rebuild_partners
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute derived tables from Matches.")
+    parser.add_argument('target', choices=sorted(TARGETS))
+    parser.add_argument('--check', action='store_true',
+                        help="Compare against a fresh aggregate instead of rewriting")
+    args = parser.parse_args()
+    sys.exit(0 if TARGETS[args.target](check=args.check) else 1)
@@ -0,0 +1,84 @@
+"""Map database rows onto model records and API payloads by column position."""
+from operator import attrgetter, itemgetter
+
+def _tuple_getter(getter, keys):
+    """getter(*keys) that returns a tuple even for a single key."""
+    if len(keys) == 1:
+        get = getter(keys[0])
+        return lambda source: (get(source),)
+    return getter(*keys)
+
+class RowMapper:
+    """Cached row mapping and serialization for one model class.
+
+    `record_type` declares:
+      FIELDS         - its columns, in positional constructor order
+      PUBLIC_FIELDS  - the fields serialized into API responses, in order
+
+    For each distinct query shape (the column names in cursor.description)
+    the mapper builds, once, an operator.itemgetter over the positions of the
+    fields it needs. `map` builds records; `serialize` goes straight from
+    rows to API dicts and `columns` to PUBLIC_FIELDS-ordered tuples, without
+    building records, for list endpoints. `to_dict` serializes an existing
+    record with the same field list, so every response shares one definition
+    of the JSON shape. Values are passed through as-is; datetimes are left to
+    the app's JSON encoder.
+    """
+
+    def __init__(self, record_type):
+        self.record_type = record_type
+        self._getters = {}
+        fields = record_type.PUBLIC_FIELDS
+        get = _tuple_getter(attrgetter, fields)
+        self.to_dict = lambda record: dict(zip(fields, get(record)))
+
+    def _for_shape(self, kind, description):
+        shape = (kind, tuple(column[0] for column in description))
+        getter = self._getters.get(shape)
+        if getter is None:
+            getter = self._getters[shape] = self._build(kind, shape[1])
+        return getter
+
+    def _build(self, kind, columns):
+        """Row -> record, API dict or tuple function for one query shape."""
+        fields = self.record_type.FIELDS if kind == 'record' else self.record_type.PUBLIC_FIELDS
+        positions = {name: index for index, name in enumerate(columns)}
+        missing = [field for field in fields if field not in positions]
+        if missing:
+            # Fields the query does not select read as None from a padding slot
+            padding = len(columns)
+            get = _tuple_getter(itemgetter, [positions.get(field, padding) for field in fields])
+            pad = (None,)
+            values = lambda row: get(tuple(row) + pad)
+        else:
+            values = _tuple_getter(itemgetter, [positions[field] for field in fields])
+
+        if kind == 'record':
+            record_type = self.record_type
+            return lambda row: record_type(*values(row))
+        if kind == 'dict':
+            return lambda row: dict(zip(fields, values(row)))
+        return values
+
+    def map(self, description, rows):
+        """Build a record for each row of a result set described by `description`.
+        Fields the query does not select are None.
+        """
+        build = self._for_shape('record', description)
+        return [build(row) for row in rows]
+
+    def map_one(self, description, row):
+        """Build a record for a single row, or return None for no row."""
+        if row is None:
+            return None
+        return self._for_shape('record', description)(row)
+
+    def serialize(self, description, rows):
+        """Build the API dict for each row without an intermediate record."""
+        serialize = self._for_shape('dict', description)
+        return [serialize(row) for row in rows]
+
+    def columns(self, description, rows):
+        """Build a PUBLIC_FIELDS-ordered tuple for each row, for columnar responses."""
+        serialize = self._for_shape('tuple', description)
+        return [serialize(row) for row in rows]
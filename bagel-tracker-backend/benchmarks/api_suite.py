@@ -0,0 +1,175 @@
+"""End-to-end load suite for the API against a seeded local database.
+
+Serves create_app() in-process on a threaded WSGI server and drives each
+scenario (login, name search, recording a match, the match listings) with
+concurrent clients from benchmarks.load_test. Reports throughput, p50/p95/p99
+latency and database statements per request (counted by app.utils.db_metrics),
+and compares them with a saved baseline: lower throughput, higher p95 or more
+errors beyond `--tolerance`, or any extra statements per request, is flagged
+and exits 1. A run whose parameters (backend, data size, requests,
+concurrency) differ from the baseline's is not compared and exits 2. Usage:
+
+    export DB_BACKEND=sqlite SQLITE_PATH=bench.db
+    python -m benchmarks.synthetic_data --users 2000 --matches 100000
+    python -m benchmarks.api_suite --save-baseline benchmarks/baselines/sqlite.json
+    python -m benchmarks.api_suite --baseline benchmarks/baselines/sqlite.json
+
+Latency baselines are only comparable on the machine that recorded them;
+statement counts are comparable anywhere.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from werkzeug.serving import make_server
+from app import create_app
+from app.models.user import User
+from app.utils.db import execute_query, get_dialect
+from app.utils.db_metrics import query_metrics
+from benchmarks.load_test import run
+from benchmarks.synthetic_data import PASSWORD, user_email, user_name
+
+def scenarios(user_count):
+    """(name, method, path, body, authenticated, share of --requests) for each scenario.
+    Paths and bodies are functions of the request number, spreading load over users.
+    """
+    def user(number, salt=0):
+        return (number * 7919 + salt * 104729) % user_count + 1
+
+    def opponent(number):
+        # Any user other than user(number)
+        return (user(number) + user(number, 1) % (user_count - 1)) % user_count + 1
+
+    return [
+        ("login", 'POST', lambda n: "/api/auth/login",
+         lambda n: {"email": user_email(user(n)), "password": PASSWORD}, False, 0.2),
+        ("search", 'GET', lambda n: f"/api/auth/users/search?prefix=player{user(n) // 100:05d}",
+         None, False, 1.0),
+        ("record_match", 'POST', lambda n: "/api/matches",
+         lambda n: {"match_type": "singles", "team1_player1_name": user_name(user(n)),
+                    "team2_player1_name": user_name(opponent(n)),
+                    "team1_score": 6, "team2_score": n % 5}, True, 0.5),
+        ("list_all", 'GET', lambda n: "/api/matches/all?limit=50", None, True, 1.0),
+        ("list_user", 'GET', lambda n: f"/api/matches/user/{user(n)}?limit=10", None, True, 1.0)
+    ]
+
+def login_token(base_url):
+    from urllib.request import Request, urlopen
+    body = json.dumps({"email": user_email(1), "password": PASSWORD}).encode()
+    request = Request(base_url + "/api/auth/login", data=body,
+                      headers={'Content-Type': 'application/json'}, method='POST')
+    with urlopen(request) as response:
+        return json.loads(response.read())["token"]
+
+def suite_config(requests, concurrency):
+    """Parameters a report's numbers depend on: backend, data size and load."""
+    user_count = execute_query("SELECT COUNT(*) AS n FROM Users")[0].n
+    match_count = execute_query("SELECT COUNT(*) AS n FROM Matches")[0].n
+    if user_count < 2:
+        raise SystemExit("Seed the database first: python -m benchmarks.synthetic_data")
+    return {
+        "backend": get_dialect().name, "users": user_count, "matches": match_count,
+        "requests": requests, "concurrency": concurrency
+    }
+
+def run_suite(config):
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    user_count, requests, concurrency = config["users"], config["requests"], config["concurrency"]
+
+    app = create_app()
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    # Let the name index finish loading so background queries don't skew counts
+    deadline = time.monotonic() + 60
+    while not User.name_index.ready and time.monotonic() < deadline:
+        time.sleep(0.05)
+    token = login_token(base_url)
+
+    results = {}
+    try:
+        for name, method, path, body, authenticated, share in scenarios(user_count):
+            count = max(1, int(requests * share))
+            statements = query_metrics.statements
+            summary = run(lambda n: base_url + path(n), count, concurrency,
+                          token if authenticated else None, method, body)
+            statements = query_metrics.statements - statements
+            summary["db_statements_per_request"] = round(statements / max(summary["requests"], 1), 2)
+            results[name] = summary
+            print(f"{name:>13}: {summary['rps']:8.1f} req/s  p50 {summary['p50_ms']:7.2f} ms  "
+                  f"p95 {summary['p95_ms']:7.2f} ms  p99 {summary['p99_ms']:7.2f} ms  "
+                  f"{summary['db_statements_per_request']:5.2f} stmts/req  {summary['errors']} errors "
+                  f"{summary['error_codes'] or ''}")
+    finally:
+        server.shutdown()
+    return {"config": config, "scenarios": results}
+
+def config_mismatch(config, baseline):
+    """Describe how a run's parameters differ from the baseline's, or None."""
+    differences = [
+        f"{key} {config.get(key)} (baseline {baseline['config'].get(key)})"
+        for key in sorted(set(config) | set(baseline["config"]))
+        if config.get(key) != baseline["config"].get(key)
+    ]
+    return ", ".join(differences) or None
+
+def compare(report, baseline, tolerance):
+    """Return a message for each metric that regressed against the baseline.
+    Only meaningful when config_mismatch() finds nothing.
+    """
+    regressions = []
+    for name, result in report["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if base is None:
+            continue
+        if result["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {result['rps']} req/s, baseline {base['rps']}")
+        if result["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {result['p95_ms']} ms, baseline {base['p95_ms']}")
+        if result["db_statements_per_request"] > base["db_statements_per_request"] + 0.05:
+            regressions.append(f"{name}: {result['db_statements_per_request']} statements/request, "
+                               f"baseline {base['db_statements_per_request']}")
+        # Logins may be shed with 503 under load by design, so errors get the same tolerance
+        if result["errors"] > base["errors"] * (1 + tolerance):
+            regressions.append(f"{name}: {result['errors']} errors {result['error_codes']}, "
+                               f"baseline {base['errors']}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000, help="Requests per listing scenario")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--baseline', help="Compare against this saved report")
+    parser.add_argument('--save-baseline', help="Write this run's report here")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed fractional drop in throughput or rise in p95 (default 0.25)")
+    args = parser.parse_args()
+
+    config = suite_config(args.requests, args.concurrency)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        # Numbers from different data sizes or concurrency are not comparable
+        mismatch = config_mismatch(config, baseline)
+        if mismatch:
+            print(f"Not comparing against {args.baseline}; this run would use {mismatch}")
+            sys.exit(2)
+
+    report = run_suite(config)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.save_baseline) or '.', exist_ok=True)
+        with open(args.save_baseline, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved baseline to {args.save_baseline}")
+    if baseline is not None:
+        regressions = compare(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        print(f"{len(regressions)} regressions against {args.baseline}")
+        sys.exit(1 if regressions else 0)
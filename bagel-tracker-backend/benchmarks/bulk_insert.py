@@ -0,0 +1,62 @@
+"""Compare match insert throughput of Match.save() against Match.save_many().
+
+Runs against the database configured in .env and deletes the matches it
+creates afterwards. Usage:
+
+    python -m benchmarks.bulk_insert --rows 500 --player1 1 --player2 2
+"""
+import argparse
+import time
+from app.models.match import Match
+from app.utils.db import execute_query
+
+def build_matches(rows, player1_id, player2_id, reporter_user_id):
+    """Build unsaved singles matches alternating bagels and regular sets."""
+    return [
+        Match(
+            match_type='singles',
+            reporter_user_id=reporter_user_id,
+            team1_player1_id=player1_id,
+            team2_player1_id=player2_id,
+            team1_score=6,
+            team2_score=0 if i % 2 else 4
+        )
+        for i in range(rows)
+    ]
+
+def delete_matches(matches):
+    """Remove benchmark rows from the Matches table."""
+    match_ids = [match.match_id for match in matches if match.match_id]
+    for start in range(0, len(match_ids), 1000):
+        chunk = match_ids[start:start + 1000]
+        placeholders = ", ".join("?" for _ in chunk)
+        execute_query(f"DELETE FROM Matches WHERE match_id IN ({placeholders})",
+                      tuple(chunk), fetch=False)
+
+def run(rows, player1_id, player2_id):
+    results = {}
+    
+    matches = build_matches(rows, player1_id, player2_id, player1_id)
+    start = time.perf_counter()
+    for match in matches:
+        match.save()
+    results['single-row'] = rows / (time.perf_counter() - start)
+    delete_matches(matches)
+    
+    matches = build_matches(rows, player1_id, player2_id, player1_id)
+    start = time.perf_counter()
+    Match.save_many(matches)
+    results['bulk'] = rows / (time.perf_counter() - start)
+    delete_matches(matches)
+    
+    for name, rows_per_second in results.items():
+        print(f"{name:>10}: {rows_per_second:10.1f} rows/s")
+    print(f"   speedup: {results['bulk'] / results['single-row']:10.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500)
+    parser.add_argument('--player1', type=int, required=True, help="Existing user_id for team 1")
+    parser.add_argument('--player2', type=int, required=True, help="Existing user_id for team 2")
+    args = parser.parse_args()
+    run(args.rows, args.player1, args.player2)
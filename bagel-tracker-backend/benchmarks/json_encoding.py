@@ -0,0 +1,69 @@
+"""Benchmark building match list response bodies, from rows to JSON text.
+
+Encodes pages the way jsonify does (compact, sorted keys) with each JSON
+encoder, for object and columnar (?format=columnar) responses, against the
+previous path of hand-built dicts with str() dates through Flask's default
+encoder. No database is needed. Usage:
+
+    python -m benchmarks.json_encoding --rows 100000 --page-size 100
+"""
+import argparse
+import json
+import time
+from flask.json import JSONEncoder as FlaskJSONEncoder
+from app.models.match import Match
+from app.utils.json_encoding import ENCODERS, orjson
+from benchmarks.row_mapping import DESCRIPTION, synthetic_rows, hand_built_dicts
+
+def encode(payload, encoder):
+    return json.dumps(payload, cls=encoder, sort_keys=True, separators=(',', ':'))
+
+def page_bodies(rows, page_size, build, encoder, columnar=False):
+    """Encode every page of `rows`; returns the total body size in bytes."""
+    size = 0
+    for start in range(0, len(rows), page_size):
+        payload = {
+            "success": True,
+            "message": "Matches retrieved successfully",
+            "matches": build(rows[start:start + page_size]),
+            "next_cursor": None
+        }
+        if columnar:
+            payload["columns"] = list(Match.PUBLIC_FIELDS)
+        size += len(encode(payload, encoder))
+    return size
+
+def measure(name, rows, page_size, build, encoder, columnar=False, repeat=3, baseline=None):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = page_bodies(rows, page_size, build, encoder, columnar)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    speedup = f", {baseline / best:.2f}x" if baseline else ""
+    print(f"{name:>16}: {len(rows) / best:10.0f} rows/s ({best * 1000:.0f} ms, "
+          f"{size / len(rows):.0f} bytes/row{speedup})")
+    return best
+
+def run(count, page_size, repeat):
+    rows = synthetic_rows(count)
+    objects = lambda chunk: Match.mapper.serialize(DESCRIPTION, chunk)
+    columns = lambda chunk: Match.mapper.columns(DESCRIPTION, chunk)
+
+    baseline = measure("before", rows, page_size, hand_built_dicts, FlaskJSONEncoder, repeat=repeat)
+    for name in ENCODERS:
+        if name == 'orjson' and orjson is None:
+            print(f"{'orjson':>16}: not installed")
+            continue
+        encoder = ENCODERS[name]
+        measure(name, rows, page_size, objects, encoder, repeat=repeat, baseline=baseline)
+        measure(f"{name} columnar", rows, page_size, columns, encoder,
+                columnar=True, repeat=repeat, baseline=baseline)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=3, help="Keep the best of this many runs")
+    args = parser.parse_args()
+    run(args.rows, args.page_size, args.repeat)
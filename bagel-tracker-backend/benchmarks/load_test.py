@@ -0,0 +1,89 @@
+"""Drive a running backend with concurrent clients and report throughput and latency.
+
+Start the server, then point this at it, e.g.:
+
+    python run.py
+    python -m benchmarks.load_test --url http://localhost:8000/api/ping \
+        --token <jwt> --concurrency 50 --requests 5000
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+def run(url, requests, concurrency, token=None, method='GET', body=None):
+    """Send `requests` requests from `concurrency` threads; return a summary dict.
+    `url` and `body` may also be functions of the request number (0-based),
+    to vary what each request asks for.
+    """
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    data = json.dumps(body).encode() if body is not None and not callable(body) else None
+    
+    latencies = []
+    errors = []
+    remaining = [requests]
+    lock = threading.Lock()
+    
+    def client():
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+                number = requests - remaining[0] - 1
+            request = urllib.request.Request(
+                url(number) if callable(url) else url,
+                data=json.dumps(body(number)).encode() if callable(body) else data,
+                headers=headers, method=method
+            )
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    response.read()
+            except urllib.error.HTTPError as e:
+                errors.append(e.code)
+            except Exception as e:
+                errors.append(type(e).__name__)
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+    
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+    
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "error_codes": {str(code): count for code, count in sorted(Counter(errors).items(), key=str)},
+        "rps": round(len(latencies) / duration, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2)
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', required=True)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--token', help="JWT for protected endpoints")
+    parser.add_argument('--method', default='GET')
+    parser.add_argument('--body', help="JSON request body")
+    args = parser.parse_args()
+    summary = run(args.url, args.requests, args.concurrency, args.token,
+                  args.method, json.loads(args.body) if args.body else None)
+    print(json.dumps(summary, indent=2))
@@ -0,0 +1,70 @@
+"""Measure password verification throughput under concurrent logins.
+
+Compares verifying in the request thread (workers=0) with the process pool,
+and reports how long a cheap concurrent request waits while logins run.
+No database is needed. Usage:
+
+    python -m benchmarks.login_throughput --clients 16 --seconds 5
+"""
+import argparse
+import os
+import threading
+import time
+from app.utils.hashing import PasswordHasher, HashingBusyError
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+def run_mode(label, hasher, clients, seconds):
+    stored_hash = hasher.hash("correct horse battery staple")
+    deadline = time.perf_counter() + seconds
+    counts = {"ok": 0, "busy": 0}
+    lock = threading.Lock()
+    
+    def login_client():
+        while time.perf_counter() < deadline:
+            try:
+                hasher.verify_and_update(stored_hash, "correct horse battery staple")
+                outcome = "ok"
+            except HashingBusyError:
+                outcome = "busy"
+                time.sleep(0.01)
+            with lock:
+                counts[outcome] += 1
+    
+    # Stand-in for a cheap endpoint served by the same process
+    other_latencies = []
+    def other_client():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            sum(range(1000))
+            other_latencies.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.005)
+    
+    threads = [threading.Thread(target=login_client) for _ in range(clients)]
+    threads.append(threading.Thread(target=other_client))
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    
+    print(f"{label:>12}: {counts['ok'] / elapsed:8.1f} logins/s, "
+          f"{counts['busy']} rejected with 503, "
+          f"other request p99 {percentile(other_latencies, 0.99):.2f}ms")
+    hasher.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--rounds', type=int, default=29000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    
+    run_mode("in-thread", PasswordHasher(rounds=args.rounds, workers=0, max_pending=args.clients),
+             args.clients, args.seconds)
+    run_mode("process pool", PasswordHasher(rounds=args.rounds, workers=args.workers),
+             args.clients, args.seconds)
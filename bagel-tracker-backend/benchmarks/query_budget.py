@@ -0,0 +1,202 @@
+"""Check each endpoint's database round trips against checked-in budgets.
+
+Runs SCENARIOS in order through the Flask test client against a fresh
+temporary SQLite database, recording for every request the statements it
+executed and the connections it acquired (counted by app.utils.db_metrics).
+A request that needs more than its budget in
+benchmarks/baselines/query_budgets.json, or answers with an unexpected
+status, fails the run with a non-zero exit, so a change that adds round trips
+to a hot path (an N+1 lookup, a per-row query) is caught before it ships.
+Scenarios run in a fixed order on fixed data, so the counts are exact and
+include the effect of the in-process caches. tests/test_query_budgets.py runs
+the same check as part of the test suite. Usage:
+
+    python -m benchmarks.query_budget
+    python -m benchmarks.query_budget --update   # rewrite the budgets from this run
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+# Statements can only be counted on instrumented connections. Hashing runs
+# inline and cheaply; these only take effect if the app is not imported yet
+os.environ['DB_INSTRUMENTATION'] = 'true'
+os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
+os.environ.setdefault('PASSWORD_HASH_ROUNDS', '1000')
+os.environ.setdefault('JWT_SECRET_KEY', 'query-budget')
+
+from app import create_app
+from app.models.user import User
+from app.services.leaderboard_service import LeaderboardService
+from app.utils.current_user import identity_cache
+from app.utils.db import set_dialect, set_pool
+from app.utils.db_metrics import get_request_db_stats
+from app.utils.dialects import SqliteDialect
+from app.utils.init_db import create_tables
+
+BUDGETS_PATH = os.path.join(os.path.dirname(__file__), 'baselines', 'query_budgets.json')
+PLAYERS = ['alice', 'bob', 'carol', 'dave']
+PASSWORD = "bagels123"
+
+def register_body(name):
+    return {"name": name, "email": f"{name}@example.com", "password": PASSWORD}
+
+def singles(team1, team2, team2_score):
+    return {"match_type": "singles", "team1_player1_name": team1, "team2_player1_name": team2,
+            "team1_score": 6, "team2_score": team2_score}
+
+def doubles(team2_score):
+    return {"match_type": "doubles",
+            "team1_player1_name": "alice", "team1_player2_name": "carol",
+            "team2_player1_name": "bob", "team2_player2_name": "dave",
+            "team1_score": 6, "team2_score": team2_score}
+
+# Players are user_ids 1-4 and the first recorded match is match_id 1. Only
+# alice has logged in beforehand, so lookups of the others start uncached.
+# `path` and `headers` may be functions of the earlier responses, by scenario name.
+SCENARIOS = [
+    dict(name="register", method='POST', path="/api/auth/register", json=register_body("erin"), status=201),
+    dict(name="register_taken_email", method='POST', path="/api/auth/register",
+         json=dict(register_body("frank"), email="carol@example.com"), status=400),
+    dict(name="register_taken_name", method='POST', path="/api/auth/register",
+         json=register_body("Dave"), status=400),
+    dict(name="login", method='POST', path="/api/auth/login",
+         json={"email": "bob@example.com", "password": PASSWORD}, status=200),
+    dict(name="login_wrong_password", method='POST', path="/api/auth/login",
+         json={"email": "erin@example.com", "password": "wrong"}, status=401),
+    dict(name="ping", method='GET', path="/api/ping", auth=True, status=200),
+    dict(name="record_singles", method='POST', path="/api/matches", json=singles("alice", "bob", 0),
+         auth=True, status=201),
+    dict(name="record_doubles", method='POST', path="/api/matches", json=doubles(4), auth=True, status=201),
+    dict(name="record_unknown_player", method='POST', path="/api/matches", json=singles("alice", "nobody", 2),
+         auth=True, status=400),
+    dict(name="record_bulk", method='POST', path="/api/matches/bulk",
+         json={"matches": [singles("carol", "dave", n) for n in range(5)] + [doubles(n) for n in range(5)]},
+         auth=True, status=201),
+    dict(name="get_match", method='GET', path="/api/matches/1", auth=True, status=200),
+    dict(name="get_match_not_modified", method='GET', path="/api/matches/1", auth=True, status=304,
+         headers=lambda responses: {"If-None-Match": responses["get_match"].headers["ETag"]}),
+    dict(name="list_all", method='GET', path="/api/matches/all?limit=5", auth=True, status=200),
+    dict(name="list_all_next_page", method='GET', auth=True, status=200,
+         path=lambda responses: "/api/matches/all?limit=5&cursor=" + responses["list_all"].get_json()["next_cursor"]),
+    dict(name="list_user", method='GET', path="/api/matches/user/1?limit=5", auth=True, status=200),
+    dict(name="user_stats", method='GET', path="/api/stats/user/1", auth=True, status=200),
+    dict(name="user_ratings", method='GET', path="/api/stats/ratings/1", auth=True, status=200),
+    dict(name="head_to_head", method='GET', path="/api/stats/head-to-head?a=1&b=2", auth=True, status=200),
+    dict(name="partners", method='GET', path="/api/stats/partners/1?min_matches=1", auth=True, status=200),
+    dict(name="leaderboard", method='GET', path="/api/leaderboard?metric=wins", auth=True, status=200),
+    dict(name="users_page", method='GET', path="/api/auth/users?limit=3", auth=True, status=200),
+    dict(name="user_search", method='GET', path="/api/auth/users/search?prefix=a", status=200)
+]
+
+def run_scenarios():
+    """Run every scenario against a fresh temporary SQLite database;
+    return {name: {status, statements, connections}}.
+    """
+    workdir = tempfile.mkdtemp(prefix='query-budget-')
+    set_dialect(SqliteDialect(os.path.join(workdir, 'budget.db')))
+    try:
+        return _run_scenarios()
+    finally:
+        set_pool(None)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def _run_scenarios():
+    create_tables()
+    # Start from cold caches whatever ran earlier in this process
+    User.cache.clear()
+    identity_cache.clear()
+    LeaderboardService.invalidate()
+    for name in PLAYERS:
+        User(name=name, email=f"{name}@example.com", password_hash=User.hash_password(PASSWORD)).save()
+    # Searches fall back to SQL until the name index has loaded
+    User.name_index.load()
+
+    app = create_app()
+    captured = []
+
+    @app.after_request
+    def capture_db_stats(response):
+        captured.append(get_request_db_stats().to_dict())
+        return response
+
+    client = app.test_client()
+    token = client.post("/api/auth/login", json=register_body("alice")).get_json()["token"]
+
+    responses = {}
+    results = {}
+    for scenario in SCENARIOS:
+        path = scenario["path"]
+        headers = scenario.get("headers", {})
+        headers = dict(headers(responses) if callable(headers) else headers)
+        if scenario.get("auth"):
+            headers["Authorization"] = f"Bearer {token}"
+
+        captured.clear()
+        response = client.open(path(responses) if callable(path) else path, method=scenario["method"],
+                               json=scenario.get("json"), headers=headers)
+        responses[scenario["name"]] = response
+        stats = captured[-1] if captured else {"statements": 0, "connections": 0}
+        results[scenario["name"]] = {
+            "status": response.status_code,
+            "statements": stats["statements"],
+            "connections": stats["connections"]
+        }
+    return results
+
+def load_budgets(path=BUDGETS_PATH):
+    """Read the checked-in budgets, or {} when there are none yet."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def check(results, budgets):
+    """Return a message for each scenario over budget or with the wrong status."""
+    failures = []
+    expected_status = {scenario["name"]: scenario["status"] for scenario in SCENARIOS}
+    for name, result in results.items():
+        if result["status"] != expected_status[name]:
+            failures.append(f"{name}: status {result['status']}, expected {expected_status[name]}")
+        budget = budgets.get(name)
+        if budget is None:
+            failures.append(f"{name}: no budget; run with --update to record one")
+            continue
+        for metric in ('statements', 'connections'):
+            if result[metric] > budget[metric]:
+                failures.append(f"{name}: {result[metric]} {metric}, budget {budget[metric]}")
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budgets', default=BUDGETS_PATH)
+    parser.add_argument('--update', action='store_true', help="Write this run's counts as the budgets")
+    args = parser.parse_args()
+
+    results = run_scenarios()
+    budgets = load_budgets(args.budgets)
+
+    for name, result in results.items():
+        budget = budgets.get(name, {})
+        under = [metric for metric in ('statements', 'connections')
+                 if metric in budget and result[metric] < budget[metric]]
+        note = f"  (under budget in {', '.join(under)}; --update to tighten)" if under else ""
+        print(f"{name:>24}: {result['status']}  {result['statements']:3d} statements  "
+              f"{result['connections']:d} connections{note}")
+
+    failures = check(results, budgets if not args.update else results)
+    if args.update and not failures:
+        with open(args.budgets, 'w') as f:
+            json.dump({name: {"statements": result["statements"], "connections": result["connections"]}
+                       for name, result in results.items()}, f, indent=2)
+            f.write("\n")
+        print(f"Saved budgets to {args.budgets}")
+        sys.exit(0)
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print(f"{len(failures)} failures against {args.budgets}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,140 @@
+"""Benchmark turning Matches rows into records and API dicts.
+
+Compares RowMapper with the per-field attribute copies it replaced:
+records (finders) against keyword construction of a plain, dict-backed
+class, and API dicts (list endpoints) against hand-built dicts with str()
+on each datetime. Rows are namedtuples, which support access by name and
+by index like pyodbc rows, so no database is needed. Usage:
+
+    python -m benchmarks.row_mapping --rows 100000
+"""
+import argparse
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import datetime, timedelta
+from app.models.match import Match
+
+Row = namedtuple('Row', Match.FIELDS)
+DESCRIPTION = [(field,) for field in Match.FIELDS]
+
+def synthetic_rows(count):
+    """Build Matches rows with distinct dates, half singles and half doubles."""
+    start = datetime(2024, 1, 1, 9, 30, 0, 123000)
+    rows = []
+    for i in range(count):
+        played = start + timedelta(minutes=i)
+        doubles = i % 2 == 1
+        rows.append(Row(
+            i + 1, 'doubles' if doubles else 'singles', played, 1,
+            1, 3 if doubles else None, 2, 4 if doubles else None,
+            6, i % 7, 1 if i % 7 < 6 else None, i % 7 == 0,
+            played, played
+        ))
+    return rows
+
+class PlainMatch:
+    """Match as it was before __slots__, with a per-instance __dict__."""
+    def __init__(self, match_id=None, match_type=None, match_date=None,
+                 reporter_user_id=None, team1_player1_id=None, team1_player2_id=None,
+                 team2_player1_id=None, team2_player2_id=None, team1_score=None,
+                 team2_score=None, winner_team=None, is_bagel=None,
+                 created_at=None, updated_at=None):
+        self.match_id = match_id
+        self.match_type = match_type
+        self.match_date = match_date
+        self.reporter_user_id = reporter_user_id
+        self.team1_player1_id = team1_player1_id
+        self.team1_player2_id = team1_player2_id
+        self.team2_player1_id = team2_player1_id
+        self.team2_player2_id = team2_player2_id
+        self.team1_score = team1_score
+        self.team2_score = team2_score
+        self.winner_team = winner_team
+        self.is_bagel = is_bagel
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+def hand_built_records(rows):
+    return [
+        PlainMatch(
+            match_id=row.match_id, match_type=row.match_type, match_date=row.match_date,
+            reporter_user_id=row.reporter_user_id,
+            team1_player1_id=row.team1_player1_id, team1_player2_id=row.team1_player2_id,
+            team2_player1_id=row.team2_player1_id, team2_player2_id=row.team2_player2_id,
+            team1_score=row.team1_score, team2_score=row.team2_score,
+            winner_team=row.winner_team, is_bagel=row.is_bagel,
+            created_at=row.created_at, updated_at=row.updated_at
+        )
+        for row in rows
+    ]
+
+def mapped_records(rows):
+    return Match.mapper.map(DESCRIPTION, rows)
+
+def hand_built_dicts(rows):
+    """The per-field mapping the list endpoints used before RowMapper."""
+    return [
+        {
+            "match_id": row.match_id,
+            "match_type": row.match_type,
+            "match_date": str(row.match_date),
+            "reporter_user_id": row.reporter_user_id,
+            "team1_player1_id": row.team1_player1_id,
+            "team1_player2_id": row.team1_player2_id,
+            "team2_player1_id": row.team2_player1_id,
+            "team2_player2_id": row.team2_player2_id,
+            "team1_score": row.team1_score,
+            "team2_score": row.team2_score,
+            "winner_team": row.winner_team,
+            "is_bagel": row.is_bagel,
+            "created_at": str(row.created_at)
+        }
+        for row in rows
+    ]
+
+def serialized_dicts(rows):
+    return Match.mapper.serialize(DESCRIPTION, rows)
+
+def measure(name, fn, rows, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    result = fn(rows)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    print(f"  {name:>10}: {len(rows) / best:10.0f} rows/s ({best * 1000:.0f} ms, "
+          f"{retained / len(rows):.0f} bytes/row)")
+    return best
+
+def run(count, repeat):
+    rows = synthetic_rows(count)
+    # Same fields and values; the mapper leaves datetime formatting to the JSON encoder
+    assert [
+        {field: str(value) if isinstance(value, datetime) else value for field, value in match.items()}
+        for match in serialized_dicts(rows[:100])
+    ] == hand_built_dicts(rows[:100])
+
+    print("records:")
+    before = measure("hand-built", hand_built_records, rows, repeat)
+    after = measure("row mapper", mapped_records, rows, repeat)
+    print(f"  speedup: {before / after:.2f}x")
+
+    print("API dicts:")
+    before = measure("hand-built", hand_built_dicts, rows, repeat)
+    after = measure("row mapper", serialized_dicts, rows, repeat)
+    print(f"  speedup: {before / after:.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5, help="Keep the best of this many runs")
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
@@ -0,0 +1,133 @@
+"""Fill an empty database with synthetic users and matches for load testing.
+
+Users are named player0000001, player0000002, ... with emails at
+example.com and the password PASSWORD. Player activity is skewed (a few
+regulars play most matches), about 60% of matches are singles, scores follow
+common set results, and match dates advance with match_id over `--days`.
+
+Rows are written in batches straight to the tables rather than through the
+API, then MatchParticipants and the derived tables (stats, head-to-head,
+partnerships, ratings) are rebuilt from Matches. Generation streams batch by
+batch, so 10M matches need no more memory than 10k. Meant for a local SQLite
+database, e.g.:
+
+    DB_BACKEND=sqlite SQLITE_PATH=bench.db python -m benchmarks.synthetic_data \
+        --users 10000 --matches 1000000
+"""
+import argparse
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+from app.models.match import Match
+from app.models.user import User
+from app.utils.db import db_connection, execute_query, get_dialect
+from app.utils.init_db import backfill_match_participants, create_tables
+from app.utils.rebuild import TARGETS
+
+PASSWORD = "bagels-benchmark"
+BATCH_SIZE = 10000
+# Loser's games in a set won 6-x, weighted towards close sets
+SIX_GAME_LOSSES = [0, 1, 2, 3, 4]
+SIX_GAME_WEIGHTS = [8, 12, 20, 28, 32]
+
+def user_name(index):
+    return f"player{index:07d}"
+
+def user_email(index):
+    return f"{user_name(index)}@example.com"
+
+def user_rows(count, password_hash):
+    """(name, email, password_hash) for users 1..count."""
+    for index in range(1, count + 1):
+        yield (user_name(index), user_email(index), password_hash)
+
+def set_score(rng):
+    """(winner games, loser games) for one set."""
+    if rng.random() < 0.15:
+        return 7, rng.choice((5, 6))
+    return 6, rng.choices(SIX_GAME_LOSSES, SIX_GAME_WEIGHTS)[0]
+
+def match_rows(count, user_ids, days, seed):
+    """Rows of Match.INSERT_COLUMNS values, oldest match first."""
+    rng = random.Random(seed)
+    # Zipf-like activity: the k-th most active player plays ~1/k^0.8 as often
+    cum_weights = list(itertools.accumulate(1 / (rank ** 0.8) for rank in range(1, len(user_ids) + 1)))
+    players = user_ids[:]
+    rng.shuffle(players)
+
+    start = datetime.now() - timedelta(days=days)
+    step = timedelta(days=days) / max(count, 1)
+    for index in range(count):
+        doubles = len(players) >= 4 and rng.random() < 0.4
+        needed = 4 if doubles else 2
+        chosen = []
+        while len(chosen) < needed:
+            player = rng.choices(players, cum_weights=cum_weights)[0]
+            if player not in chosen:
+                chosen.append(player)
+
+        won, lost = set_score(rng)
+        winner_team = rng.choice((1, 2))
+        team1_score, team2_score = (won, lost) if winner_team == 1 else (lost, won)
+        match_date = start + step * index + timedelta(seconds=rng.randint(0, 59))
+        if doubles:
+            team1, team2 = chosen[:2], chosen[2:]
+        else:
+            team1, team2 = [chosen[0], None], [chosen[1], None]
+        yield (
+            'doubles' if doubles else 'singles', match_date, rng.choice(chosen),
+            team1[0], team1[1], team2[0], team2[1],
+            team1_score, team2_score, winner_team, won == 6 and lost == 0
+        )
+
+def insert_batches(table, columns, rows):
+    """Insert an iterable of rows with executemany, BATCH_SIZE per transaction."""
+    query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+    total = 0
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        if get_dialect().name == 'sqlserver':
+            cursor.fast_executemany = True
+        try:
+            while True:
+                batch = list(itertools.islice(rows, BATCH_SIZE))
+                if not batch:
+                    break
+                cursor.executemany(query, batch)
+                conn.commit()
+                total += len(batch)
+        finally:
+            cursor.close()
+    return total
+
+def generate(users, matches, days, seed):
+    create_tables()
+    if execute_query("SELECT COUNT(*) AS n FROM Users")[0].n:
+        raise SystemExit("Users is not empty; point the generator at a fresh database")
+
+    start = time.perf_counter()
+    # Every user shares one hash, so seeding costs a single hashing round
+    password_hash = User.hash_password(PASSWORD)
+    insert_batches('Users', ['name', 'email', 'password_hash'], user_rows(users, password_hash))
+    user_ids = [row.user_id for row in execute_query("SELECT user_id FROM Users ORDER BY user_id")]
+    print(f"Inserted {len(user_ids)} users in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    inserted = insert_batches('Matches', Match.INSERT_COLUMNS, match_rows(matches, user_ids, days, seed))
+    print(f"Inserted {inserted} matches in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    backfill_match_participants()
+    for target in ('stats', 'head-to-head', 'partners', 'ratings'):
+        TARGETS[target]()
+    print(f"Built derived tables in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--matches', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=365, help="Spread match dates over this many days")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    generate(args.users, args.matches, args.days, args.seed)
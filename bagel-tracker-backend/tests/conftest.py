@@ -0,0 +1,71 @@
+"""Shared fixtures: each test gets a fresh SQLite database and empty caches."""
+import os
+
+# App modules read these at import time, so set them before importing any
+os.environ.update(
+    DB_BACKEND='sqlite',
+    DB_INSTRUMENTATION='true',
+    PASSWORD_HASH_WORKERS='0',
+    PASSWORD_HASH_ROUNDS='1000',
+    JWT_SECRET_KEY='test-secret'
+)
+
+import pytest
+from app import create_app
+from app.models.user import User
+from app.services.leaderboard_service import LeaderboardService
+from app.utils.current_user import identity_cache
+from app.utils.db import set_dialect, set_pool
+from app.utils.db_metrics import query_metrics
+from app.utils.dialects import SqliteDialect
+from app.utils.init_db import create_tables
+
+PASSWORD = "bagels123"
+
+@pytest.fixture
+def db(tmp_path):
+    """Point the app at an empty, migrated SQLite database for one test."""
+    set_dialect(SqliteDialect(str(tmp_path / "test.db")))
+    create_tables()
+    User.cache.clear()
+    identity_cache.clear()
+    LeaderboardService.invalidate()
+    query_metrics.reset()
+    User.name_index.load()
+    yield
+    set_pool(None)
+
+@pytest.fixture
+def app(db):
+    return create_app()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def players(db):
+    """Users alice, bob, carol and dave (user_ids 1-4), by name."""
+    users = {}
+    for name in ('alice', 'bob', 'carol', 'dave'):
+        user = User(name=name, email=f"{name}@example.com", password_hash=User.hash_password(PASSWORD))
+        users[name] = user.save()
+    return users
+
+@pytest.fixture
+def auth_headers(client, players):
+    """Authorization header for alice."""
+    response = client.post("/api/auth/login", json={"email": "alice@example.com", "password": PASSWORD})
+    return {"Authorization": f"Bearer {response.get_json()['token']}"}
+
+@pytest.fixture
+def record_singles(client, auth_headers):
+    """Record a 6-`team2_score` singles win for team1 through the API."""
+    def record(team1, team2, team2_score=3):
+        response = client.post("/api/matches", headers=auth_headers, json={
+            "match_type": "singles", "team1_player1_name": team1, "team2_player1_name": team2,
+            "team1_score": 6, "team2_score": team2_score
+        })
+        assert response.status_code == 201
+        return response.get_json()
+    return record
@@ -0,0 +1,14 @@
+"""Registration reads back database defaults in the insert."""
+
+def test_registration_returns_the_stored_defaults(client, auth_headers):
+    response = client.post("/api/auth/register",
+                           json={"name": "erin", "email": "erin@example.com", "password": "bagels123"})
+    assert response.status_code == 201
+    registered = response.get_json()["user"]
+
+    listed = client.get("/api/auth/users", headers=auth_headers).get_json()["users"]
+    stored = next(user for user in listed if user["name"] == "erin")
+    assert registered["user_id"] == stored["user_id"]
+    assert registered["is_active"] == stored["is_active"]
+    # Formatted by the JSON encoder the same way as everywhere else
+    assert registered["created_at"] == stored["created_at"]
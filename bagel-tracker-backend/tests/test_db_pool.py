@@ -0,0 +1,157 @@
+"""ConnectionPool behaviour against a stand-in DB-API driver."""
+import threading
+import time
+import pytest
+from app.utils.db import ConnectionPool, PoolTimeoutError, db_connection, get_pool, set_pool
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, *params):
+        if self.conn.broken:
+            raise RuntimeError("connection lost")
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    def __init__(self):
+        self.broken = False
+        self.closed = False
+        self.rollbacks = 0
+
+    def cursor(self):
+        if self.broken:
+            raise RuntimeError("connection lost")
+        return FakeCursor(self)
+
+    def rollback(self):
+        if self.broken:
+            raise RuntimeError("connection lost")
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+class FakeDriver:
+    """connect() callable that records every connection it opens."""
+
+    def __init__(self):
+        self.connections = []
+        self.fail = False
+
+    def __call__(self):
+        if self.fail:
+            raise RuntimeError("server unavailable")
+        conn = FakeConnection()
+        self.connections.append(conn)
+        return conn
+
+@pytest.fixture
+def driver():
+    return FakeDriver()
+
+def make_pool(driver, **options):
+    options.setdefault('checkout_timeout', 1)
+    return ConnectionPool(driver, **options)
+
+def test_released_connection_is_rolled_back_and_reused(driver):
+    pool = make_pool(driver)
+    conn = pool.acquire()
+    pool.release(conn)
+
+    assert conn.rollbacks == 1
+    assert pool.acquire() is conn
+    assert pool.metrics()["creations"] == 1
+
+def test_exhausted_pool_times_out(driver):
+    pool = make_pool(driver, max_size=1, checkout_timeout=0.05)
+    pool.acquire()
+
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+    metrics = pool.metrics()
+    assert metrics["timeouts"] == 1
+    assert metrics["waits"] == 1
+    assert metrics["in_use"] == 1
+
+def test_waiter_gets_connection_released_by_another_thread(driver):
+    pool = make_pool(driver, max_size=1, checkout_timeout=2)
+    conn = pool.acquire()
+    releaser = threading.Timer(0.05, pool.release, (conn,))
+    releaser.start()
+
+    assert pool.acquire() is conn
+    releaser.join()
+    assert pool.metrics()["waits"] == 1
+
+def test_broken_connection_is_discarded_on_release(driver):
+    pool = make_pool(driver, max_size=1)
+    conn = pool.acquire()
+    conn.broken = True
+    pool.release(conn)
+
+    assert conn.closed
+    assert pool.metrics()["size"] == 0
+    replacement = pool.acquire()
+    assert replacement is not conn
+    assert len(driver.connections) == 2
+
+def test_failed_health_check_replaces_idle_connection(driver):
+    pool = make_pool(driver, max_size=1, health_check_interval=0)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.broken = True
+
+    replacement = pool.acquire()
+    assert replacement is not conn
+    assert conn.closed
+    metrics = pool.metrics()
+    assert metrics["health_check_failures"] == 1
+    assert metrics["size"] == 1
+
+def test_idle_connections_past_timeout_are_evicted(driver):
+    pool = make_pool(driver, idle_timeout=0.01)
+    conn = pool.acquire()
+    pool.release(conn)
+    time.sleep(0.02)
+
+    assert pool.acquire() is not conn
+    assert conn.closed
+    assert pool.metrics()["evictions"] == 1
+
+def test_failed_connect_frees_its_slot(driver):
+    pool = make_pool(driver, max_size=1, checkout_timeout=0.05)
+    driver.fail = True
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+    driver.fail = False
+    assert pool.acquire() is driver.connections[0]
+
+def test_db_connection_releases_on_exception(driver):
+    pool = make_pool(driver)
+    set_pool(pool)
+    try:
+        with pytest.raises(ValueError):
+            with db_connection() as conn:
+                raise ValueError("query failed")
+        metrics = pool.metrics()
+        assert metrics["in_use"] == 0
+        assert metrics["idle"] == 1
+        assert conn.rollbacks == 1
+    finally:
+        set_pool(None)
+
+def test_request_connection_is_released_at_teardown_after_an_error(app):
+    with pytest.raises(ValueError):
+        with app.app_context():
+            with db_connection():
+                pass
+            assert get_pool().metrics()["in_use"] == 1
+            raise ValueError("view failed")
+    assert get_pool().metrics()["in_use"] == 0
@@ -0,0 +1,84 @@
+"""PasswordHasher backpressure: a full queue, a stuck worker or a dead pool means busy."""
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from app.utils.hashing import HashingBusyError, PasswordHasher, password_hasher
+
+class FakeExecutor:
+    """Executor stand-in whose futures are completed (or not) by the test."""
+
+    def __init__(self, broken=False):
+        self.broken = broken
+        self.futures = []
+        self.shut_down = False
+
+    def submit(self, fn, *args):
+        if self.broken:
+            raise BrokenProcessPool("a worker died")
+        future = Future()
+        self.futures.append(future)
+        return future
+
+    def shutdown(self, wait=True):
+        self.shut_down = True
+
+def make_hasher(executor, **options):
+    hasher = PasswordHasher(rounds=1000, workers=1, retry_after=3, **options)
+    hasher._executor = executor
+    return hasher
+
+def test_inline_hashing_verifies():
+    hasher = PasswordHasher(rounds=1000, workers=0)
+    stored = hasher.hash("bagels123")
+
+    assert hasher.verify_and_update(stored, "bagels123") == (True, None)
+    assert hasher.verify_and_update(stored, "wrong")[0] is False
+
+def test_full_queue_is_busy():
+    hasher = make_hasher(FakeExecutor(), max_pending=1, timeout=0.01)
+    with pytest.raises(HashingBusyError):
+        hasher.hash("first")
+
+    # The timed-out hash still holds its slot until it finishes
+    with pytest.raises(HashingBusyError) as busy:
+        hasher.hash("second")
+    assert busy.value.retry_after == 3
+
+def test_timeout_is_busy_and_frees_the_slot_when_done():
+    executor = FakeExecutor()
+    hasher = make_hasher(executor, max_pending=1, timeout=0.01)
+    with pytest.raises(HashingBusyError):
+        hasher.hash("bagels123")
+
+    executor.futures[0].set_result("hash")
+    assert hasher._slots.acquire(blocking=False)
+
+@pytest.mark.parametrize('fail_on_submit', [True, False])
+def test_broken_pool_is_busy_and_replaced(fail_on_submit):
+    executor = FakeExecutor(broken=fail_on_submit)
+    hasher = make_hasher(executor, max_pending=1)
+    if not fail_on_submit:
+        original_submit = executor.submit
+
+        def submit_then_die(fn, *args):
+            future = original_submit(fn, *args)
+            future.set_exception(BrokenProcessPool("a worker died"))
+            return future
+        executor.submit = submit_then_die
+
+    with pytest.raises(HashingBusyError):
+        hasher.hash("bagels123")
+    assert executor.shut_down
+    assert hasher._executor is None
+    assert hasher._slots.acquire(blocking=False)
+
+def test_busy_hashing_asks_clients_to_retry(client, db, monkeypatch):
+    def busy(password):
+        raise HashingBusyError(retry_after=2)
+    monkeypatch.setattr(password_hasher, 'hash', busy)
+
+    response = client.post("/api/auth/register",
+                           json={"name": "erin", "email": "erin@example.com", "password": "bagels123"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
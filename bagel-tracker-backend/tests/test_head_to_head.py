@@ -0,0 +1,53 @@
+"""HeadToHead pair aggregates across recording and editing matches."""
+from datetime import datetime
+from app.models.head_to_head import HeadToHead
+from app.models.match import Match
+from app.utils.db import execute_query
+
+def singles(team1, team2, team1_score=6, team2_score=3, **fields):
+    return Match(match_type='singles', reporter_user_id=team1.user_id,
+                 team1_player1_id=team1.user_id, team2_player1_id=team2.user_id,
+                 team1_score=team1_score, team2_score=team2_score, **fields)
+
+def test_record_is_reported_from_either_side(players):
+    alice, bob = players['alice'], players['bob']
+    singles(alice, bob, 6, 0).save()
+    singles(bob, alice, 6, 4).save()
+    singles(alice, bob).save()
+
+    assert HeadToHead.find_mismatches() == []
+    record = HeadToHead.find_pair(bob.user_id, alice.user_id)["singles"]
+    assert (record["matches_played"], record["wins"], record["losses"]) == (3, 1, 2)
+    assert (record["bagels_given"], record["bagels_received"]) == (0, 1)
+
+def test_edits_move_wins_and_opponents(players):
+    alice, bob, carol = players['alice'], players['bob'], players['carol']
+    match = singles(alice, bob, 6, 0).save()
+
+    match.team1_score, match.team2_score = 2, 6
+    match.save()
+    record = HeadToHead.find_pair(bob.user_id, alice.user_id)["singles"]
+    assert (record["wins"], record["losses"], record["bagels_given"]) == (1, 0, 0)
+
+    match.team1_player1_id = carol.user_id
+    match.save()
+    assert HeadToHead.find_pair(alice.user_id, bob.user_id)["totals"]["matches_played"] == 0
+    assert HeadToHead.find_pair(carol.user_id, bob.user_id)["singles"]["losses"] == 1
+    assert HeadToHead.find_mismatches() == []
+
+def test_moving_the_latest_match_back_recomputes_last_played(players):
+    alice, bob = players['alice'], players['bob']
+    singles(alice, bob, match_date=datetime(2024, 5, 1)).save()
+    latest = singles(alice, bob, match_date=datetime(2024, 6, 1)).save()
+
+    latest.match_date = datetime(2024, 4, 1)
+    latest.save()
+
+    assert HeadToHead.find_mismatches() == []
+
+def test_missing_last_played_is_reported(players):
+    alice, bob = players['alice'], players['bob']
+    singles(alice, bob).save()
+    execute_query("UPDATE HeadToHead SET last_played = NULL", fetch=False)
+
+    assert HeadToHead.find_mismatches() == [(alice.user_id, bob.user_id, 'singles')]
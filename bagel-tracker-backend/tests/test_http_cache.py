@@ -0,0 +1,40 @@
+"""Conditional GET on match read endpoints."""
+
+def get(client, auth_headers, path, etag=None):
+    headers = dict(auth_headers, **{"If-None-Match": etag}) if etag else auth_headers
+    return client.get(path, headers=headers)
+
+def test_unchanged_match_list_is_not_modified(client, auth_headers, record_singles):
+    record_singles("alice", "bob")
+    etag = get(client, auth_headers, "/api/matches/all").headers["ETag"]
+
+    assert get(client, auth_headers, "/api/matches/all", etag).status_code == 304
+
+    record_singles("carol", "dave")
+    changed = get(client, auth_headers, "/api/matches/all", etag)
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+def test_user_history_only_changes_with_that_users_matches(client, auth_headers, players, record_singles):
+    record_singles("alice", "bob")
+    path = f"/api/matches/user/{players['alice'].user_id}"
+    etag = get(client, auth_headers, path).headers["ETag"]
+
+    record_singles("carol", "dave")
+    assert get(client, auth_headers, path, etag).status_code == 304
+
+    record_singles("carol", "alice")
+    assert get(client, auth_headers, path, etag).status_code == 200
+
+def test_each_page_size_gets_its_own_etag(client, auth_headers, record_singles):
+    record_singles("alice", "bob")
+
+    first = get(client, auth_headers, "/api/matches/all?limit=1").headers["ETag"]
+    second = get(client, auth_headers, "/api/matches/all?limit=2").headers["ETag"]
+    assert first != second
+
+def test_missing_match_is_not_cached(client, auth_headers, players):
+    response = get(client, auth_headers, "/api/matches/99")
+
+    assert response.status_code == 404
+    assert "ETag" not in response.headers
@@ -0,0 +1,33 @@
+"""Leaderboard caching and argument validation."""
+from app.models.leaderboard import Leaderboard
+from app.services.leaderboard_service import LeaderboardService
+
+def leaders(client, auth_headers, metric):
+    response = client.get(f"/api/leaderboard?metric={metric}", headers=auth_headers)
+    assert response.status_code == 200
+    return [(row["name"], row["score"]) for row in response.get_json()["leaderboard"]]
+
+def test_recording_a_match_refreshes_the_cached_leaderboard(client, auth_headers, record_singles):
+    record_singles("alice", "bob", 0)
+    assert leaders(client, auth_headers, "bagels_given") == [("alice", 1), ("bob", 0)]
+
+    record_singles("bob", "alice", 0)
+    record_singles("bob", "carol", 0)
+    assert leaders(client, auth_headers, "bagels_given")[0] == ("bob", 2)
+
+def test_ranking_read_before_an_invalidation_is_not_cached(players, monkeypatch):
+    top = Leaderboard.top
+
+    def top_then_record(*args):
+        ranking = top(*args)
+        # A match recorded while the ranking query ran
+        LeaderboardService.invalidate()
+        return ranking
+    monkeypatch.setattr(Leaderboard, 'top', staticmethod(top_then_record))
+
+    assert LeaderboardService.get_leaderboard('wins')["success"]
+    assert LeaderboardService._cache == {}
+
+def test_unknown_metric_or_match_type_is_a_bad_request(client, auth_headers):
+    assert client.get("/api/leaderboard?metric=style_points", headers=auth_headers).status_code == 400
+    assert client.get("/api/leaderboard?type=mixed", headers=auth_headers).status_code == 400
@@ -0,0 +1,34 @@
+"""Per-player match history through MatchParticipants, including edits."""
+import pytest
+from app.models.match import Match
+from app.models.player_stats import PlayerStats
+
+def singles(team1, team2, **fields):
+    return Match(match_type='singles', reporter_user_id=team1.user_id,
+                 team1_player1_id=team1.user_id, team2_player1_id=team2.user_id,
+                 team1_score=6, team2_score=3, **fields)
+
+def history(user):
+    return [match["match_id"] for match in Match.get_matches_by_user(user.user_id)]
+
+def test_edit_moves_the_match_between_player_histories(players):
+    alice, bob, carol = players['alice'], players['bob'], players['carol']
+    match = singles(alice, bob).save()
+    assert history(bob) == [match.match_id]
+
+    match.team2_player1_id = carol.user_id
+    match.save()
+
+    assert history(alice) == [match.match_id]
+    assert history(bob) == []
+    assert history(carol) == [match.match_id]
+
+def test_editing_a_missing_match_raises_and_writes_nothing(players):
+    match = singles(players['alice'], players['bob'], match_id=99)
+
+    with pytest.raises(LookupError):
+        match.save()
+    assert match.match_id == 99
+    assert Match.find_by_id(99) is None
+    assert history(players['alice']) == []
+    assert PlayerStats.find_by_user(players['alice'].user_id)["totals"]["matches_played"] == 0
@@ -0,0 +1,8 @@
+"""Monitoring endpoints are only served to allowlisted addresses."""
+import pytest
+
+@pytest.mark.parametrize('address, status', [('127.0.0.1', 200), ('::1', 200), ('10.0.0.1', 403)])
+def test_metrics_are_served_to_allowed_addresses_only(client, address, status):
+    for path in ("/api/metrics/pool", "/api/metrics/db"):
+        response = client.get(path, environ_base={"REMOTE_ADDR": address})
+        assert response.status_code == status
@@ -0,0 +1,48 @@
+"""Keyset pagination of match listings."""
+from datetime import datetime
+from app.models.match import Match
+from app.utils.pagination import decode_cursor, encode_cursor
+
+def pages(client, auth_headers, path, limit):
+    """Follow next_cursor to the end, returning the match_ids of each page."""
+    result = []
+    url = f"{path}?limit={limit}"
+    while True:
+        body = client.get(url, headers=auth_headers).get_json()
+        result.append([match["match_id"] for match in body["matches"]])
+        if body["next_cursor"] is None:
+            return result
+        url = f"{path}?limit={limit}&cursor={body['next_cursor']}"
+
+def record(players, count, match_date=None):
+    alice, bob = players['alice'], players['bob']
+    Match.save_many([
+        Match(match_type='singles', reporter_user_id=alice.user_id, match_date=match_date,
+              team1_player1_id=alice.user_id, team2_player1_id=bob.user_id,
+              team1_score=6, team2_score=score % 6)
+        for score in range(count)
+    ])
+
+def test_match_list_pages_by_cursor(client, auth_headers, players, record_singles):
+    for score in range(5):
+        record_singles("alice", "bob", score)
+
+    assert pages(client, auth_headers, "/api/matches/all", 2) == [[5, 4], [3, 2], [1]]
+
+def test_pages_split_rows_sharing_a_match_date(client, auth_headers, players):
+    # Microseconds are where a cursor and the stored column can disagree
+    record(players, 7, datetime(2024, 5, 1, 18, 30, 15, 123457))
+    record(players, 2, datetime(2024, 5, 2))
+
+    for path in ("/api/matches/all", f"/api/matches/user/{players['bob'].user_id}"):
+        assert pages(client, auth_headers, path, 3) == [[9, 8, 7], [6, 5, 4], [3, 2, 1]]
+
+def test_cursor_round_trips_the_stored_value():
+    match_date = datetime(2024, 5, 1, 18, 30, 15, 3000)
+
+    assert decode_cursor(encode_cursor(match_date, 42)) == (match_date, 42)
+
+def test_bad_cursor_is_rejected(client, auth_headers):
+    response = client.get("/api/matches/all?cursor=not-a-cursor", headers=auth_headers)
+
+    assert response.status_code == 400
@@ -0,0 +1,76 @@
+"""Doubles partnership aggregates across recording and editing matches."""
+from datetime import datetime
+from app.models.match import Match
+from app.models.partnership import Partnership
+from app.utils.db import execute_query
+
+def doubles(team1, team2, team1_score=6, team2_score=3, **fields):
+    return Match(match_type='doubles', reporter_user_id=team1[0].user_id,
+                 team1_player1_id=team1[0].user_id, team1_player2_id=team1[1].user_id,
+                 team2_player1_id=team2[0].user_id, team2_player2_id=team2[1].user_id,
+                 team1_score=team1_score, team2_score=team2_score, **fields)
+
+def partners(user):
+    return [(p["partner_id"], p["matches_played"], p["wins"])
+            for p in Partnership.find_partners(user.user_id, min_matches=1)]
+
+def test_partners_are_ranked_by_win_rate(players):
+    alice, bob, carol, dave = (players[name] for name in ('alice', 'bob', 'carol', 'dave'))
+    Match.save_many([doubles((alice, carol), (bob, dave)), doubles((alice, carol), (bob, dave), 6, 0),
+                     doubles((alice, bob), (carol, dave), 2, 6)])
+
+    assert Partnership.find_mismatches() == []
+    assert partners(alice) == [(carol.user_id, 2, 2), (bob.user_id, 1, 0)]
+    assert Partnership.find_partners(alice.user_id, min_matches=1, worst=True)[0]["partner_id"] == bob.user_id
+    assert partners(carol)[0] == (alice.user_id, 2, 2)
+
+def test_changing_partners_moves_the_partnership(players):
+    alice, bob, carol, dave = (players[name] for name in ('alice', 'bob', 'carol', 'dave'))
+    match = doubles((alice, carol), (bob, dave)).save()
+
+    match.team1_player2_id, match.team2_player2_id = dave.user_id, carol.user_id
+    match.save()
+
+    assert Partnership.find_mismatches() == []
+    assert partners(alice) == [(dave.user_id, 1, 1)]
+    assert partners(bob) == [(carol.user_id, 1, 0)]
+
+def test_moving_the_latest_match_back_recomputes_last_played(players):
+    pair = (players['alice'], players['carol'])
+    opponents = (players['bob'], players['dave'])
+    doubles(pair, opponents, match_date=datetime(2024, 5, 1)).save()
+    latest = doubles(pair, opponents, match_date=datetime(2024, 6, 1)).save()
+
+    latest.match_date = datetime(2024, 4, 1)
+    latest.save()
+
+    assert Partnership.find_mismatches() == []
+
+def test_missing_last_played_is_reported(players):
+    doubles((players['alice'], players['carol']), (players['bob'], players['dave'])).save()
+    execute_query("UPDATE Partnerships SET last_played = NULL", fetch=False)
+
+    assert len(Partnership.find_mismatches()) == 2
+
+def test_partners_endpoint_returns_best_and_worst(client, auth_headers, players):
+    alice, bob, carol, dave = (players[name] for name in ('alice', 'bob', 'carol', 'dave'))
+    Match.save_many([doubles((alice, carol), (bob, dave)), doubles((alice, bob), (carol, dave), 2, 6),
+                     doubles((alice, dave), (bob, carol)), doubles((alice, dave), (bob, carol), 0, 6)])
+
+    response = client.get(f"/api/stats/partners/{alice.user_id}?min_matches=1&limit=2", headers=auth_headers)
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert [p["name"] for p in body["best"]] == ["carol", "dave"]
+    assert [p["name"] for p in body["worst"]] == ["bob", "dave"]
+
+def test_best_and_worst_agree_with_find_partners(players):
+    alice, bob, carol, dave = (players[name] for name in ('alice', 'bob', 'carol', 'dave'))
+    Match.save_many([doubles((alice, carol), (bob, dave)), doubles((alice, bob), (carol, dave), 2, 6),
+                     doubles((alice, dave), (bob, carol)), doubles((alice, dave), (bob, carol), 0, 6),
+                     doubles((alice, bob), (carol, dave))])
+
+    for limit in (1, 2, 5):
+        best, worst = Partnership.find_best_and_worst(alice.user_id, limit, min_matches=1)
+        assert best == Partnership.find_partners(alice.user_id, limit, min_matches=1)
+        assert worst == Partnership.find_partners(alice.user_id, limit, min_matches=1, worst=True)
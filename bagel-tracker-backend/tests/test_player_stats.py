@@ -0,0 +1,76 @@
+"""PlayerStats stays in step with Matches as matches are recorded and edited."""
+import pytest
+from app.models.match import Match
+from app.models.player_stats import PlayerStats
+
+def singles(team1, team2, team1_score=6, team2_score=3):
+    return Match(match_type='singles', reporter_user_id=team1.user_id,
+                 team1_player1_id=team1.user_id, team2_player1_id=team2.user_id,
+                 team1_score=team1_score, team2_score=team2_score)
+
+def doubles(team1, team2, team1_score=6, team2_score=3):
+    return Match(match_type='doubles', reporter_user_id=team1[0].user_id,
+                 team1_player1_id=team1[0].user_id, team1_player2_id=team1[1].user_id,
+                 team2_player1_id=team2[0].user_id, team2_player2_id=team2[1].user_id,
+                 team1_score=team1_score, team2_score=team2_score)
+
+def fail(cursor, deltas):
+    raise RuntimeError("aggregate write failed")
+
+def test_recording_matches_updates_stats(players):
+    alice, bob, carol, dave = (players[name] for name in ('alice', 'bob', 'carol', 'dave'))
+    singles(alice, bob, 6, 0).save()
+    Match.save_many([doubles((alice, carol), (bob, dave)), singles(bob, alice, 6, 4)])
+
+    assert PlayerStats.find_mismatches() == []
+    stats = PlayerStats.find_by_user(alice.user_id)
+    assert stats["singles"]["matches_played"] == 2
+    assert stats["singles"]["bagels_given"] == 1
+    assert stats["doubles"]["wins"] == 1
+    assert (stats["totals"]["wins"], stats["totals"]["losses"]) == (2, 1)
+
+def test_editing_the_score_moves_wins_and_bagels(players):
+    alice, bob = players['alice'], players['bob']
+    match = singles(alice, bob, 6, 0).save()
+
+    match.team1_score, match.team2_score = 2, 6
+    match.save()
+
+    assert PlayerStats.find_mismatches() == []
+    stats = PlayerStats.find_by_user(alice.user_id)["singles"]
+    assert (stats["matches_played"], stats["wins"], stats["losses"]) == (1, 0, 1)
+    assert stats["bagels_given"] == 0
+
+def test_replacing_a_player_moves_their_stats(players):
+    alice, bob, carol = players['alice'], players['bob'], players['carol']
+    match = singles(alice, bob).save()
+
+    match.team2_player1_id = carol.user_id
+    match.save()
+
+    assert PlayerStats.find_mismatches() == []
+    assert PlayerStats.find_by_user(bob.user_id)["totals"]["matches_played"] == 0
+    assert PlayerStats.find_by_user(carol.user_id)["singles"]["losses"] == 1
+
+def test_failed_insert_rolls_back_and_clears_match_id(players, monkeypatch):
+    monkeypatch.setattr(PlayerStats, 'apply', staticmethod(fail))
+    match = singles(players['alice'], players['bob'])
+
+    with pytest.raises(RuntimeError):
+        match.save()
+    assert match.match_id is None
+    assert Match.get_all_matches() == []
+
+def test_failed_edit_keeps_match_id_and_previous_version(players, monkeypatch):
+    match = singles(players['alice'], players['bob'], 6, 0).save()
+    match_id = match.match_id
+
+    monkeypatch.setattr(PlayerStats, 'apply', staticmethod(fail))
+    match.team1_score = 2
+    with pytest.raises(RuntimeError):
+        match.save()
+
+    assert match.match_id == match_id
+    assert Match.find_by_id(match_id).team1_score == 6
+    monkeypatch.undo()
+    assert PlayerStats.find_mismatches() == []
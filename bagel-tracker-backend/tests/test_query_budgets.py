@@ -0,0 +1,7 @@
+"""Per-endpoint statement and connection budgets (benchmarks/query_budget.py)."""
+from benchmarks.query_budget import check, load_budgets, run_scenarios
+
+def test_endpoints_stay_within_query_budgets():
+    failures = check(run_scenarios(), load_budgets())
+
+    assert not failures, "\n".join(failures)
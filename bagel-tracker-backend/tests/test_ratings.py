@@ -0,0 +1,34 @@
+"""Elo ratings: incremental updates on insert agree with a full replay."""
+from app.models.match import Match
+from app.models.rating import PlayerRating
+from app.utils.rating_replay import replay
+
+def singles(team1, team2, team2_score=3):
+    return Match(match_type='singles', reporter_user_id=team1.user_id,
+                 team1_player1_id=team1.user_id, team2_player1_id=team2.user_id,
+                 team1_score=6, team2_score=team2_score)
+
+def test_recording_a_match_rates_both_players(players):
+    alice, bob = players['alice'], players['bob']
+    singles(alice, bob).save()
+
+    winner = PlayerRating.find_by_user(alice.user_id)["singles"]
+    loser = PlayerRating.find_by_user(bob.user_id)["singles"]
+    assert winner["matches_rated"] == loser["matches_rated"] == 1
+    assert winner["rating"] > PlayerRating.INITIAL_RATING > loser["rating"]
+    assert PlayerRating.find_by_user(alice.user_id)["doubles"]["matches_rated"] == 0
+
+def test_incremental_ratings_match_a_full_replay(players):
+    alice, bob, carol, dave = (players[name] for name in ('alice', 'bob', 'carol', 'dave'))
+    singles(alice, bob).save()
+    Match.save_many([singles(bob, carol), singles(carol, alice, 0), singles(dave, alice)])
+    Match(match_type='doubles', reporter_user_id=alice.user_id,
+          team1_player1_id=alice.user_id, team1_player2_id=dave.user_id,
+          team2_player1_id=bob.user_id, team2_player2_id=carol.user_id,
+          team1_score=4, team2_score=6).save()
+
+    ratings, counts = replay(list(PlayerRating.load_history()))
+    stored = PlayerRating.all_ratings()
+    assert set(stored) == set(ratings)
+    for key, rating in ratings.items():
+        assert abs(stored[key] - rating) < 0.05
@@ -0,0 +1,97 @@
+"""UserCache lookups, expiry, invalidation and the shared backend tier."""
+import time
+from app.models.user import User, UserCache
+
+class DictBackend:
+    """Shared-tier stand-in with the get/set/delete interface UserCache expects."""
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ttl):
+        self.values[key] = value
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+def make_user(user_id=1, name='Alice', email='Alice@Example.com'):
+    return User(user_id=user_id, name=name, email=email, password_hash='hash')
+
+def test_user_is_found_by_every_key_ignoring_case():
+    cache = UserCache()
+    cache.put(make_user())
+
+    assert cache.get('user_id', 1).name == 'Alice'
+    assert cache.get('name', 'alice').user_id == 1
+    assert cache.get('email', 'ALICE@example.com', require_password=True).password_hash == 'hash'
+    assert cache.get('name', 'bob') is None
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["misses"] == 1
+
+def test_entries_expire_after_the_ttl():
+    cache = UserCache(ttl=0.01)
+    cache.put(make_user())
+    time.sleep(0.02)
+
+    assert cache.get('user_id', 1) is None
+
+def test_invalidate_drops_the_old_name_and_email():
+    cache = UserCache()
+    cache.put(make_user())
+    cache.put_prefix('5:a', [{"name": 'Alice'}])
+
+    cache.invalidate(make_user(name='Alicia', email='alicia@example.com'))
+
+    assert cache.get('name', 'alice') is None
+    assert cache.get('email', 'alice@example.com') is None
+    assert cache.get('user_id', 1) is None
+    assert cache.get_prefix('5:a') is None
+
+def test_least_recently_used_keys_are_evicted():
+    # Each user takes one entry per key field, and each entry ages separately
+    cache = UserCache(max_size=6)
+    cache.put(make_user(1, 'alice', 'alice@example.com'))
+    cache.put(make_user(2, 'bob', 'bob@example.com'))
+    cache.get('name', 'alice')
+    cache.put(make_user(3, 'carol', 'carol@example.com'))
+
+    assert cache.get('user_id', 3) is not None
+    assert cache.get('name', 'alice') is not None
+    assert cache.get('user_id', 1) is None
+    assert cache.get('user_id', 2) is None
+    assert cache.stats()["entries"] == 6
+
+def test_shared_backend_never_stores_password_hashes():
+    backend = DictBackend()
+    UserCache(backend=backend).put(make_user())
+
+    assert set(backend.values) == {"user:user_id:1", "user:name:alice", "user:email:alice@example.com"}
+    assert all('password_hash' not in fields for fields in backend.values.values())
+
+    # Another process's cache finds the user, but not for a password check
+    other = UserCache(backend=backend)
+    assert other.get('email', 'alice@example.com', require_password=True) is None
+    user = other.get('name', 'ALICE')
+    assert user.user_id == 1
+    assert user.password_hash is None
+    assert other.stats()["backend_hits"] == 1
+
+def test_invalidate_deletes_from_the_shared_backend():
+    backend = DictBackend()
+    cache = UserCache(backend=backend)
+    cache.put(make_user())
+
+    cache.invalidate(make_user())
+
+    assert backend.values == {}
+
+def test_renaming_a_user_is_visible_through_the_cache(players):
+    alice = User.find_by_name('alice')
+    alice.name = 'alicia'
+    alice.save()
+
+    assert User.find_by_name('alice') is None
+    assert User.find_by_id(alice.user_id).name == 'alicia'